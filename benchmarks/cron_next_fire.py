@@ -0,0 +1,41 @@
+"""Measure how many cron next-fire computations run per minute.
+
+    python benchmarks/cron_next_fire.py [--iterations N]
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from scheduler.cron import CronTrigger  # noqa: E402
+
+EXPRESSIONS = [
+    ("*/5 * * * *", None),
+    ("0,15,30,45 * * * *", None),
+    ("0 2 * * 1-5", "Europe/Paris"),
+    ("30 1 * * *", "America/New_York"),
+    ("0 0 29 2 *", None),
+]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+    start_epoch = 1_700_000_000
+    for expression, timezone_name in EXPRESSIONS:
+        trigger = CronTrigger(expression, timezone_name)
+        started = time.perf_counter()
+        for index in range(args.iterations):
+            trigger.next_fire(start_epoch + index * 37)
+        elapsed = time.perf_counter() - started
+        print(f"{trigger.spec:<40} {args.iterations / elapsed * 60 / 1e6:6.2f}M next-fire computations/min")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import argparse
+from dataclasses import asdict, dataclass
+import json
+from pathlib import Path
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from scheduler.cron import CronTrigger
+from scheduler.db import SQLITE_STATEMENTS, fetch_due_functions, init_db, transaction, upsert_scheduled_functions
+from scheduler.executor import InlineExecutor
+from scheduler.runner import Dispatcher
+from scheduler.scanner import scan
+from scheduler.store import SQLiteStore
+
+RESULTS_VERSION = 1
+# A mix of short and long intervals, so due times spread over the day.
+INTERVALS = (10, 30, 60, 300, 900, 3600, 86400)
+_STATUSES = ("success",) * 18 + ("failure", "timeout")
+
+
+@dataclass(frozen=True)
+class BenchSize:
+    files: int
+    functions_per_file: int
+    jobs: int
+    run_logs: int
+    repeat: int
+
+
+PRESETS = {
+    "quick": BenchSize(files=20, functions_per_file=5, jobs=500, run_logs=20_000, repeat=3),
+    "standard": BenchSize(files=200, functions_per_file=10, jobs=10_000, run_logs=1_000_000, repeat=5),
+    "large": BenchSize(files=1_000, functions_per_file=10, jobs=100_000, run_logs=10_000_000, repeat=5),
+}
+
+
+@dataclass(frozen=True)
+class Measurement:
+    value: float
+    unit: str
+    better: str  # "higher" or "lower"
+
+
+def generate_job_files(root: Path, files: int, functions_per_file: int) -> list[Path]:
+    # N modules with M decorated functions each, as the scanner would find them.
+    root.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for file_index in range(files):
+        lines = ["from datetime import timedelta", "from scheduler.decorators import schedule", ""]
+        for function_index in range(functions_per_file):
+            interval = INTERVALS[(file_index + function_index) % len(INTERVALS)]
+            lines += ["", f"@schedule(timedelta(seconds={interval}))", f"def job_{function_index}():", "    return None", ""]
+        path = root / f"jobs_{file_index:05d}.py"
+        path.write_text("\n".join(lines), encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def generate_jobs(conn, root: Path, jobs: int, functions_per_file: int = 10) -> None:
+    # K no-op jobs with mixed intervals, functions_per_file to a module.
+    root.mkdir(parents=True, exist_ok=True)
+    rows = []
+    for start in range(0, jobs, functions_per_file):
+        names = [f"job_{index}" for index in range(start, min(start + functions_per_file, jobs))]
+        module_path = root / f"noop_{start:07d}.py"
+        module_path.write_text("".join(f"def {name}():\n    return None\n\n" for name in names), encoding="utf-8")
+        rows += [
+            (str(module_path), f"{module_path.stem}.{name}", INTERVALS[len(rows) % len(INTERVALS)]) for name in names
+        ]
+    upsert_scheduled_functions(conn, rows)
+
+
+def generate_run_logs(conn, rows: int, now: int, span_seconds: int = 7 * 86400, chunk: int = 100_000) -> None:
+    # Timed run logs spread evenly over the last span_seconds.
+    function_ids = [row[0] for row in conn.execute("SELECT id FROM scheduled_functions")] or [1]
+    step = span_seconds / max(rows, 1)
+    with transaction(conn):
+        for start in range(0, rows, chunk):
+            batch = []
+            for index in range(start, min(start + chunk, rows)):
+                started_at = now - span_seconds + int(index * step)
+                status = _STATUSES[index % len(_STATUSES)]
+                batch.append((
+                    function_ids[index % len(function_ids)],
+                    started_at,
+                    started_at + 1,
+                    status,
+                    None if status == "success" else "boom",
+                    started_at * 1000 + index % 1000,
+                    (index % 5000) * 100_000,
+                    (index % 5000) * 50_000,
+                    index % 2000,
+                ))
+            conn.executemany(SQLITE_STATEMENTS.insert_run_log, batch)
+
+
+def _median_seconds(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def bench_scan(workdir: Path, size: BenchSize) -> dict[str, Measurement]:
+    tasks = workdir / "scan_tasks"
+    generate_job_files(tasks, size.files, size.functions_per_file)
+    conn = init_db(workdir / "scan.db")
+    try:
+        cold = scan(conn, [tasks])
+        rescan = _median_seconds(lambda: scan(conn, [tasks]), size.repeat)
+    finally:
+        conn.close()
+    return {
+        "scan_files_per_sec": Measurement(cold.files_per_second, "files/s", "higher"),
+        "rescan_files_per_sec": Measurement(size.files / rescan, "files/s", "higher"),
+    }
+
+
+def bench_dispatch(workdir: Path, size: BenchSize) -> dict[str, Measurement]:
+    # Runner overhead per job: claim, plan, advance next_run_at, execute a
+    # no-op and record its run log.
+    conn = init_db(workdir / "dispatch.db")
+    try:
+        generate_jobs(conn, workdir / "dispatch_jobs", size.jobs, size.functions_per_file)
+        conn.commit()
+        dispatcher = Dispatcher(conn, InlineExecutor(), claim_batch=size.jobs)
+
+        timings = []
+        # The first round imports the job module and is not counted.
+        for _ in range(size.repeat + 1):
+            conn.execute("UPDATE scheduled_functions SET next_run_at = 0")
+            conn.commit()
+            dispatcher.request_reload()
+            started = time.perf_counter()
+            dispatcher.dispatch_due()
+            dispatcher.drain()
+            timings.append(time.perf_counter() - started)
+        dispatcher.shutdown()
+    finally:
+        conn.close()
+    return {"dispatch_us_per_job": Measurement(statistics.median(timings[1:]) / size.jobs * 1e6, "us", "lower")}
+
+
+def bench_queries(workdir: Path, size: BenchSize) -> dict[str, Measurement]:
+    from scheduler.tui import TuiState
+
+    now = int(time.time())
+    conn = init_db(workdir / "queries.db")
+    try:
+        generate_jobs(conn, workdir / "query_jobs", size.jobs, size.functions_per_file)
+        # About 1% of jobs due; the rest spread over the next day.
+        conn.execute("UPDATE scheduled_functions SET next_run_at = ? + (id * 7919) % 86400 - 864", (now,))
+        conn.commit()
+        generate_run_logs(conn, size.run_logs, now)
+        conn.execute("ANALYZE")
+        conn.commit()
+        store = SQLiteStore(conn)
+        state = TuiState(store)
+        state.sync(now)
+        queries = {
+            "fetch_due_ms": lambda: fetch_due_functions(conn, now),
+            "tui_recent_runs_ms": store.fetch_recent_runs,
+            "tui_upcoming_firings_ms": lambda: store.fetch_upcoming_firings(now),
+            # The live TUI pays for a full sync every few minutes and for an
+            # incremental refresh, here with nothing changed, every few seconds.
+            "tui_sync_ms": lambda: state.sync(now),
+            "tui_refresh_ms": lambda: state.refresh(now),
+        }
+        return {
+            name: Measurement(_median_seconds(query, size.repeat) * 1000, "ms", "lower")
+            for name, query in queries.items()
+        }
+    finally:
+        conn.close()
+
+
+def bench_cron(workdir: Path, size: BenchSize) -> dict[str, Measurement]:
+    trigger = CronTrigger("0 2 * * 1-5", "Europe/Paris")
+    iterations = size.jobs * 10
+
+    def compute() -> None:
+        for index in range(iterations):
+            trigger.next_fire(1_700_000_000 + index * 37)
+
+    return {"cron_next_fire_per_sec": Measurement(iterations / _median_seconds(compute, size.repeat), "1/s", "higher")}
+
+
+BENCHMARKS: dict[str, Callable[[Path, BenchSize], dict[str, Measurement]]] = {
+    "scan": bench_scan,
+    "dispatch": bench_dispatch,
+    "queries": bench_queries,
+    "cron": bench_cron,
+}
+
+
+def run_benchmarks(size: BenchSize, names: list[str] | None = None, preset: str | None = None) -> dict:
+    results: dict[str, Measurement] = {}
+    with tempfile.TemporaryDirectory(prefix="scheduler-bench-") as workdir:
+        for name in names or list(BENCHMARKS):
+            results.update(BENCHMARKS[name](Path(workdir) / name, size))
+    return {
+        "version": RESULTS_VERSION,
+        "preset": preset,
+        "size": asdict(size),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": int(time.time()),
+        "results": {name: asdict(measurement) for name, measurement in results.items()},
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[tuple[str, float, float, float, bool]]:
+    # (name, baseline, current, relative change, regressed) for every result
+    # present in both runs. A positive change is always an improvement.
+    rows = []
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None or not previous["value"]:
+            continue
+        change = current["value"] / previous["value"] - 1
+        if current["better"] == "lower":
+            change = previous["value"] / current["value"] - 1 if current["value"] else 0.0
+        rows.append((name, previous["value"], current["value"], change, change < -tolerance))
+    return rows
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="quick", help="Data set size (default: quick)")
+    for flag in ("files", "functions-per-file", "jobs", "run-logs", "repeat"):
+        parser.add_argument(f"--{flag}", type=int, help="Override the preset's value")
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument("--output", type=Path, help="Write the JSON results to this file instead of stdout")
+    parser.add_argument("--baseline", type=Path, help="Compare against results saved with --output")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Relative slowdown against the baseline that counts as a regression (default: 0.2)",
+    )
+
+
+def main(args: argparse.Namespace) -> int:
+    overrides = {
+        field: getattr(args, field)
+        for field in ("files", "functions_per_file", "jobs", "run_logs", "repeat")
+        if getattr(args, field) is not None
+    }
+    size = BenchSize(**{**asdict(PRESETS[args.preset]), **overrides})
+    results = run_benchmarks(size, args.only, args.preset)
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.baseline is None:
+        return 0
+    rows = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+    for name, previous, current, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<28} {previous:>14.3f} -> {current:>14.3f} {change:+8.1%}{flag}", file=sys.stderr)
+    return 1 if any(row[4] for row in rows) else 0
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+import os
+import threading
+from types import ModuleType
+from typing import Callable
+
+Fingerprint = tuple[int, int]
+
+# Job modules, not jobs: a module holding many jobs takes one entry.
+DEFAULT_MAX_ENTRIES = 1024
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+
+
+def file_fingerprint(path: str) -> Fingerprint:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ModuleCache:
+    # LRU of loaded job modules keyed on module path, so a module with several
+    # jobs is executed once and its jobs share its globals. A module is reused
+    # only while its file's mtime and size are unchanged. max_entries = 0
+    # keeps every module loaded.
+    def __init__(self, loader: Callable[[str], ModuleType], max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self._loader = loader
+        self._entries: OrderedDict[str, tuple[Fingerprint, ModuleType]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Held while a path loads, so threads missing on the same path run
+        # its top-level code once; other paths load in parallel.
+        self._path_locks: dict[str, threading.Lock] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self.resize(max_entries)
+
+    def resize(self, max_entries: int) -> None:
+        if max_entries < 0:
+            raise ValueError("max_entries must not be negative")
+        with self._lock:
+            self._max_entries = max_entries
+            self._evict()
+
+    def get(self, module_path: str, qualname: str) -> Callable[..., object]:
+        return getattr(self.module(module_path), qualname.split(".")[-1])
+
+    def module(self, module_path: str) -> ModuleType:
+        fingerprint = file_fingerprint(module_path)
+        module = self._cached(module_path, fingerprint)
+        if module is not None:
+            return module
+        with self._lock:
+            path_lock = self._path_locks.setdefault(module_path, threading.Lock())
+        with path_lock:
+            # Another thread may have loaded it while this one waited.
+            module = self._cached(module_path, fingerprint)
+            if module is not None:
+                return module
+            with self._lock:
+                self._misses += 1
+            module = self._loader(module_path)
+            with self._lock:
+                self._entries[module_path] = (fingerprint, module)
+                self._entries.move_to_end(module_path)
+                self._evict()
+        return module
+
+    def _cached(self, module_path: str, fingerprint: Fingerprint) -> ModuleType | None:
+        with self._lock:
+            entry = self._entries.get(module_path)
+            if entry is None or entry[0] != fingerprint:
+                return None
+            self._entries.move_to_end(module_path)
+            self._hits += 1
+            return entry[1]
+
+    def _evict(self) -> None:
+        while self._max_entries and len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def invalidate(self, module_path: str | None = None) -> None:
+        with self._lock:
+            if module_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(module_path, None)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=len(self._entries),
+            )
@@ -1,14 +1,25 @@
 from __future__ import annotations
 
 import argparse
+from datetime import datetime, timezone
+from functools import partial
 from pathlib import Path
+import sys
 from typing import Sequence
 
+from scheduler import bench
 from scheduler.config import load_config
 from scheduler.db import init_db
-from scheduler.runner import run_due, runner_loop
-from scheduler.scanner import scan_paths
+from scheduler.due_queue import DueQueue
+from scheduler.executor import create_executor
+from scheduler.metrics import start_metrics_server
+from scheduler.profiling import PROFILE_MODES, decode_profile, format_profile
+from scheduler.retention import DAY_SECONDS, compact_run_logs, start_retention_thread
+from scheduler.runner import run_due, runner_loop, set_module_cache_size
+from scheduler.scanner import scan, start_scan_thread
+from scheduler.store import SQLiteStore, Store, open_store
 from scheduler.tui import run_tui
+from scheduler.watcher import start_watch_thread
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -24,6 +35,9 @@ def build_parser() -> argparse.ArgumentParser:
         ("run", "Run the scheduler loops"),
         ("scan", "Scan for scheduled functions"),
         ("tui", "Launch the TUI"),
+        ("compact", "Roll up and delete run logs older than the retention horizon"),
+        ("bench", "Benchmark the scanner, runner and database on synthetic data"),
+        ("profile", "Show recorded profiles of a scheduled function, or turn profiling on or off"),
     ):
         subparser = subparsers.add_parser(name, help=help_text)
         if name == "run":
@@ -32,29 +46,168 @@ def build_parser() -> argparse.ArgumentParser:
                 action="store_true",
                 help="Run a single scan/run cycle and exit",
             )
+        elif name == "bench":
+            bench.add_arguments(subparser)
+        elif name == "profile":
+            subparser.add_argument("qualname", help="Function name as shown in the TUI, e.g. jobs.cleanup")
+            subparser.add_argument(
+                "--file", type=Path, help="Source file of the function, when several scanned files share its name"
+            )
+            toggle = subparser.add_mutually_exclusive_group()
+            toggle.add_argument("--enable", choices=PROFILE_MODES, help="Profile every run of the function")
+            toggle.add_argument("--disable", action="store_true", help="Stop profiling every run")
+            subparser.add_argument("--limit", type=int, default=5, help="Number of recent profiles to show")
     return parser
 
 
+def _resolve_module_path(store: Store, qualname: str, file: Path | None) -> str | None:
+    # Qualnames are "<file stem>.<function>", so files with the same name in
+    # different scan paths share one; --file picks among them.
+    module_paths = store.fetch_module_paths(qualname)
+    if file is not None:
+        module_paths = [path for path in module_paths if Path(path).resolve() == file.resolve()]
+    if len(module_paths) == 1:
+        return module_paths[0]
+    if not module_paths:
+        where = "" if file is None else f" in {file}"
+        print(f"ERROR: no scheduled function named {qualname!r}{where}", file=sys.stderr)
+    else:
+        print(
+            f"ERROR: {qualname!r} matches {len(module_paths)} scheduled functions; pass --file with one of:",
+            file=sys.stderr,
+        )
+        for path in module_paths:
+            print(f"  {path}", file=sys.stderr)
+    return None
+
+
 def main(argv: Sequence[str] | None = None) -> int:
     parser = build_parser()
     args = parser.parse_args(argv)
     if args.command is None:
         args.command = "run"
+    if args.command == "bench":
+        # Uses its own temporary databases, so no config is needed.
+        return bench.main(args)
     config = load_config(args.config)
-    conn = init_db(config.db_path)
+    database = config.database_url or config.db_path
+    tuning = config.sqlite_tuning
+    if args.command == "tui":
+        if not config.database_url and not config.db_path.exists():
+            init_db(config.db_path, tuning).close()
+        # Read-only, so monitoring never competes with the runner for the write lock.
+        try:
+            store = open_store(database, read_only=True, tuning=tuning)
+        except RuntimeError as exc:  # an old schema, or no PostgreSQL driver
+            print(f"ERROR: {exc}", file=sys.stderr)
+            return 1
+        run_tui(store, config.tui_refresh_seconds)
+        return 0
+    store = open_store(database, tuning=tuning)
     if args.command == "scan":
-        discovered = scan_paths(conn, config.scan_paths)
-        print(f"INFO: discovered {discovered} scheduled function(s)")
+        report = scan(
+            store,
+            config.scan_paths,
+            discovery=config.discovery,
+            workers=config.scan_workers,
+            spread=config.spread,
+        )
+        print(f"INFO: discovered {report.discovered} scheduled function(s)")
+        print(
+            f"INFO: scanned {report.files_scanned} file(s) ({report.files_changed} changed) "
+            f"in {report.duration_seconds:.2f}s ({report.files_per_second:.1f} files/sec)"
+        )
     elif args.command == "run":
-        discovered = scan_paths(conn, config.scan_paths)
-        print(f"INFO: discovered {discovered} scheduled function(s)")
+        report = scan(
+            store,
+            config.scan_paths,
+            discovery=config.discovery,
+            workers=config.scan_workers,
+            spread=config.spread,
+        )
+        print(f"INFO: discovered {report.discovered} scheduled function(s)")
         if getattr(args, "once", False):
-            run_due(conn)
+            run_due(store)
         else:
+            # Rollups and compaction are implemented for SQLite only.
+            if config.run_log_retention_days > 0 and isinstance(store, SQLiteStore):
+                start_retention_thread(
+                    config.db_path,
+                    config.run_log_retention_days * DAY_SECONDS,
+                    config.retention_interval_seconds,
+                    tuning,
+                )
+            if config.metrics_port:
+                start_metrics_server(config.metrics_port, config.metrics_host)
+                print(f"INFO: metrics at http://{config.metrics_host}:{config.metrics_port}/metrics")
+            queue = DueQueue()
+            start_scan_thread(
+                database,
+                config.scan_paths,
+                config.scan_interval_seconds,
+                discovery=config.discovery,
+                workers=config.scan_workers,
+                on_scan=lambda _: queue.wake(),
+                spread=config.spread,
+                tuning=tuning,
+            )
+            if config.watch:
+                start_watch_thread(
+                    database,
+                    config.scan_paths,
+                    discovery=config.discovery,
+                    workers=config.scan_workers,
+                    on_scan=lambda _: queue.wake(),
+                    spread=config.spread,
+                    tuning=tuning,
+                )
+            set_module_cache_size(config.module_cache_size)
             print("INFO: runner loop started")
-            runner_loop(conn, config.runner_poll_seconds)
-    elif args.command == "tui":
-        run_tui(conn, config.tui_refresh_seconds)
+            runner_loop(
+                store,
+                config.runner_poll_seconds,
+                executor=create_executor(
+                    config.executor,
+                    config.max_workers,
+                    config.async_concurrency,
+                    worker_max_runs=config.worker_max_runs,
+                    worker_max_rss_bytes=config.worker_max_rss_mb * 1024 * 1024,
+                    initializer=partial(set_module_cache_size, config.module_cache_size),
+                ),
+                queue=queue,
+                lease_seconds=config.lease_seconds,
+                claim_batch=config.claim_batch,
+                profiling=config.profiling,
+            )
+    elif args.command == "profile":
+        module_path = _resolve_module_path(store, args.qualname, args.file)
+        if module_path is None:
+            return 1
+        if args.enable or args.disable:
+            mode = None if args.disable else args.enable
+            store.set_profile(module_path, args.qualname, mode)
+            print(f"INFO: profiling of {args.qualname} ({module_path}) set to {mode or 'off'}")
+            return 0
+        profiles = store.fetch_run_profiles(module_path, args.qualname, args.limit)
+        if not profiles:
+            print(f"INFO: no profiles recorded for {args.qualname}")
+        for module_path, started_at, stats in profiles:
+            when = datetime.fromtimestamp(started_at, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+            print(f"{args.qualname} ({module_path}) run at {when}")
+            print(format_profile(decode_profile(stats)))
+            print()
+    elif args.command == "compact":
+        if config.run_log_retention_days <= 0:
+            print("INFO: run log retention is disabled (run_log_retention_days = 0)")
+            return 0
+        if not isinstance(store, SQLiteStore):
+            print("INFO: run log compaction is only supported on SQLite")
+            return 0
+        report = compact_run_logs(store.conn, config.run_log_retention_days * DAY_SECONDS)
+        print(
+            f"INFO: rolled up {report.rolled_up} run log(s) in {report.chunks} chunk(s), "
+            f"freed {report.pages_freed} page(s)"
+        )
     return 0
 
 
@@ -8,6 +8,13 @@ try:
 except ModuleNotFoundError:  # Python < 3.11
     import tomli as tomllib
 
+from scheduler.cache import DEFAULT_MAX_ENTRIES
+from scheduler.db import SYNCHRONOUS_MODES, SQLiteTuning
+from scheduler.executor import EXECUTOR_KINDS
+from scheduler.profiling import PROFILE_MODES, ProfileSettings
+from scheduler.scanner import DISCOVERY_MODES
+from scheduler.store import POSTGRES_SCHEMES
+
 
 @dataclass(frozen=True)
 class Config:
@@ -16,6 +23,43 @@ class Config:
     runner_poll_seconds: int
     db_path: Path
     tui_refresh_seconds: int
+    executor: str = "thread"
+    max_workers: int = 4
+    async_concurrency: int = 100
+    discovery: str = "import"
+    scan_workers: int = 1
+    run_log_retention_days: int = 0
+    retention_interval_seconds: int = 3600
+    watch: bool = False
+    worker_max_runs: int = 1000
+    worker_max_rss_mb: int = 0
+    spread: bool = False
+    lease_seconds: int = 60
+    claim_batch: int = 100
+    database_url: str | None = None
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_mb: int = 0
+    sqlite_wal_autocheckpoint: int = 1000
+    metrics_port: int = 0
+    metrics_host: str = "127.0.0.1"
+    profile_sample_rate: int = 0
+    profile_mode: str = "cpu"
+    profile_top: int = 20
+    module_cache_size: int = DEFAULT_MAX_ENTRIES
+
+    @property
+    def sqlite_tuning(self) -> SQLiteTuning:
+        return SQLiteTuning(
+            synchronous=self.sqlite_synchronous,
+            busy_timeout_ms=self.sqlite_busy_timeout_ms,
+            mmap_size_bytes=self.sqlite_mmap_mb * 1024 * 1024,
+            wal_autocheckpoint_pages=self.sqlite_wal_autocheckpoint,
+        )
+
+    @property
+    def profiling(self) -> ProfileSettings:
+        return ProfileSettings(sample_rate=self.profile_sample_rate, mode=self.profile_mode, top=self.profile_top)
 
 
 _REQUIRED_KEYS = {
@@ -26,6 +70,9 @@ _REQUIRED_KEYS = {
     "tui_refresh_seconds",
 }
 
+_STRING_KEYS = {"executor", "discovery", "database_url", "sqlite_synchronous", "metrics_host", "profile_mode"}
+_BOOL_KEYS = {"watch", "spread"}
+
 
 def _apply_env_overrides(data: dict) -> dict:
     overrides = {
@@ -34,6 +81,30 @@ def _apply_env_overrides(data: dict) -> dict:
         "RUNNER_POLL_SECONDS": "runner_poll_seconds",
         "DB_PATH": "db_path",
         "TUI_REFRESH_SECONDS": "tui_refresh_seconds",
+        "EXECUTOR": "executor",
+        "MAX_WORKERS": "max_workers",
+        "ASYNC_CONCURRENCY": "async_concurrency",
+        "DISCOVERY": "discovery",
+        "SCAN_WORKERS": "scan_workers",
+        "RUN_LOG_RETENTION_DAYS": "run_log_retention_days",
+        "RETENTION_INTERVAL_SECONDS": "retention_interval_seconds",
+        "WATCH": "watch",
+        "WORKER_MAX_RUNS": "worker_max_runs",
+        "WORKER_MAX_RSS_MB": "worker_max_rss_mb",
+        "SPREAD": "spread",
+        "LEASE_SECONDS": "lease_seconds",
+        "CLAIM_BATCH": "claim_batch",
+        "DATABASE_URL": "database_url",
+        "SQLITE_SYNCHRONOUS": "sqlite_synchronous",
+        "SQLITE_BUSY_TIMEOUT_MS": "sqlite_busy_timeout_ms",
+        "SQLITE_MMAP_MB": "sqlite_mmap_mb",
+        "SQLITE_WAL_AUTOCHECKPOINT": "sqlite_wal_autocheckpoint",
+        "METRICS_PORT": "metrics_port",
+        "METRICS_HOST": "metrics_host",
+        "PROFILE_SAMPLE_RATE": "profile_sample_rate",
+        "PROFILE_MODE": "profile_mode",
+        "PROFILE_TOP": "profile_top",
+        "MODULE_CACHE_SIZE": "module_cache_size",
     }
     for env_key, config_key in overrides.items():
         if env_key in os.environ:
@@ -42,6 +113,10 @@ def _apply_env_overrides(data: dict) -> dict:
                 data[config_key] = [Path(p) for p in value.split(":") if p]
             elif config_key == "db_path":
                 data[config_key] = Path(value)
+            elif config_key in _STRING_KEYS:
+                data[config_key] = value
+            elif config_key in _BOOL_KEYS:
+                data[config_key] = value.strip().lower() in {"1", "true", "yes", "on"}
             else:
                 data[config_key] = int(value)
     return data
@@ -54,11 +129,114 @@ def load_config(path: Path) -> Config:
     if missing:
         raise ValueError("missing required config keys: " + ", ".join(missing))
 
+    scan_interval_seconds = int(raw["scan_interval_seconds"])
+    if scan_interval_seconds < 1:
+        raise ValueError("scan_interval_seconds must be at least 1")
+    executor = str(raw.get("executor", Config.executor))
+    if executor not in EXECUTOR_KINDS:
+        raise ValueError(
+            f"invalid executor {executor!r}; expected one of: " + ", ".join(EXECUTOR_KINDS)
+        )
+    max_workers = int(raw.get("max_workers", Config.max_workers))
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+    async_concurrency = int(raw.get("async_concurrency", Config.async_concurrency))
+    if async_concurrency < 1:
+        raise ValueError("async_concurrency must be at least 1")
+    scan_workers = int(raw.get("scan_workers", Config.scan_workers))
+    if scan_workers < 1:
+        raise ValueError("scan_workers must be at least 1")
+    run_log_retention_days = int(raw.get("run_log_retention_days", Config.run_log_retention_days))
+    if run_log_retention_days < 0:
+        raise ValueError("run_log_retention_days must not be negative")
+    retention_interval_seconds = int(raw.get("retention_interval_seconds", Config.retention_interval_seconds))
+    if retention_interval_seconds < 1:
+        raise ValueError("retention_interval_seconds must be at least 1")
+    worker_max_runs = int(raw.get("worker_max_runs", Config.worker_max_runs))
+    if worker_max_runs < 1:
+        raise ValueError("worker_max_runs must be at least 1")
+    worker_max_rss_mb = int(raw.get("worker_max_rss_mb", Config.worker_max_rss_mb))
+    if worker_max_rss_mb < 0:
+        raise ValueError("worker_max_rss_mb must not be negative")
+    lease_seconds = int(raw.get("lease_seconds", Config.lease_seconds))
+    if lease_seconds < 1:
+        raise ValueError("lease_seconds must be at least 1")
+    claim_batch = int(raw.get("claim_batch", Config.claim_batch))
+    if claim_batch < 1:
+        raise ValueError("claim_batch must be at least 1")
+    database_url = raw.get("database_url") or None
+    if database_url is not None and not str(database_url).startswith(POSTGRES_SCHEMES):
+        raise ValueError("database_url must be a postgresql:// URL")
+    sqlite_synchronous = str(raw.get("sqlite_synchronous", Config.sqlite_synchronous)).upper()
+    if sqlite_synchronous not in SYNCHRONOUS_MODES:
+        raise ValueError(
+            f"invalid sqlite_synchronous {sqlite_synchronous!r}; expected one of: " + ", ".join(SYNCHRONOUS_MODES)
+        )
+    sqlite_busy_timeout_ms = int(raw.get("sqlite_busy_timeout_ms", Config.sqlite_busy_timeout_ms))
+    if sqlite_busy_timeout_ms < 0:
+        raise ValueError("sqlite_busy_timeout_ms must not be negative")
+    sqlite_mmap_mb = int(raw.get("sqlite_mmap_mb", Config.sqlite_mmap_mb))
+    if sqlite_mmap_mb < 0:
+        raise ValueError("sqlite_mmap_mb must not be negative")
+    sqlite_wal_autocheckpoint = int(raw.get("sqlite_wal_autocheckpoint", Config.sqlite_wal_autocheckpoint))
+    if sqlite_wal_autocheckpoint < 0:
+        raise ValueError("sqlite_wal_autocheckpoint must not be negative")
+    metrics_port = int(raw.get("metrics_port", Config.metrics_port))
+    if not 0 <= metrics_port <= 65535:
+        raise ValueError("metrics_port must be between 0 and 65535")
+    profile_sample_rate = int(raw.get("profile_sample_rate", Config.profile_sample_rate))
+    if profile_sample_rate < 0:
+        raise ValueError("profile_sample_rate must not be negative")
+    profile_mode = str(raw.get("profile_mode", Config.profile_mode))
+    if profile_mode not in PROFILE_MODES:
+        raise ValueError(
+            f"invalid profile_mode {profile_mode!r}; expected one of: " + ", ".join(PROFILE_MODES)
+        )
+    profile_top = int(raw.get("profile_top", Config.profile_top))
+    if profile_top < 1:
+        raise ValueError("profile_top must be at least 1")
+    module_cache_size = int(raw.get("module_cache_size", Config.module_cache_size))
+    if module_cache_size < 0:
+        raise ValueError("module_cache_size must not be negative")
+    for key in sorted(_BOOL_KEYS):
+        # bool("false") is True, so strings are refused rather than coerced.
+        if not isinstance(raw.get(key, False), bool):
+            raise ValueError(f"{key} must be true or false, not {raw[key]!r}")
+    discovery = str(raw.get("discovery", Config.discovery))
+    if discovery not in DISCOVERY_MODES:
+        raise ValueError(
+            f"invalid discovery {discovery!r}; expected one of: " + ", ".join(DISCOVERY_MODES)
+        )
+
     scan_paths = [Path(p) for p in raw["scan_paths"]]
     return Config(
         scan_paths=scan_paths,
-        scan_interval_seconds=int(raw["scan_interval_seconds"]),
+        scan_interval_seconds=scan_interval_seconds,
         runner_poll_seconds=int(raw["runner_poll_seconds"]),
         db_path=Path(raw["db_path"]),
         tui_refresh_seconds=int(raw["tui_refresh_seconds"]),
+        executor=executor,
+        max_workers=max_workers,
+        async_concurrency=async_concurrency,
+        discovery=discovery,
+        scan_workers=scan_workers,
+        run_log_retention_days=run_log_retention_days,
+        retention_interval_seconds=retention_interval_seconds,
+        watch=raw.get("watch", Config.watch),
+        worker_max_runs=worker_max_runs,
+        worker_max_rss_mb=worker_max_rss_mb,
+        spread=raw.get("spread", Config.spread),
+        lease_seconds=lease_seconds,
+        claim_batch=claim_batch,
+        database_url=database_url,
+        sqlite_synchronous=sqlite_synchronous,
+        sqlite_busy_timeout_ms=sqlite_busy_timeout_ms,
+        sqlite_mmap_mb=sqlite_mmap_mb,
+        sqlite_wal_autocheckpoint=sqlite_wal_autocheckpoint,
+        metrics_port=metrics_port,
+        metrics_host=str(raw.get("metrics_host", Config.metrics_host)),
+        profile_sample_rate=profile_sample_rate,
+        profile_mode=profile_mode,
+        profile_top=profile_top,
+        module_cache_size=module_cache_size,
     )
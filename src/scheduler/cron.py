@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import calendar
+from datetime import datetime, timedelta, timezone, tzinfo
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+_TZ_PREFIX = "CRON_TZ="
+_MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+_MONTH_NAMES = {name: index for index, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1
+)}
+_DAY_NAMES = {name: index for index, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+# (lowest, highest, names) per field: minute, hour, day of month, month, day of week.
+_FIELDS = (
+    (0, 59, {}),
+    (0, 23, {}),
+    (1, 31, {}),
+    (1, 12, _MONTH_NAMES),
+    (0, 7, _DAY_NAMES),
+)
+# Search at most one full leap-year cycle ahead before giving up.
+_MAX_YEARS = 28
+
+
+def _parse_value(text: str, names: dict[str, int]) -> int:
+    value = names.get(text.lower())
+    if value is not None:
+        return value
+    if not text.isdigit():
+        raise ValueError(f"invalid cron value: {text!r}")
+    return int(text)
+
+
+def _parse_field(text: str, lowest: int, highest: int, names: dict[str, int]) -> int:
+    mask = 0
+    for part in text.split(","):
+        base, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+        if step < 1 or (step_text and not step_text.isdigit()):
+            raise ValueError(f"invalid cron step: {part!r}")
+        if base == "*":
+            start, end = lowest, highest
+        elif "-" in base:
+            start_text, end_text = base.split("-", 1)
+            start, end = _parse_value(start_text, names), _parse_value(end_text, names)
+        else:
+            start = _parse_value(base, names)
+            end = highest if step_text else start
+        if not lowest <= start <= end <= highest:
+            raise ValueError(f"cron field out of range: {part!r}")
+        for value in range(start, end + 1, step):
+            mask |= 1 << value
+    return mask
+
+
+def _next_bit(mask: int, start: int) -> int | None:
+    # Lowest set bit at or above `start`.
+    remaining = mask >> start
+    if not remaining:
+        return None
+    return start + (remaining & -remaining).bit_length() - 1
+
+
+class CronTrigger:
+    # A five-field cron expression compiled into one bitmask per field, so the
+    # next fire time is found by jumping between set bits instead of walking
+    # minute by minute. Times are matched as wall-clock time in `timezone`.
+    def __init__(self, expression: str, timezone_name: str | None = None) -> None:
+        expression = " ".join(expression.split())
+        fields = _MACROS.get(expression.lower(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields, got {len(fields)}: {expression!r}")
+        masks = [_parse_field(text, *spec) for text, spec in zip(fields, _FIELDS)]
+        self.expression = expression
+        self.timezone_name = timezone_name
+        try:
+            self.tz: tzinfo = ZoneInfo(timezone_name) if timezone_name else timezone.utc
+        except (ZoneInfoNotFoundError, ValueError) as exc:
+            raise ValueError(f"unknown timezone: {timezone_name!r}") from exc
+        self.minutes, self.hours, self.days_of_month, self.months, days_of_week = masks
+        # 7 is an alias for Sunday.
+        self.days_of_week = (days_of_week | days_of_week >> 7) & 0x7F
+        # Vixie cron: when both day fields are restricted, either may match.
+        self._either_day = not fields[2].startswith("*") and not fields[4].startswith("*")
+        # Rejects dates that never exist, such as "0 0 31 2 *", up front.
+        self.next_fire(0)
+
+    @property
+    def spec(self) -> str:
+        if self.timezone_name:
+            return f"{_TZ_PREFIX}{self.timezone_name} {self.expression}"
+        return self.expression
+
+    def _days(self, year: int, month: int) -> int:
+        first_weekday, days_in_month = calendar.monthrange(year, month)
+        in_month = ((1 << days_in_month) - 1) << 1
+        # Rotate the weekday mask so bit 0 is the 1st of the month, then tile it over five weeks.
+        first = (first_weekday + 1) % 7
+        week = ((self.days_of_week >> first) | (self.days_of_week << (7 - first))) & 0x7F
+        by_weekday = (week | week << 7 | week << 14 | week << 21 | week << 28) << 1
+        by_date = self.days_of_month & in_month
+        if self._either_day:
+            return (by_date | by_weekday) & in_month
+        return by_date & by_weekday & in_month
+
+    def next_fire(self, after_epoch: int) -> int:
+        # First matching minute strictly after `after_epoch`. Wall times skipped
+        # by a DST jump fire shifted by the jump; repeated wall times fire once.
+        start = datetime.fromtimestamp(after_epoch, self.tz).replace(second=0, microsecond=0)
+        start += timedelta(minutes=1)
+        year, month, day, hour, minute = start.year, start.month, start.day, start.hour, start.minute
+        last_year = year + _MAX_YEARS
+        while year <= last_year:
+            found = _next_bit(self.months, month)
+            if found is None:
+                year, month, day, hour, minute = year + 1, _next_bit(self.months, 1), 1, 0, 0
+                continue
+            if found != month:
+                month, day, hour, minute = found, 1, 0, 0
+            found = _next_bit(self._days(year, month), day)
+            if found is None:
+                month, day, hour, minute = month + 1, 1, 0, 0
+                continue
+            if found != day:
+                day, hour, minute = found, 0, 0
+            found = _next_bit(self.hours, hour)
+            if found is None:
+                day, hour, minute = day + 1, 0, 0
+                continue
+            if found != hour:
+                hour, minute = found, 0
+            found = _next_bit(self.minutes, minute)
+            if found is None:
+                hour, minute = hour + 1, 0
+                continue
+            minute = found
+            candidate = int(datetime(year, month, day, hour, minute, tzinfo=self.tz).timestamp())
+            if candidate > after_epoch:
+                return candidate
+            minute += 1
+        raise ValueError(f"cron expression never fires: {self.spec!r}")
+
+
+@lru_cache(maxsize=1024)
+def compile_trigger(spec: str) -> CronTrigger:
+    timezone_name = None
+    if spec.startswith(_TZ_PREFIX):
+        timezone_name, _, spec = spec[len(_TZ_PREFIX):].partition(" ")
+    return CronTrigger(spec, timezone_name)
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields
+import hashlib
+import inspect
+import json
 from pathlib import Path
+import random
 import sqlite3
 import time
-from typing import Iterable
+from typing import Iterable, Iterator
+
+from scheduler.cron import compile_trigger
 
 
 @dataclass(frozen=True)
@@ -17,13 +24,246 @@ class ScheduledFunction:
     enabled: int
     last_run_at: int | None
     next_run_at: int
+    is_async: int = 0
+    timeout_seconds: int | None = None
+    max_instances: int = 1
+    overlap: str = "queue"
+    misfire: str = "coalesce"
+    misfire_grace_seconds: int | None = None
+    max_catch_up: int = 10
+    fixed_rate: int = 0
+    jitter_seconds: int = 0
+    trigger: str | None = None
+    lease_owner: str | None = None
+    lease_expires_at: int | None = None
+    profile: str | None = None
 
 
-def init_db(path: Path) -> sqlite3.Connection:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(path)
-    conn.execute("PRAGMA journal_mode=WAL;")
-    conn.execute(
+@dataclass(frozen=True)
+class DiscoveredFunction:
+    qualname: str
+    interval_seconds: int
+    is_async: bool = False
+    timeout_seconds: int | None = None
+    max_instances: int = 1
+    overlap: str = "queue"
+    misfire: str = "coalesce"
+    misfire_grace_seconds: int | None = None
+    max_catch_up: int = 10
+    fixed_rate: bool = False
+    jitter_seconds: int = 0
+    trigger: str | None = None
+
+    @classmethod
+    def from_callable(cls, qualname: str, func) -> DiscoveredFunction:
+        return cls(
+            qualname=qualname,
+            interval_seconds=int(func.__scheduler_interval_seconds__),
+            is_async=inspect.iscoroutinefunction(func),
+            timeout_seconds=getattr(func, "__scheduler_timeout_seconds__", None),
+            max_instances=getattr(func, "__scheduler_max_instances__", 1),
+            overlap=getattr(func, "__scheduler_overlap__", "queue"),
+            misfire=getattr(func, "__scheduler_misfire__", "coalesce"),
+            misfire_grace_seconds=getattr(func, "__scheduler_misfire_grace_seconds__", None),
+            max_catch_up=getattr(func, "__scheduler_max_catch_up__", 10),
+            fixed_rate=getattr(func, "__scheduler_fixed_rate__", False),
+            jitter_seconds=getattr(func, "__scheduler_jitter_seconds__", 0),
+            trigger=getattr(func, "__scheduler_trigger__", None),
+        )
+
+    def to_json(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_json(cls, data: dict | list) -> DiscoveredFunction:
+        if isinstance(data, list):  # scanned_files rows written before options existed
+            qualname, interval_seconds = data
+            return cls(qualname=str(qualname), interval_seconds=int(interval_seconds))
+        known = {field.name for field in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+
+@dataclass(frozen=True)
+class SQLiteTuning:
+    # Per-connection pragmas. NORMAL is durable enough with WAL: a power loss
+    # can drop the last commits but never corrupts the database.
+    synchronous: str = "NORMAL"
+    busy_timeout_ms: int = 5000
+    mmap_size_bytes: int = 0
+    wal_autocheckpoint_pages: int = 1000
+
+
+@dataclass(frozen=True)
+class ScannedFile:
+    path: str
+    mtime_ns: int
+    size: int
+    content_hash: str
+    functions: list[DiscoveredFunction]
+    error_type: str | None
+    scanned_at: int
+
+    @classmethod
+    def from_row(cls, row: tuple) -> ScannedFile:
+        path, mtime_ns, size, content_hash, functions_json, error_type, scanned_at = row
+        functions = [DiscoveredFunction.from_json(item) for item in json.loads(functions_json)]
+        return cls(path, mtime_ns, size, content_hash, functions, error_type, scanned_at)
+
+
+_UPSERT_SCHEDULED_FUNCTION_SQL = """
+    INSERT INTO scheduled_functions
+        (module_path, qualname, interval_seconds, last_discovered_at, enabled, last_run_at, next_run_at,
+         is_async, timeout_seconds, max_instances, overlap, misfire, misfire_grace_seconds, max_catch_up, fixed_rate,
+         jitter_seconds, trigger)
+    VALUES
+        (?, ?, ?, ?, 1, NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(module_path, qualname) DO UPDATE SET
+        last_discovered_at=excluded.last_discovered_at,
+        is_async=excluded.is_async,
+        timeout_seconds=excluded.timeout_seconds,
+        max_instances=excluded.max_instances,
+        overlap=excluded.overlap,
+        misfire=excluded.misfire,
+        misfire_grace_seconds=excluded.misfire_grace_seconds,
+        max_catch_up=excluded.max_catch_up,
+        fixed_rate=excluded.fixed_rate,
+        jitter_seconds=excluded.jitter_seconds,
+        next_run_at=CASE
+            WHEN scheduled_functions.interval_seconds = excluded.interval_seconds
+                AND scheduled_functions.trigger IS excluded.trigger
+            THEN scheduled_functions.next_run_at
+            ELSE excluded.next_run_at
+        END,
+        interval_seconds=excluded.interval_seconds,
+        trigger=excluded.trigger
+"""
+
+_SCHEDULED_FUNCTION_COLUMNS = """
+    id, module_path, qualname, interval_seconds, last_discovered_at,
+    enabled, last_run_at, next_run_at, is_async, timeout_seconds, max_instances, overlap,
+    misfire, misfire_grace_seconds, max_catch_up, fixed_rate, jitter_seconds, trigger,
+    lease_owner, lease_expires_at, profile
+"""
+
+# Columns whose changes move scheduled_functions.change_seq.
+CHANGE_TRACKED_COLUMNS = (
+    "module_path", "qualname", "interval_seconds", "enabled", "last_run_at", "next_run_at",
+    "is_async", "timeout_seconds", "max_instances", "overlap", "misfire", "misfire_grace_seconds",
+    "max_catch_up", "fixed_rate", "jitter_seconds", "trigger", "profile",
+)
+
+# Claims due rows that are unleased, already leased by the caller, or whose
+# lease has expired (a crashed runner). One UPDATE, so concurrent runners can
+# never claim the same row.
+_CLAIM_DUE_FUNCTIONS_SQL = f"""
+    UPDATE scheduled_functions
+    SET lease_owner = :owner, lease_expires_at = :expires_at
+    WHERE id IN (
+        SELECT id FROM scheduled_functions
+        WHERE enabled = 1 AND next_run_at <= :now
+          AND (lease_owner IS NULL OR lease_owner = :owner OR lease_expires_at <= :now)
+          AND (:ids IS NULL OR id IN (SELECT value FROM json_each(:ids)))
+        ORDER BY next_run_at
+        LIMIT :limit
+    )
+    RETURNING {_SCHEDULED_FUNCTION_COLUMNS}
+"""
+
+_INSERT_RUN_LOG_SQL = """
+    INSERT INTO run_logs (scheduled_function_id, started_at, finished_at, status, error_message)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+# Runner-written rows also carry timings; older rows leave these NULL.
+_INSERT_TIMED_RUN_LOG_SQL = """
+    INSERT INTO run_logs
+        (scheduled_function_id, started_at, finished_at, status, error_message,
+         started_at_ms, duration_ns, cpu_ns, lag_ms)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_INSERT_SCAN_ERROR_SQL = """
+    INSERT INTO scan_errors (file_path, error_type, error_message, occurred_at)
+    VALUES (?, ?, ?, ?)
+"""
+
+_UPSERT_SCANNED_FILE_SQL = """
+    INSERT INTO scanned_files (path, mtime_ns, size, content_hash, functions_json, error_type, scanned_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(path) DO UPDATE SET
+        mtime_ns=excluded.mtime_ns,
+        size=excluded.size,
+        content_hash=excluded.content_hash,
+        functions_json=excluded.functions_json,
+        error_type=excluded.error_type,
+        scanned_at=excluded.scanned_at
+"""
+
+_DELETE_STALE_FUNCTIONS_SQL = """
+    DELETE FROM scheduled_functions
+    WHERE module_path = ? AND qualname NOT IN (SELECT value FROM json_each(?))
+"""
+
+_INSERT_SCAN_RUN_SQL = """
+    INSERT INTO scan_runs
+        (started_at, finished_at, duration_ms, files_scanned, files_changed, discovered, errors, kind)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_DELETE_SCANNED_FILE_SQL = "DELETE FROM scanned_files WHERE path = ?"
+
+_MARK_RUN_SQL = "UPDATE scheduled_functions SET last_run_at = ? WHERE id = ?"
+
+_RELEASE_LEASE_SQL = """
+    UPDATE scheduled_functions SET lease_owner = NULL, lease_expires_at = NULL
+    WHERE id = ? AND lease_owner = ?
+"""
+
+_INSERT_RUN_PROFILE_SQL = "INSERT INTO run_profiles (scheduled_function_id, started_at, stats) VALUES (?, ?, ?)"
+
+_SET_NEXT_RUN_SQL = "UPDATE scheduled_functions SET next_run_at = ?, lease_owner = ?, lease_expires_at = ? WHERE id = ?"
+
+
+@dataclass(frozen=True)
+class Statements:
+    # The SQL behind WriteBuffer's helpers; every store dialect supplies the
+    # same statements with the same parameters.
+    upsert_scheduled_function: str
+    insert_run_log: str
+    insert_scan_error: str
+    upsert_scanned_file: str
+    delete_stale_functions: str
+    insert_scan_run: str
+    delete_scanned_file: str
+    mark_run: str
+    release_lease: str
+    insert_run_profile: str
+
+
+SQLITE_STATEMENTS = Statements(
+    upsert_scheduled_function=_UPSERT_SCHEDULED_FUNCTION_SQL,
+    insert_run_log=_INSERT_TIMED_RUN_LOG_SQL,
+    insert_scan_error=_INSERT_SCAN_ERROR_SQL,
+    upsert_scanned_file=_UPSERT_SCANNED_FILE_SQL,
+    delete_stale_functions=_DELETE_STALE_FUNCTIONS_SQL,
+    insert_scan_run=_INSERT_SCAN_RUN_SQL,
+    delete_scanned_file=_DELETE_SCANNED_FILE_SQL,
+    mark_run=_MARK_RUN_SQL,
+    release_lease=_RELEASE_LEASE_SQL,
+    insert_run_profile=_INSERT_RUN_PROFILE_SQL,
+)
+
+# id(conn) -> nesting depth of open transaction() blocks on that connection.
+_transaction_depth: dict[int, int] = {}
+
+
+# Each entry is one schema version; PRAGMA user_version records how many have
+# been applied. Append new migrations, never edit applied ones.
+_MIGRATIONS: list[tuple[str, ...]] = [
+    (
         """
         CREATE TABLE IF NOT EXISTS scheduled_functions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -36,9 +276,7 @@ def init_db(path: Path) -> sqlite3.Connection:
             next_run_at INTEGER NOT NULL,
             UNIQUE(module_path, qualname)
         );
-        """
-    )
-    conn.execute(
+        """,
         """
         CREATE TABLE IF NOT EXISTS run_logs (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -49,9 +287,7 @@ def init_db(path: Path) -> sqlite3.Connection:
             error_message TEXT,
             FOREIGN KEY (scheduled_function_id) REFERENCES scheduled_functions(id)
         );
-        """
-    )
-    conn.execute(
+        """,
         """
         CREATE TABLE IF NOT EXISTS scan_errors (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -60,41 +296,456 @@ def init_db(path: Path) -> sqlite3.Connection:
             error_message TEXT NOT NULL,
             occurred_at INTEGER NOT NULL
         );
+        """,
         """
-    )
-    conn.commit()
+        CREATE TABLE IF NOT EXISTS scanned_files (
+            path TEXT PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            functions_json TEXT NOT NULL,
+            error_type TEXT,
+            scanned_at INTEGER NOT NULL
+        );
+        """,
+    ),
+    (
+        "CREATE INDEX IF NOT EXISTS idx_scheduled_functions_due ON scheduled_functions(enabled, next_run_at);",
+        "CREATE INDEX IF NOT EXISTS idx_run_logs_started_status ON run_logs(started_at, status);",
+    ),
+    (
+        """
+        CREATE TABLE IF NOT EXISTS run_log_rollups (
+            granularity TEXT NOT NULL,
+            bucket_start INTEGER NOT NULL,
+            scheduled_function_id INTEGER NOT NULL,
+            run_count INTEGER NOT NULL,
+            failure_count INTEGER NOT NULL,
+            total_duration_seconds INTEGER NOT NULL,
+            max_duration_seconds INTEGER NOT NULL,
+            PRIMARY KEY (granularity, bucket_start, scheduled_function_id)
+        ) WITHOUT ROWID;
+        """,
+    ),
+    (
+        """
+        CREATE TABLE IF NOT EXISTS scan_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at INTEGER NOT NULL,
+            finished_at INTEGER NOT NULL,
+            duration_ms INTEGER NOT NULL,
+            files_scanned INTEGER NOT NULL,
+            files_changed INTEGER NOT NULL,
+            discovered INTEGER NOT NULL,
+            errors INTEGER NOT NULL
+        );
+        """,
+    ),
+    ("ALTER TABLE scheduled_functions ADD COLUMN is_async INTEGER NOT NULL DEFAULT 0;",),
+    ("ALTER TABLE scheduled_functions ADD COLUMN timeout_seconds INTEGER;",),
+    (
+        "ALTER TABLE scheduled_functions ADD COLUMN max_instances INTEGER NOT NULL DEFAULT 1;",
+        "ALTER TABLE scheduled_functions ADD COLUMN overlap TEXT NOT NULL DEFAULT 'queue';",
+    ),
+    (
+        "ALTER TABLE scheduled_functions ADD COLUMN misfire TEXT NOT NULL DEFAULT 'coalesce';",
+        "ALTER TABLE scheduled_functions ADD COLUMN misfire_grace_seconds INTEGER;",
+        "ALTER TABLE scheduled_functions ADD COLUMN max_catch_up INTEGER NOT NULL DEFAULT 10;",
+        "ALTER TABLE scheduled_functions ADD COLUMN fixed_rate INTEGER NOT NULL DEFAULT 0;",
+    ),
+    ("ALTER TABLE scheduled_functions ADD COLUMN jitter_seconds INTEGER NOT NULL DEFAULT 0;",),
+    ("ALTER TABLE scheduled_functions ADD COLUMN trigger TEXT;",),
+    (
+        "ALTER TABLE scheduled_functions ADD COLUMN lease_owner TEXT;",
+        "ALTER TABLE scheduled_functions ADD COLUMN lease_expires_at INTEGER;",
+    ),
+    (
+        "ALTER TABLE run_logs ADD COLUMN started_at_ms INTEGER;",
+        "ALTER TABLE run_logs ADD COLUMN duration_ns INTEGER;",
+        "ALTER TABLE run_logs ADD COLUMN cpu_ns INTEGER;",
+        "ALTER TABLE run_logs ADD COLUMN lag_ms INTEGER;",
+    ),
+    (
+        "ALTER TABLE scheduled_functions ADD COLUMN profile TEXT;",
+        """
+        CREATE TABLE IF NOT EXISTS run_profiles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            scheduled_function_id INTEGER NOT NULL,
+            started_at INTEGER NOT NULL,
+            stats BLOB NOT NULL
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_run_profiles_function ON run_profiles (scheduled_function_id, started_at);",
+    ),
+    # change_seq increases on every insert and on every change the TUI shows,
+    # so it can fetch only the functions changed since its last refresh.
+    (
+        "ALTER TABLE scheduled_functions ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0;",
+        "CREATE INDEX IF NOT EXISTS idx_scheduled_functions_change_seq ON scheduled_functions (change_seq);",
+        """
+        CREATE TRIGGER IF NOT EXISTS scheduled_functions_inserted AFTER INSERT ON scheduled_functions
+        BEGIN
+            UPDATE scheduled_functions SET change_seq = (SELECT MAX(change_seq) FROM scheduled_functions) + 1
+            WHERE id = NEW.id;
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS scheduled_functions_updated AFTER UPDATE ON scheduled_functions
+        WHEN OLD.next_run_at IS NOT NEW.next_run_at
+            OR OLD.last_run_at IS NOT NEW.last_run_at
+            OR OLD.enabled IS NOT NEW.enabled
+            OR OLD.qualname IS NOT NEW.qualname
+        BEGIN
+            UPDATE scheduled_functions SET change_seq = (SELECT MAX(change_seq) FROM scheduled_functions) + 1
+            WHERE id = NEW.id;
+        END;
+        """,
+    ),
+    # 'full' for scans of every scan path, 'files' for watcher batches, so
+    # "Last scan" only reports full scans.
+    (
+        "ALTER TABLE scan_runs ADD COLUMN kind TEXT NOT NULL DEFAULT 'full';",
+        "CREATE INDEX IF NOT EXISTS idx_scan_runs_kind ON scan_runs (kind, id);",
+    ),
+    # Runners fetch changed rows by change_seq too, so it also moves for every
+    # setting they schedule by. Leases and discovery times still do not.
+    (
+        "DROP TRIGGER IF EXISTS scheduled_functions_updated;",
+        f"""
+        CREATE TRIGGER scheduled_functions_updated AFTER UPDATE ON scheduled_functions
+        WHEN {" OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in CHANGE_TRACKED_COLUMNS)}
+        BEGIN
+            UPDATE scheduled_functions SET change_seq = (SELECT MAX(change_seq) FROM scheduled_functions) + 1
+            WHERE id = NEW.id;
+        END;
+        """,
+    ),
+]
+
+SCHEMA_VERSION = len(_MIGRATIONS)
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+
+def _check_schema_version(current: int) -> None:
+    if current > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"database schema version {current} is newer than supported version {SCHEMA_VERSION}"
+        )
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    _check_schema_version(schema_version(conn))
+    while schema_version(conn) < SCHEMA_VERSION:
+        # Several processes may open an old database at once: each step takes
+        # the write lock first and re-reads the version under it, so a step
+        # another process already applied is skipped.
+        conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = schema_version(conn)
+            _check_schema_version(current)
+            if current < SCHEMA_VERSION:
+                for statement in _MIGRATIONS[current]:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {current + 1}")
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+    return SCHEMA_VERSION
+
+
+def _apply_tuning(conn: sqlite3.Connection, tuning: SQLiteTuning) -> None:
+    conn.execute(f"PRAGMA busy_timeout = {int(tuning.busy_timeout_ms)};")
+    conn.execute(f"PRAGMA mmap_size = {int(tuning.mmap_size_bytes)};")
+
+
+def init_db(path: Path, tuning: SQLiteTuning | None = None) -> sqlite3.Connection:
+    tuning = tuning or SQLiteTuning()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    # Before anything that takes a lock, so processes opening the database
+    # together wait for each other instead of failing.
+    _apply_tuning(conn, tuning)
+    if conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+        # Only takes effect before the first table exists; lets retention
+        # hand freed pages back with PRAGMA incremental_vacuum.
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute(f"PRAGMA synchronous = {tuning.synchronous};")
+    conn.execute(f"PRAGMA wal_autocheckpoint = {int(tuning.wal_autocheckpoint_pages)};")
+    migrate(conn)
+    return conn
+
+
+def connect_readonly(path: Path, tuning: SQLiteTuning | None = None) -> sqlite3.Connection:
+    # For the TUI and reports: never runs DDL, never takes the write lock, so
+    # it cannot hold up the runner. The schema must already exist. Queries
+    # are fixed SQL strings, so sqlite3's statement cache prepares each once.
+    conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+    _apply_tuning(conn, tuning or SQLiteTuning())
+    conn.execute("PRAGMA query_only = ON;")
+    current = schema_version(conn)
+    if current != SCHEMA_VERSION:
+        conn.close()
+        raise RuntimeError(
+            f"database schema version {current} does not match version {SCHEMA_VERSION}; "
+            "run `scheduler scan` to migrate it"
+        )
     return conn
 
 
+def explain_query_plan(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> list[str]:
+    return [str(row[-1]) for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    # Groups every write inside the block into one commit; the per-row helpers
+    # below skip their own commit while a transaction block is open.
+    key = id(conn)
+    _transaction_depth[key] = _transaction_depth.get(key, 0) + 1
+    try:
+        yield conn
+    except BaseException:
+        if _leave_transaction(key):
+            conn.rollback()
+        raise
+    else:
+        if _leave_transaction(key):
+            conn.commit()
+
+
+def _leave_transaction(key: int) -> bool:
+    depth = _transaction_depth[key] - 1
+    if depth:
+        _transaction_depth[key] = depth
+        return False
+    del _transaction_depth[key]
+    return True
+
+
+def _commit(conn: sqlite3.Connection) -> None:
+    if id(conn) not in _transaction_depth:
+        conn.commit()
+
+
+class WriteBuffer:
+    # Queues writes and applies them with executemany in a single transaction,
+    # flushed once max_rows are pending or the oldest pending write is
+    # max_delay_seconds old. Statement order is preserved across flushes.
+    statements = SQLITE_STATEMENTS
+
+    def __init__(self, conn: sqlite3.Connection, max_rows: int = 500, max_delay_seconds: float = 1.0) -> None:
+        self.conn = conn
+        self.max_rows = max_rows
+        self.max_delay_seconds = max_delay_seconds
+        self._batches: list[tuple[str, list[tuple]]] = []
+        self._pending = 0
+        self._oldest: float | None = None
+
+    def __enter__(self) -> WriteBuffer:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.flush()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def add(self, sql: str, params: tuple) -> None:
+        if self._batches and self._batches[-1][0] == sql:
+            self._batches[-1][1].append(params)
+        else:
+            self._batches.append((sql, [params]))
+        self._pending += 1
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        if self._pending >= self.max_rows:
+            self.flush()
+
+    def flush_if_due(self) -> int:
+        if self._oldest is not None and time.monotonic() - self._oldest >= self.max_delay_seconds:
+            return self.flush()
+        return 0
+
+    def flush(self) -> int:
+        if not self._batches:
+            return 0
+        batches, flushed = self._batches, self._pending
+        self._batches, self._pending, self._oldest = [], 0, None
+        self._apply(batches)
+        return flushed
+
+    def _apply(self, batches: list[tuple[str, list[tuple]]]) -> None:
+        with transaction(self.conn):
+            for sql, rows in batches:
+                self.conn.executemany(sql, rows)
+
+    def upsert_scheduled_function(self, module_path: str, function: DiscoveredFunction, spread: bool = False) -> None:
+        self.add(self.statements.upsert_scheduled_function, _scheduled_function_row(module_path, function, spread))
+
+    def record_run_log(
+        self,
+        scheduled_function_id: int,
+        started_at: int,
+        finished_at: int,
+        status: str,
+        error_message: str | None,
+        started_at_ms: int | None = None,
+        duration_ns: int | None = None,
+        cpu_ns: int | None = None,
+        lag_ms: int | None = None,
+    ) -> None:
+        self.add(
+            self.statements.insert_run_log,
+            (
+                scheduled_function_id,
+                started_at,
+                finished_at,
+                status,
+                error_message,
+                started_at_ms,
+                duration_ns,
+                cpu_ns,
+                lag_ms,
+            ),
+        )
+
+    def mark_run(self, scheduled_function_id: int, finished_at: int) -> None:
+        self.add(self.statements.mark_run, (finished_at, scheduled_function_id))
+
+    def release_lease(self, scheduled_function_id: int, owner: str) -> None:
+        self.add(self.statements.release_lease, (scheduled_function_id, owner))
+
+    def record_run_profile(self, scheduled_function_id: int, started_at: int, stats: bytes) -> None:
+        self.add(self.statements.insert_run_profile, (scheduled_function_id, started_at, stats))
+
+    def record_scan_error(self, file_path: str, error_type: str, error_message: str) -> None:
+        self.add(self.statements.insert_scan_error, (file_path, error_type, error_message, int(time.time())))
+
+    def upsert_scanned_file(
+        self,
+        path: str,
+        mtime_ns: int,
+        size: int,
+        content_hash: str,
+        functions: list[DiscoveredFunction],
+        error_type: str | None = None,
+    ) -> None:
+        self.add(
+            self.statements.upsert_scanned_file,
+            (path, mtime_ns, size, content_hash, _functions_json(functions), error_type, int(time.time())),
+        )
+
+    def delete_stale_functions(self, module_path: str, keep_qualnames: Iterable[str]) -> None:
+        self.add(self.statements.delete_stale_functions, (module_path, json.dumps(sorted(set(keep_qualnames)))))
+
+    def record_scan_run(
+        self,
+        started_at: int,
+        duration_ms: int,
+        files_scanned: int,
+        files_changed: int,
+        discovered: int,
+        errors: int,
+        kind: str = "full",
+    ) -> None:
+        self.add(
+            self.statements.insert_scan_run,
+            (started_at, int(time.time()), duration_ms, files_scanned, files_changed, discovered, errors, kind),
+        )
+
+    def delete_scanned_file(self, path: str) -> None:
+        self.add(self.statements.delete_scanned_file, (path,))
+        self.delete_stale_functions(path, ())
+
+
+def stagger_offset(module_path: str, qualname: str, interval_seconds: int) -> int:
+    # Stable across processes and restarts, unlike hash().
+    digest = hashlib.blake2b(f"{module_path}\0{qualname}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % max(interval_seconds, 1)
+
+
+def first_run_at(module_path: str, function: DiscoveredFunction, now: int, spread: bool = False) -> int:
+    interval = max(function.interval_seconds, 1)
+    if function.trigger:
+        start = compile_trigger(function.trigger).next_fire(now)
+    elif spread:
+        # The next slot on an epoch-aligned grid shifted by a per-job offset,
+        # so jobs sharing an interval are spread evenly across it.
+        start = now - now % interval + stagger_offset(module_path, function.qualname, interval)
+        if start <= now:
+            start += interval
+    else:
+        start = now + interval
+    if function.jitter_seconds:
+        start += random.randint(0, function.jitter_seconds)
+    return start
+
+
+def _scheduled_function_row(module_path: str, function: DiscoveredFunction, spread: bool = False) -> tuple:
+    now = int(time.time())
+    return (
+        module_path,
+        function.qualname,
+        function.interval_seconds,
+        now,
+        first_run_at(module_path, function, now, spread),
+        int(function.is_async),
+        function.timeout_seconds,
+        function.max_instances,
+        function.overlap,
+        function.misfire,
+        function.misfire_grace_seconds,
+        function.max_catch_up,
+        int(function.fixed_rate),
+        function.jitter_seconds,
+        function.trigger,
+    )
+
+
+def _functions_json(functions: list[DiscoveredFunction]) -> str:
+    return json.dumps([function.to_json() for function in functions])
+
+
 def upsert_scheduled_function(
     conn: sqlite3.Connection,
     module_path: str,
     qualname: str,
     interval_seconds: int,
+    *,
+    spread: bool = False,
+    **options,
 ) -> int:
-    now = int(time.time())
-    next_run_at = now + interval_seconds
+    # options are the remaining DiscoveredFunction fields, e.g. is_async=True.
     cursor = conn.execute(
-        """
-        INSERT INTO scheduled_functions
-            (module_path, qualname, interval_seconds, last_discovered_at, enabled, last_run_at, next_run_at)
-        VALUES
-            (?, ?, ?, ?, 1, NULL, ?)
-        ON CONFLICT(module_path, qualname) DO UPDATE SET
-            interval_seconds=excluded.interval_seconds,
-            last_discovered_at=excluded.last_discovered_at,
-            next_run_at=excluded.next_run_at
-        RETURNING id;
-        """,
-        (module_path, qualname, interval_seconds, now, next_run_at),
+        _UPSERT_SCHEDULED_FUNCTION_SQL + " RETURNING id;",
+        _scheduled_function_row(module_path, DiscoveredFunction(qualname, interval_seconds, **options), spread),
     )
     row = cursor.fetchone()
     if row is None:
         raise RuntimeError("failed to upsert scheduled function")
-    conn.commit()
+    _commit(conn)
     return int(row[0])
 
 
+def upsert_scheduled_functions(conn: sqlite3.Connection, rows: Iterable[tuple[str, str, int]]) -> None:
+    conn.executemany(
+        _UPSERT_SCHEDULED_FUNCTION_SQL,
+        (
+            _scheduled_function_row(module_path, DiscoveredFunction(qualname, interval_seconds))
+            for module_path, qualname, interval_seconds in rows
+        ),
+    )
+    _commit(conn)
+
+
 def record_run_log(
     conn: sqlite3.Connection,
     scheduled_function_id: int,
@@ -103,14 +754,12 @@ def record_run_log(
     status: str,
     error_message: str | None,
 ) -> None:
-    conn.execute(
-        """
-        INSERT INTO run_logs (scheduled_function_id, started_at, finished_at, status, error_message)
-        VALUES (?, ?, ?, ?, ?)
-        """,
-        (scheduled_function_id, started_at, finished_at, status, error_message),
-    )
-    conn.commit()
+    record_run_logs(conn, [(scheduled_function_id, started_at, finished_at, status, error_message)])
+
+
+def record_run_logs(conn: sqlite3.Connection, rows: Iterable[tuple[int, int, int, str, str | None]]) -> None:
+    conn.executemany(_INSERT_RUN_LOG_SQL, rows)
+    _commit(conn)
 
 
 def record_scan_error(
@@ -119,21 +768,19 @@ def record_scan_error(
     error_type: str,
     error_message: str,
 ) -> None:
-    conn.execute(
-        """
-        INSERT INTO scan_errors (file_path, error_type, error_message, occurred_at)
-        VALUES (?, ?, ?, ?)
-        """,
-        (file_path, error_type, error_message, int(time.time())),
-    )
-    conn.commit()
+    record_scan_errors(conn, [(file_path, error_type, error_message)])
+
+
+def record_scan_errors(conn: sqlite3.Connection, rows: Iterable[tuple[str, str, str]]) -> None:
+    now = int(time.time())
+    conn.executemany(_INSERT_SCAN_ERROR_SQL, ((*row, now) for row in rows))
+    _commit(conn)
 
 
 def fetch_due_functions(conn: sqlite3.Connection, now_epoch: int) -> list[ScheduledFunction]:
     cursor = conn.execute(
-        """
-        SELECT id, module_path, qualname, interval_seconds, last_discovered_at,
-               enabled, last_run_at, next_run_at
+        f"""
+        SELECT {_SCHEDULED_FUNCTION_COLUMNS}
         FROM scheduled_functions
         WHERE enabled = 1 AND next_run_at <= ?
         ORDER BY next_run_at ASC;
@@ -143,13 +790,134 @@ def fetch_due_functions(conn: sqlite3.Connection, now_epoch: int) -> list[Schedu
     return [ScheduledFunction(*row) for row in cursor.fetchall()]
 
 
+def claim_due_functions(
+    conn: sqlite3.Connection,
+    owner: str,
+    now_epoch: int,
+    lease_seconds: int,
+    ids: Iterable[int] | None = None,
+    limit: int = 1000,
+) -> list[ScheduledFunction]:
+    # Leases a batch of due functions to `owner`. Rows another runner holds a
+    # live lease on, or has already advanced past now, are not returned.
+    cursor = conn.execute(
+        _CLAIM_DUE_FUNCTIONS_SQL,
+        {
+            "owner": owner,
+            "expires_at": now_epoch + lease_seconds,
+            "now": now_epoch,
+            "ids": None if ids is None else json.dumps(list(ids)),
+            "limit": limit,
+        },
+    )
+    claimed = [ScheduledFunction(*row) for row in cursor.fetchall()]
+    _commit(conn)
+    return sorted(claimed, key=lambda scheduled: (scheduled.next_run_at, scheduled.id))
+
+
+def set_next_runs(conn: sqlite3.Connection, rows: Iterable[tuple[int, str | None, int | None, int]]) -> None:
+    # (next_run_at, lease_owner, lease_expires_at, id) per claimed function.
+    conn.executemany(_SET_NEXT_RUN_SQL, rows)
+    _commit(conn)
+
+
+def renew_leases(conn: sqlite3.Connection, owner: str, expires_at: int) -> int:
+    cursor = conn.execute(
+        "UPDATE scheduled_functions SET lease_expires_at = ? WHERE lease_owner = ?",
+        (expires_at, owner),
+    )
+    _commit(conn)
+    return cursor.rowcount
+
+
+def set_profile(conn: sqlite3.Connection, module_path: str, qualname: str, mode: str | None) -> int:
+    # Profiles every run of the function (cpu, memory or both), or stops (None).
+    cursor = conn.execute(
+        "UPDATE scheduled_functions SET profile = ? WHERE module_path = ? AND qualname = ?",
+        (mode, module_path, qualname),
+    )
+    _commit(conn)
+    return cursor.rowcount
+
+
+def release_leases(conn: sqlite3.Connection, owner: str) -> int:
+    cursor = conn.execute(
+        "UPDATE scheduled_functions SET lease_owner = NULL, lease_expires_at = NULL WHERE lease_owner = ?",
+        (owner,),
+    )
+    _commit(conn)
+    return cursor.rowcount
+
+
 def list_scheduled_functions(conn: sqlite3.Connection) -> list[ScheduledFunction]:
     cursor = conn.execute(
-        """
-        SELECT id, module_path, qualname, interval_seconds, last_discovered_at,
-               enabled, last_run_at, next_run_at
+        f"""
+        SELECT {_SCHEDULED_FUNCTION_COLUMNS}
         FROM scheduled_functions
         ORDER BY qualname ASC;
         """
     )
     return [ScheduledFunction(*row) for row in cursor.fetchall()]
+
+
+def list_scheduled_functions_changed(
+    conn: sqlite3.Connection, after_seq: int
+) -> list[tuple[int, ScheduledFunction]]:
+    # (change_seq, function) for functions added or changed after the given
+    # change_seq, oldest change first.
+    cursor = conn.execute(
+        f"""
+        SELECT change_seq, {_SCHEDULED_FUNCTION_COLUMNS}
+        FROM scheduled_functions
+        WHERE change_seq > ?
+        ORDER BY change_seq ASC;
+        """,
+        (after_seq,),
+    )
+    return [(row[0], ScheduledFunction(*row[1:])) for row in cursor.fetchall()]
+
+
+def fetch_scanned_files(conn: sqlite3.Connection) -> dict[str, ScannedFile]:
+    cursor = conn.execute(
+        """
+        SELECT path, mtime_ns, size, content_hash, functions_json, error_type, scanned_at
+        FROM scanned_files;
+        """
+    )
+    return {row[0]: ScannedFile.from_row(row) for row in cursor.fetchall()}
+
+
+def upsert_scanned_file(
+    conn: sqlite3.Connection,
+    path: str,
+    mtime_ns: int,
+    size: int,
+    content_hash: str,
+    functions: list[DiscoveredFunction],
+    error_type: str | None = None,
+) -> None:
+    conn.execute(
+        _UPSERT_SCANNED_FILE_SQL,
+        (path, mtime_ns, size, content_hash, _functions_json(functions), error_type, int(time.time())),
+    )
+    _commit(conn)
+
+
+def delete_stale_functions(conn: sqlite3.Connection, module_path: str, keep_qualnames: Iterable[str]) -> int:
+    cursor = conn.execute(
+        _DELETE_STALE_FUNCTIONS_SQL,
+        (module_path, json.dumps(sorted(set(keep_qualnames)))),
+    )
+    _commit(conn)
+    return cursor.rowcount
+
+
+def delete_scanned_file(conn: sqlite3.Connection, path: str) -> int:
+    with transaction(conn):
+        conn.execute(_DELETE_SCANNED_FILE_SQL, (path,))
+        return delete_stale_functions(conn, path, ())
+
+
+def data_version(conn: sqlite3.Connection) -> int:
+    # Changes whenever another connection commits to the database file.
+    return int(conn.execute("PRAGMA data_version").fetchone()[0])
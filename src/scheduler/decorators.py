@@ -1,16 +1,66 @@
 from __future__ import annotations
 
 from datetime import timedelta
+import math
 from typing import Callable, TypeVar
 
+from scheduler.cron import CronTrigger
+
 TFunc = TypeVar("TFunc", bound=Callable[..., object])
 
+OVERLAP_POLICIES = ("queue", "skip", "replace")
+MISFIRE_POLICIES = ("coalesce", "all", "skip")
+
+
+def _whole_seconds(value: timedelta | None) -> int | None:
+    return None if value is None else max(1, math.ceil(value.total_seconds()))
+
 
-def schedule(interval: timedelta) -> Callable[[TFunc], TFunc]:
-    seconds = int(interval.total_seconds())
+def schedule(
+    interval: timedelta | None = None,
+    timeout: timedelta | None = None,
+    max_instances: int = 1,
+    overlap: str = "queue",
+    misfire: str = "coalesce",
+    misfire_grace: timedelta | None = None,
+    max_catch_up: int = 10,
+    fixed_rate: bool = False,
+    jitter: timedelta | None = None,
+    cron: str | None = None,
+    timezone: str | None = None,
+) -> Callable[[TFunc], TFunc]:
+    if (interval is None) == (cron is None):
+        raise ValueError("schedule() needs exactly one of interval or cron")
+    if timezone is not None and cron is None:
+        raise ValueError("timezone only applies to cron schedules")
+    # Cron jobs keep interval_seconds at 0; their times come from the trigger.
+    seconds = 0 if interval is None else int(interval.total_seconds())
+    trigger = None if cron is None else CronTrigger(cron, timezone).spec
+    if max_instances < 1:
+        raise ValueError("max_instances must be at least 1")
+    if overlap not in OVERLAP_POLICIES:
+        raise ValueError(f"invalid overlap {overlap!r}; expected one of: " + ", ".join(OVERLAP_POLICIES))
+    if misfire not in MISFIRE_POLICIES:
+        raise ValueError(f"invalid misfire {misfire!r}; expected one of: " + ", ".join(MISFIRE_POLICIES))
+    if max_catch_up < 1:
+        raise ValueError("max_catch_up must be at least 1")
+    grace_seconds = None if misfire_grace is None else math.ceil(misfire_grace.total_seconds())
+    jitter_seconds = 0 if jitter is None else math.ceil(jitter.total_seconds())
+    if jitter_seconds and fixed_rate:
+        # A random delay on every firing would walk a fixed-rate job off its grid.
+        raise ValueError("jitter cannot be combined with fixed_rate")
 
     def decorator(func: TFunc) -> TFunc:
         setattr(func, "__scheduler_interval_seconds__", seconds)
+        setattr(func, "__scheduler_timeout_seconds__", _whole_seconds(timeout))
+        setattr(func, "__scheduler_max_instances__", int(max_instances))
+        setattr(func, "__scheduler_overlap__", overlap)
+        setattr(func, "__scheduler_misfire__", misfire)
+        setattr(func, "__scheduler_misfire_grace_seconds__", grace_seconds)
+        setattr(func, "__scheduler_max_catch_up__", int(max_catch_up))
+        setattr(func, "__scheduler_fixed_rate__", bool(fixed_rate))
+        setattr(func, "__scheduler_jitter_seconds__", jitter_seconds)
+        setattr(func, "__scheduler_trigger__", trigger)
         return func
 
     return decorator
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import heapq
+import threading
+from typing import Iterable
+
+from scheduler.db import ScheduledFunction
+
+
+class DueQueue:
+    # In-memory min-heap of (next_run_at, id). Entries are invalidated lazily:
+    # a heap item only counts while it matches the job's current next_run_at.
+    def __init__(self) -> None:
+        self._heap: list[tuple[int, int]] = []
+        self._jobs: dict[int, ScheduledFunction] = {}
+        self._wake = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def load(self, functions: Iterable[ScheduledFunction]) -> None:
+        self._jobs = {scheduled.id: scheduled for scheduled in functions if scheduled.enabled}
+        self._heap = [(scheduled.next_run_at, scheduled.id) for scheduled in self._jobs.values()]
+        heapq.heapify(self._heap)
+
+    def push(self, scheduled: ScheduledFunction) -> None:
+        self._jobs[scheduled.id] = scheduled
+        heapq.heappush(self._heap, (scheduled.next_run_at, scheduled.id))
+        if len(self._heap) > 2 * len(self._jobs) + 64:
+            self.load(list(self._jobs.values()))
+
+    def discard(self, scheduled_id: int) -> None:
+        self._jobs.pop(scheduled_id, None)
+
+    def _peek(self) -> ScheduledFunction | None:
+        while self._heap:
+            next_run_at, scheduled_id = self._heap[0]
+            scheduled = self._jobs.get(scheduled_id)
+            if scheduled is not None and scheduled.next_run_at == next_run_at:
+                return scheduled
+            heapq.heappop(self._heap)
+        return None
+
+    def next_deadline(self) -> int | None:
+        scheduled = self._peek()
+        return None if scheduled is None else scheduled.next_run_at
+
+    def pop_due(self, now_epoch: int, limit: int | None = None) -> list[ScheduledFunction]:
+        due = []
+        while (
+            (limit is None or len(due) < limit)
+            and (scheduled := self._peek()) is not None
+            and scheduled.next_run_at <= now_epoch
+        ):
+            heapq.heappop(self._heap)
+            del self._jobs[scheduled.id]
+            due.append(scheduled)
+        return due
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def wait(self, timeout: float) -> bool:
+        woken = self._wake.wait(max(0.0, timeout))
+        self._wake.clear()
+        return woken
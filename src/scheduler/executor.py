@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import CancelledError, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+import inspect
+import multiprocessing
+import os
+import queue
+import resource
+import threading
+import time
+from typing import Callable
+
+EXECUTOR_KINDS = ("inline", "thread", "process", "asyncio", "isolated")
+
+
+class JobTimeout(Exception):
+    def __init__(self, timeout_seconds: float, started_at: int, finished_at: int) -> None:
+        super().__init__(f"timed out after {timeout_seconds:g}s")
+        self.timeout_seconds = timeout_seconds
+        self.started_at = started_at
+        self.finished_at = finished_at
+
+
+class WorkerCrashed(Exception):
+    pass
+
+
+def worker_context():
+    # Workers start from a clean forkserver where available, so they never
+    # inherit locks held by the scheduler's own threads.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else None)
+
+
+class InlineExecutor(Executor):
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+
+class AsyncioExecutor(Executor):
+    # Coroutine functions run on one shared event loop, at most `concurrency`
+    # at a time; plain callables are offloaded to a thread pool.
+    supports_coroutines = True
+
+    def __init__(self, max_workers: int, concurrency: int) -> None:
+        self._threads = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scheduler-job")
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(self._threads)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._thread = threading.Thread(target=self._loop.run_forever, name="scheduler-asyncio", daemon=True)
+        self._thread.start()
+
+    async def _run_limited(self, fn, args, kwargs, timeout=None):
+        async with self._semaphore:
+            started = time.time()
+            try:
+                return await asyncio.wait_for(fn(*args, **kwargs), timeout)
+            except asyncio.TimeoutError:
+                raise JobTimeout(timeout, int(started), int(time.time())) from None
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        if inspect.iscoroutinefunction(fn):
+            return asyncio.run_coroutine_threadsafe(self._run_limited(fn, args, kwargs), self._loop)
+        return self._threads.submit(fn, *args, **kwargs)
+
+    def submit_with_timeout(self, timeout: float, fn, /, *args, **kwargs) -> Future:
+        # Only coroutines can be cancelled; threads run to completion.
+        if inspect.iscoroutinefunction(fn):
+            return asyncio.run_coroutine_threadsafe(self._run_limited(fn, args, kwargs, timeout), self._loop)
+        return self._threads.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            if wait:
+                self._thread.join()
+        self._threads.shutdown(wait=wait, cancel_futures=cancel_futures)
+        if not self._loop.is_running():
+            self._loop.close()
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak rather than current RSS; ru_maxrss is in kilobytes on Linux.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _worker_main(conn, initializer: Callable[[], object] | None = None) -> None:
+    if initializer is not None:
+        initializer()
+    while True:
+        message = conn.recv()
+        if message is None:
+            return
+        fn, args, kwargs = message
+        try:
+            reply = (True, fn(*args, **kwargs))
+        except Exception as exc:
+            reply = (False, exc)
+        conn.send(reply + (_rss_bytes(),))
+
+
+class _Worker:
+    def __init__(self, context, initializer: Callable[[], object] | None = None) -> None:
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, initializer), name="scheduler-worker", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.runs = 0
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1)
+        self.kill()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class IsolatedExecutor(Executor):
+    # Each slot owns a long-lived, pre-started worker process and feeds it one
+    # job at a time. A job that outlives its timeout takes the worker down
+    # with it; workers are also recycled after max_runs jobs or once their
+    # RSS grows past max_rss_bytes.
+    supports_timeouts = True
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_runs: int = 1000,
+        max_rss_bytes: int = 0,
+        initializer: Callable[[], object] | None = None,
+    ) -> None:
+        self._context = worker_context()
+        self._max_runs = max_runs
+        self._initializer = initializer
+        self._max_rss_bytes = max_rss_bytes
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._running: dict[Future, _Worker] = {}
+        self._terminated: set[Future] = set()
+        self._slots = [
+            threading.Thread(target=self._slot_loop, name=f"scheduler-isolated-{index}", daemon=True)
+            for index in range(max_workers)
+        ]
+        for slot in self._slots:
+            slot.start()
+
+    def _slot_loop(self) -> None:
+        worker: _Worker | None = _Worker(self._context, self._initializer)
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            future, timeout, fn, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            if worker is None:
+                worker = _Worker(self._context, self._initializer)
+            started = time.time()
+            with self._lock:
+                self._running[future] = worker
+            try:
+                worker.conn.send((fn, args, kwargs))
+                timed_out = not worker.conn.poll(timeout)
+                if not timed_out:
+                    ok, payload, rss_bytes = worker.conn.recv()
+            except (EOFError, OSError) as exc:
+                timed_out, crashed = False, exc
+            else:
+                crashed = None
+            finally:
+                with self._lock:
+                    self._running.pop(future, None)
+                    terminated = future in self._terminated
+                    self._terminated.discard(future)
+            # A terminated worker is dropped even if its reply beat the kill,
+            # so the kill cannot land on the slot's next job.
+            if timed_out or crashed is not None or terminated:
+                worker.kill()
+                worker = None
+                if terminated:
+                    future.set_exception(CancelledError())
+                elif timed_out:
+                    future.set_exception(JobTimeout(timeout, int(started), int(time.time())))
+                else:
+                    future.set_exception(WorkerCrashed(f"worker process exited unexpectedly: {crashed or 'EOF'}"))
+                continue
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(payload)
+            worker.runs += 1
+            if worker.runs >= self._max_runs or (self._max_rss_bytes and rss_bytes > self._max_rss_bytes):
+                worker.stop()
+                worker = None
+        if worker is not None:
+            worker.stop()
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        return self.submit_with_timeout(None, fn, *args, **kwargs)
+
+    def submit_with_timeout(self, timeout: float | None, fn, /, *args, **kwargs) -> Future:
+        future: Future = Future()
+        self._queue.put((future, timeout, fn, args, kwargs))
+        return future
+
+    def terminate(self, future: Future) -> bool:
+        # Kills the worker running `future`; the future then raises CancelledError.
+        with self._lock:
+            worker = self._running.get(future)
+            if worker is None:
+                return future.cancel()
+            self._terminated.add(future)
+        worker.process.kill()
+        return True
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        if cancel_futures:
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[0].cancel()
+        for _ in self._slots:
+            self._queue.put(None)
+        if wait:
+            for slot in self._slots:
+                slot.join()
+
+
+def create_executor(
+    kind: str,
+    max_workers: int,
+    async_concurrency: int = 100,
+    worker_max_runs: int = 1000,
+    worker_max_rss_bytes: int = 0,
+    initializer: Callable[[], object] | None = None,
+) -> Executor:
+    # initializer runs once in each worker process of the process executors.
+    if kind == "inline":
+        return InlineExecutor()
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scheduler-job")
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=worker_context(), initializer=initializer)
+    if kind == "asyncio":
+        return AsyncioExecutor(max_workers=max_workers, concurrency=async_concurrency)
+    if kind == "isolated":
+        return IsolatedExecutor(
+            max_workers=max_workers,
+            max_runs=worker_max_runs,
+            max_rss_bytes=worker_max_rss_bytes,
+            initializer=initializer,
+        )
+    raise ValueError(f"unknown executor kind: {kind}")
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import math
+import threading
+from typing import Callable
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds; covers sub-millisecond jobs up to runs that take minutes.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class Counter:
+    # Monotonic count, optionally split by one label. An uncontended lock
+    # costs about as much as the dict lookup next to it.
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label: str | None = None) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self._values: dict[str | None, float] = {} if label else {None: 0}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, label_value: str | None = None) -> None:
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def value(self, label_value: str | None = None) -> float:
+        return self._values.get(label_value, 0)
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        with self._lock:
+            values = sorted(self._values.items(), key=lambda item: item[0] or "")
+        return [
+            (self.name, {self.label: label_value} if self.label else {}, value)
+            for label_value, value in values
+        ]
+
+
+class Gauge:
+    # Either set explicitly or read from a callback at scrape time, so the
+    # hot loop does not have to update it.
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], float] | None = None) -> None:
+        self.name = name
+        self.help_text = help_text
+        self._value = 0.0
+        self._read = read
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def set_function(self, read: Callable[[], float] | None) -> None:
+        self._read = read
+
+    def value(self) -> float:
+        return self._value if self._read is None else self._read()
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        return [(self.name, {}, self.value())]
+
+
+class CallbackCounter(Gauge):
+    # A count kept elsewhere (such as the module cache's hit count), exposed
+    # as a counter and read at scrape time.
+    kind = "counter"
+
+
+class Histogram:
+    # Fixed buckets; observe() is a bisect and two additions under a lock.
+    # Buckets are stored non-cumulative and summed at scrape time.
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        samples = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, math.inf), counts):
+            cumulative += count
+            samples.append((f"{self.name}_bucket", {"le": _format_value(bound)}, cumulative))
+        samples.append((f"{self.name}_sum", {}, total))
+        samples.append((f"{self.name}_count", {}, cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[Counter | Gauge | Histogram] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        # Prometheus text exposition format 0.0.4.
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+JOB_RUNS = REGISTRY.register(Counter("scheduler_job_runs_total", "Finished or skipped job runs by status.", "status"))
+JOB_FAILURES = REGISTRY.register(Counter("scheduler_job_failures_total", "Job runs that failed or timed out."))
+JOB_DURATION = REGISTRY.register(Histogram("scheduler_job_duration_seconds", "Monotonic run time of each job."))
+JOB_LAG = REGISTRY.register(
+    Histogram("scheduler_job_lag_seconds", "Time between a job's due time and its actual start.")
+)
+QUEUE_DEPTH = REGISTRY.register(Gauge("scheduler_queue_depth", "Schedules held in the runner's due queue."))
+JOBS_IN_FLIGHT = REGISTRY.register(Gauge("scheduler_jobs_in_flight", "Job runs submitted and not yet collected."))
+SCANS = REGISTRY.register(Counter("scheduler_scans_total", "Completed scans."))
+SCAN_DURATION = REGISTRY.register(Histogram("scheduler_scan_duration_seconds", "Wall time of each scan."))
+FILES_SCANNED = REGISTRY.register(Counter("scheduler_files_scanned_total", "Files looked at by scans."))
+# runner_loop points these at its dispatcher and the runner's module cache.
+MODULE_CACHE_HITS = REGISTRY.register(
+    CallbackCounter("scheduler_module_cache_hits_total", "Job lookups served from the loaded-module cache.")
+)
+MODULE_CACHE_MISSES = REGISTRY.register(
+    CallbackCounter("scheduler_module_cache_misses_total", "Job lookups that imported the module.")
+)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: Registry = REGISTRY
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # Scrapes every few seconds would flood stderr.
+        pass
+
+
+def start_metrics_server(
+    port: int, host: str = "127.0.0.1", registry: Registry = REGISTRY
+) -> tuple[ThreadingHTTPServer, threading.Thread]:
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="scheduler-metrics", daemon=True)
+    thread.start()
+    return server, thread
@@ -0,0 +1,563 @@
+from __future__ import annotations
+
+from contextlib import AbstractContextManager, contextmanager
+from dataclasses import fields
+import threading
+from typing import Iterable, Iterator
+
+try:
+    import psycopg
+    from psycopg_pool import ConnectionPool
+except ImportError:  # optional dependency: pip install "scheduler[postgres]"
+    psycopg = None
+
+from scheduler.db import CHANGE_TRACKED_COLUMNS, ScannedFile, ScheduledFunction, Statements, WriteBuffer
+
+_CHANGES_CHANNEL = "scheduler_changes"
+# Serializes migrations between runners starting at the same time.
+_MIGRATION_LOCK_KEY = 0x5C4ED
+
+_SCHEDULED_FUNCTION_COLUMNS = ", ".join(field.name for field in fields(ScheduledFunction))
+
+# Same layout as the SQLite schema. run_logs has no foreign key, so deleting a
+# stale function keeps its history, as it does on SQLite. Run-log rollups are
+# SQLite-only.
+_MIGRATIONS: list[tuple[str, ...]] = [
+    (
+        """
+        CREATE TABLE IF NOT EXISTS scheduled_functions (
+            id BIGSERIAL PRIMARY KEY,
+            module_path TEXT NOT NULL,
+            qualname TEXT NOT NULL,
+            interval_seconds BIGINT NOT NULL,
+            last_discovered_at BIGINT NOT NULL,
+            enabled INTEGER NOT NULL DEFAULT 1,
+            last_run_at BIGINT,
+            next_run_at BIGINT NOT NULL,
+            is_async INTEGER NOT NULL DEFAULT 0,
+            timeout_seconds BIGINT,
+            max_instances INTEGER NOT NULL DEFAULT 1,
+            overlap TEXT NOT NULL DEFAULT 'queue',
+            misfire TEXT NOT NULL DEFAULT 'coalesce',
+            misfire_grace_seconds BIGINT,
+            max_catch_up INTEGER NOT NULL DEFAULT 10,
+            fixed_rate INTEGER NOT NULL DEFAULT 0,
+            jitter_seconds BIGINT NOT NULL DEFAULT 0,
+            trigger TEXT,
+            lease_owner TEXT,
+            lease_expires_at BIGINT,
+            UNIQUE (module_path, qualname)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS run_logs (
+            id BIGSERIAL PRIMARY KEY,
+            scheduled_function_id BIGINT NOT NULL,
+            started_at BIGINT NOT NULL,
+            finished_at BIGINT NOT NULL,
+            status TEXT NOT NULL,
+            error_message TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS scan_errors (
+            id BIGSERIAL PRIMARY KEY,
+            file_path TEXT NOT NULL,
+            error_type TEXT NOT NULL,
+            error_message TEXT NOT NULL,
+            occurred_at BIGINT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS scanned_files (
+            path TEXT PRIMARY KEY,
+            mtime_ns BIGINT NOT NULL,
+            size BIGINT NOT NULL,
+            content_hash TEXT NOT NULL,
+            functions_json TEXT NOT NULL,
+            error_type TEXT,
+            scanned_at BIGINT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS scan_runs (
+            id BIGSERIAL PRIMARY KEY,
+            started_at BIGINT NOT NULL,
+            finished_at BIGINT NOT NULL,
+            duration_ms BIGINT NOT NULL,
+            files_scanned INTEGER NOT NULL,
+            files_changed INTEGER NOT NULL,
+            discovered INTEGER NOT NULL,
+            errors INTEGER NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_scheduled_functions_due ON scheduled_functions (enabled, next_run_at)",
+        "CREATE INDEX IF NOT EXISTS idx_run_logs_started_status ON run_logs (started_at, status)",
+        # Runners reload their due queue when another connection changes a schedule.
+        f"""
+        CREATE OR REPLACE FUNCTION scheduler_notify_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{_CHANGES_CHANNEL}', '');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER scheduled_functions_changed
+        AFTER INSERT OR UPDATE OR DELETE ON scheduled_functions
+        FOR EACH STATEMENT EXECUTE FUNCTION scheduler_notify_change()
+        """,
+    ),
+    (
+        """
+        ALTER TABLE run_logs
+            ADD COLUMN IF NOT EXISTS started_at_ms BIGINT,
+            ADD COLUMN IF NOT EXISTS duration_ns BIGINT,
+            ADD COLUMN IF NOT EXISTS cpu_ns BIGINT,
+            ADD COLUMN IF NOT EXISTS lag_ms BIGINT
+        """,
+    ),
+    (
+        "ALTER TABLE scheduled_functions ADD COLUMN IF NOT EXISTS profile TEXT",
+        """
+        CREATE TABLE IF NOT EXISTS run_profiles (
+            id BIGSERIAL PRIMARY KEY,
+            scheduled_function_id BIGINT NOT NULL,
+            started_at BIGINT NOT NULL,
+            stats BYTEA NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_run_profiles_function ON run_profiles (scheduled_function_id, started_at)",
+    ),
+    (
+        "CREATE SEQUENCE IF NOT EXISTS scheduled_functions_change_seq",
+        "ALTER TABLE scheduled_functions ADD COLUMN IF NOT EXISTS change_seq BIGINT NOT NULL DEFAULT 0",
+        "CREATE INDEX IF NOT EXISTS idx_scheduled_functions_change_seq ON scheduled_functions (change_seq)",
+        """
+        CREATE OR REPLACE FUNCTION scheduler_bump_change_seq() RETURNS trigger AS $$
+        BEGIN
+            NEW.change_seq := nextval('scheduled_functions_change_seq');
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER scheduled_functions_inserted
+        BEFORE INSERT ON scheduled_functions
+        FOR EACH ROW EXECUTE FUNCTION scheduler_bump_change_seq()
+        """,
+        """
+        CREATE TRIGGER scheduled_functions_updated
+        BEFORE UPDATE ON scheduled_functions
+        FOR EACH ROW
+        WHEN (OLD.next_run_at IS DISTINCT FROM NEW.next_run_at
+            OR OLD.last_run_at IS DISTINCT FROM NEW.last_run_at
+            OR OLD.enabled IS DISTINCT FROM NEW.enabled
+            OR OLD.qualname IS DISTINCT FROM NEW.qualname)
+        EXECUTE FUNCTION scheduler_bump_change_seq()
+        """,
+    ),
+    (
+        "ALTER TABLE scan_runs ADD COLUMN IF NOT EXISTS kind TEXT NOT NULL DEFAULT 'full'",
+        "CREATE INDEX IF NOT EXISTS idx_scan_runs_kind ON scan_runs (kind, id)",
+    ),
+    (
+        "DROP TRIGGER IF EXISTS scheduled_functions_updated ON scheduled_functions",
+        f"""
+        CREATE TRIGGER scheduled_functions_updated
+        BEFORE UPDATE ON scheduled_functions
+        FOR EACH ROW
+        WHEN ({" OR ".join(f"OLD.{column} IS DISTINCT FROM NEW.{column}" for column in CHANGE_TRACKED_COLUMNS)})
+        EXECUTE FUNCTION scheduler_bump_change_seq()
+        """,
+    ),
+]
+
+SCHEMA_VERSION = len(_MIGRATIONS)
+
+POSTGRES_STATEMENTS = Statements(
+    upsert_scheduled_function="""
+        INSERT INTO scheduled_functions
+            (module_path, qualname, interval_seconds, last_discovered_at, enabled, last_run_at, next_run_at,
+             is_async, timeout_seconds, max_instances, overlap, misfire, misfire_grace_seconds, max_catch_up,
+             fixed_rate, jitter_seconds, trigger)
+        VALUES
+            (%s, %s, %s, %s, 1, NULL, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (module_path, qualname) DO UPDATE SET
+            last_discovered_at = excluded.last_discovered_at,
+            is_async = excluded.is_async,
+            timeout_seconds = excluded.timeout_seconds,
+            max_instances = excluded.max_instances,
+            overlap = excluded.overlap,
+            misfire = excluded.misfire,
+            misfire_grace_seconds = excluded.misfire_grace_seconds,
+            max_catch_up = excluded.max_catch_up,
+            fixed_rate = excluded.fixed_rate,
+            jitter_seconds = excluded.jitter_seconds,
+            next_run_at = CASE
+                WHEN scheduled_functions.interval_seconds = excluded.interval_seconds
+                    AND scheduled_functions.trigger IS NOT DISTINCT FROM excluded.trigger
+                THEN scheduled_functions.next_run_at
+                ELSE excluded.next_run_at
+            END,
+            interval_seconds = excluded.interval_seconds,
+            trigger = excluded.trigger
+    """,
+    insert_run_log="""
+        INSERT INTO run_logs
+            (scheduled_function_id, started_at, finished_at, status, error_message,
+             started_at_ms, duration_ns, cpu_ns, lag_ms)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """,
+    insert_scan_error="""
+        INSERT INTO scan_errors (file_path, error_type, error_message, occurred_at)
+        VALUES (%s, %s, %s, %s)
+    """,
+    upsert_scanned_file="""
+        INSERT INTO scanned_files (path, mtime_ns, size, content_hash, functions_json, error_type, scanned_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (path) DO UPDATE SET
+            mtime_ns = excluded.mtime_ns,
+            size = excluded.size,
+            content_hash = excluded.content_hash,
+            functions_json = excluded.functions_json,
+            error_type = excluded.error_type,
+            scanned_at = excluded.scanned_at
+    """,
+    delete_stale_functions="""
+        DELETE FROM scheduled_functions
+        WHERE module_path = %s AND qualname NOT IN (SELECT jsonb_array_elements_text(%s::jsonb))
+    """,
+    insert_scan_run="""
+        INSERT INTO scan_runs
+            (started_at, finished_at, duration_ms, files_scanned, files_changed, discovered, errors, kind)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """,
+    delete_scanned_file="DELETE FROM scanned_files WHERE path = %s",
+    mark_run="UPDATE scheduled_functions SET last_run_at = %s WHERE id = %s",
+    release_lease="""
+        UPDATE scheduled_functions SET lease_owner = NULL, lease_expires_at = NULL
+        WHERE id = %s AND lease_owner = %s
+    """,
+    insert_run_profile="INSERT INTO run_profiles (scheduled_function_id, started_at, stats) VALUES (%s, %s, %s)",
+)
+
+# SKIP LOCKED lets concurrent runners claim disjoint batches without waiting
+# on each other's row locks; the lease columns then cover the time the job
+# is in flight, after the claiming transaction committed.
+_CLAIM_DUE_FUNCTIONS_SQL = f"""
+    UPDATE scheduled_functions
+    SET lease_owner = %(owner)s, lease_expires_at = %(expires_at)s
+    WHERE id IN (
+        SELECT id FROM scheduled_functions
+        WHERE enabled = 1 AND next_run_at <= %(now)s
+          AND (lease_owner IS NULL OR lease_owner = %(owner)s OR lease_expires_at <= %(now)s)
+          AND (%(ids)s::bigint[] IS NULL OR id = ANY(%(ids)s::bigint[]))
+        ORDER BY next_run_at
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING {_SCHEDULED_FUNCTION_COLUMNS}
+"""
+
+
+class PostgresWriteBuffer(WriteBuffer):
+    statements = POSTGRES_STATEMENTS
+
+    def __init__(self, store: PostgresStore, max_rows: int = 500, max_delay_seconds: float = 1.0) -> None:
+        super().__init__(None, max_rows, max_delay_seconds)
+        self.store = store
+
+    def _apply(self, batches: list[tuple[str, list[tuple]]]) -> None:
+        with self.store.transaction() as conn, conn.cursor() as cursor:
+            for sql, rows in batches:
+                cursor.executemany(sql, rows)
+
+
+class PostgresStore:
+    # Store backed by a PostgreSQL connection pool, so many runners and
+    # scanners can write at once. Each transaction() borrows one pooled
+    # connection; calls made inside it on the same thread share it. A
+    # read_only store neither migrates nor listens, and its sessions refuse
+    # writes.
+    def __init__(self, conninfo: str, min_size: int = 1, max_size: int = 10, read_only: bool = False) -> None:
+        if psycopg is None:
+            raise RuntimeError('PostgreSQL support needs the postgres extra: pip install "scheduler[postgres]"')
+        self.transient_errors = (psycopg.OperationalError,)
+        self._local = threading.local()
+        self._own_pids: set[int] = set()
+        self._changes = 0
+        self._listener = None
+        self.pool = ConnectionPool(
+            conninfo,
+            min_size=min_size,
+            max_size=max_size,
+            kwargs={"options": "-c default_transaction_read_only=on"} if read_only else None,
+            configure=self._configure,
+            open=True,
+        )
+        if read_only:
+            return
+        self.migrate()
+        self._listener = psycopg.connect(conninfo, autocommit=True)
+        self._listener.execute(f"LISTEN {_CHANGES_CHANNEL}")
+
+    def _configure(self, conn) -> None:
+        # Changes made through our own pool are not news to our own runner.
+        self._own_pids.add(conn.info.backend_pid)
+
+    def close(self) -> None:
+        if self._listener is not None:
+            self._listener.close()
+        self.pool.close()
+
+    def migrate(self) -> int:
+        with self.transaction() as conn:
+            conn.execute("SELECT pg_advisory_xact_lock(%s)", (_MIGRATION_LOCK_KEY,))
+            conn.execute("CREATE TABLE IF NOT EXISTS scheduler_schema (version INTEGER NOT NULL)")
+            row = conn.execute("SELECT version FROM scheduler_schema").fetchone()
+            current = 0 if row is None else int(row[0])
+            if current > SCHEMA_VERSION:
+                raise RuntimeError(
+                    f"database schema version {current} is newer than supported version {SCHEMA_VERSION}"
+                )
+            for version in range(current + 1, SCHEMA_VERSION + 1):
+                for statement in _MIGRATIONS[version - 1]:
+                    conn.execute(statement)
+            if row is None:
+                conn.execute("INSERT INTO scheduler_schema (version) VALUES (%s)", (SCHEMA_VERSION,))
+            else:
+                conn.execute("UPDATE scheduler_schema SET version = %s", (SCHEMA_VERSION,))
+        return SCHEMA_VERSION
+
+    @contextmanager
+    def _transaction(self) -> Iterator:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        with self.pool.connection() as conn:
+            self._local.conn = conn
+            try:
+                yield conn
+            finally:
+                self._local.conn = None
+
+    def transaction(self) -> AbstractContextManager:
+        return self._transaction()
+
+    def buffer(self, max_rows: int = 500, max_delay_seconds: float = 1.0) -> WriteBuffer:
+        return PostgresWriteBuffer(self, max_rows, max_delay_seconds)
+
+    def data_version(self) -> int:
+        # Counts change notifications sent by other connections, like
+        # SQLite's PRAGMA data_version.
+        if self._listener is None:
+            return self._changes
+        for notify in self._listener.notifies(timeout=0):
+            if notify.pid not in self._own_pids:
+                self._changes += 1
+        return self._changes
+
+    def list_scheduled_functions(self) -> list[ScheduledFunction]:
+        with self.transaction() as conn:
+            rows = conn.execute(
+                f"SELECT {_SCHEDULED_FUNCTION_COLUMNS} FROM scheduled_functions ORDER BY qualname"
+            ).fetchall()
+        return [ScheduledFunction(*row) for row in rows]
+
+    def list_scheduled_functions_changed(self, after_seq: int) -> list[tuple[int, ScheduledFunction]]:
+        with self.transaction() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT change_seq, {_SCHEDULED_FUNCTION_COLUMNS}
+                FROM scheduled_functions
+                WHERE change_seq > %s
+                ORDER BY change_seq
+                """,
+                (after_seq,),
+            ).fetchall()
+        return [(row[0], ScheduledFunction(*row[1:])) for row in rows]
+
+    def fetch_scanned_files(self) -> dict[str, ScannedFile]:
+        with self.transaction() as conn:
+            rows = conn.execute(
+                "SELECT path, mtime_ns, size, content_hash, functions_json, error_type, scanned_at FROM scanned_files"
+            ).fetchall()
+        return {row[0]: ScannedFile.from_row(row) for row in rows}
+
+    def claim_due_functions(
+        self,
+        owner: str,
+        now_epoch: int,
+        lease_seconds: int,
+        ids: Iterable[int] | None = None,
+        limit: int = 1000,
+    ) -> list[ScheduledFunction]:
+        with self.transaction() as conn:
+            rows = conn.execute(
+                _CLAIM_DUE_FUNCTIONS_SQL,
+                {
+                    "owner": owner,
+                    "expires_at": now_epoch + lease_seconds,
+                    "now": now_epoch,
+                    "ids": None if ids is None else list(ids),
+                    "limit": limit,
+                },
+            ).fetchall()
+        claimed = [ScheduledFunction(*row) for row in rows]
+        return sorted(claimed, key=lambda scheduled: (scheduled.next_run_at, scheduled.id))
+
+    def set_next_runs(self, rows: Iterable[tuple[int, str | None, int | None, int]]) -> None:
+        with self.transaction() as conn, conn.cursor() as cursor:
+            cursor.executemany(
+                "UPDATE scheduled_functions SET next_run_at = %s, lease_owner = %s, lease_expires_at = %s WHERE id = %s",
+                list(rows),
+            )
+
+    def renew_leases(self, owner: str, expires_at: int) -> int:
+        with self.transaction() as conn:
+            return conn.execute(
+                "UPDATE scheduled_functions SET lease_expires_at = %s WHERE lease_owner = %s",
+                (expires_at, owner),
+            ).rowcount
+
+    def release_leases(self, owner: str) -> int:
+        with self.transaction() as conn:
+            return conn.execute(
+                "UPDATE scheduled_functions SET lease_owner = NULL, lease_expires_at = NULL WHERE lease_owner = %s",
+                (owner,),
+            ).rowcount
+
+    def fetch_last_scan(self) -> tuple[int, int, int] | None:
+        with self.transaction() as conn:
+            row = conn.execute(
+                """
+                SELECT finished_at, files_scanned, duration_ms FROM scan_runs
+                WHERE kind = 'full' ORDER BY id DESC LIMIT 1
+                """
+            ).fetchone()
+        return None if row is None else (int(row[0]), int(row[1]), int(row[2]))
+
+    def fetch_last_discovered_at(self) -> int | None:
+        with self.transaction() as conn:
+            row = conn.execute("SELECT MAX(last_discovered_at) FROM scheduled_functions").fetchone()
+        return None if row is None or row[0] is None else int(row[0])
+
+    def count_scheduled_functions(self) -> int:
+        with self.transaction() as conn:
+            return int(conn.execute("SELECT COUNT(*) FROM scheduled_functions").fetchone()[0])
+
+    def fetch_recent_runs(self, limit: int = 10) -> list[tuple]:
+        with self.transaction() as conn:
+            return conn.execute(
+                """
+                SELECT run_logs.started_at, run_logs.status, scheduled_functions.qualname
+                FROM run_logs
+                JOIN scheduled_functions ON run_logs.scheduled_function_id = scheduled_functions.id
+                ORDER BY run_logs.started_at DESC
+                LIMIT %s
+                """,
+                (limit,),
+            ).fetchall()
+
+    def fetch_upcoming_firings(self, now: int, window_seconds: int = 60) -> list[int]:
+        counts = [0] * window_seconds
+        with self.transaction() as conn:
+            rows = conn.execute(
+                """
+                SELECT GREATEST(next_run_at - %s, 0), COUNT(*)
+                FROM scheduled_functions
+                WHERE enabled = 1 AND next_run_at < %s
+                GROUP BY 1
+                """,
+                (now, now + window_seconds),
+            ).fetchall()
+        for offset, count in rows:
+            counts[int(offset)] = int(count)
+        return counts
+
+    def fetch_module_paths(self, qualname: str) -> list[str]:
+        with self.transaction() as conn:
+            rows = conn.execute(
+                "SELECT module_path FROM scheduled_functions WHERE qualname = %s ORDER BY module_path", (qualname,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def set_profile(self, module_path: str, qualname: str, mode: str | None) -> int:
+        with self.transaction() as conn:
+            return conn.execute(
+                "UPDATE scheduled_functions SET profile = %s WHERE module_path = %s AND qualname = %s",
+                (mode, module_path, qualname),
+            ).rowcount
+
+    def fetch_run_profiles(self, module_path: str, qualname: str, limit: int = 5) -> list[tuple[str, int, bytes]]:
+        with self.transaction() as conn:
+            return conn.execute(
+                """
+                SELECT scheduled_functions.module_path, run_profiles.started_at, run_profiles.stats
+                FROM run_profiles
+                JOIN scheduled_functions ON run_profiles.scheduled_function_id = scheduled_functions.id
+                WHERE scheduled_functions.module_path = %s AND scheduled_functions.qualname = %s
+                ORDER BY run_profiles.started_at DESC, run_profiles.id DESC
+                LIMIT %s
+                """,
+                (module_path, qualname, limit),
+            ).fetchall()
+
+    def fetch_functions_changed(self, after_seq: int) -> list[tuple]:
+        # Sequence values may commit out of order under concurrent writers,
+        # which is why the TUI also resyncs in full from time to time.
+        with self.transaction() as conn:
+            return conn.execute(
+                """
+                SELECT id, qualname, next_run_at, last_run_at, change_seq
+                FROM scheduled_functions
+                WHERE change_seq > %s
+                ORDER BY change_seq
+                """,
+                (after_seq,),
+            ).fetchall()
+
+    def fetch_run_logs_after(self, after_id: int, limit: int = 10_000) -> list[tuple]:
+        with self.transaction() as conn:
+            return conn.execute(
+                """
+                SELECT id, scheduled_function_id, started_at, status, duration_ns, lag_ms
+                FROM run_logs
+                WHERE id > %s
+                ORDER BY id
+                LIMIT %s
+                """,
+                (after_id, limit),
+            ).fetchall()
+
+    def first_run_log_id_since(self, since_epoch: int) -> int:
+        with self.transaction() as conn:
+            row = conn.execute(
+                """
+                SELECT COALESCE(
+                    (SELECT MIN(id) FROM run_logs WHERE started_at >= %s),
+                    (SELECT MAX(id) + 1 FROM run_logs),
+                    1
+                )
+                """,
+                (since_epoch,),
+            ).fetchone()
+        return int(row[0])
+
+    def run_counts_by_hour(self, since_epoch: int, before_id: int | None = None) -> dict[int, tuple[int, int]]:
+        since_hour = since_epoch - since_epoch % 3600
+        with self.transaction() as conn:
+            rows = conn.execute(
+                """
+                SELECT started_at - started_at %% 3600,
+                       COUNT(*) FILTER (WHERE status <> 'skipped'),
+                       COUNT(*) FILTER (WHERE status IN ('failure', 'timeout'))
+                FROM run_logs
+                WHERE started_at >= %s AND (%s::bigint IS NULL OR id < %s::bigint)
+                GROUP BY 1
+                """,
+                (since_hour, before_id, before_id),
+            ).fetchall()
+        return {int(hour): (int(runs), int(failures)) for hour, runs, failures in rows}
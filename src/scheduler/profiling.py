@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import cProfile
+from dataclasses import dataclass
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from typing import Callable
+import zlib
+
+PROFILE_MODES = ("cpu", "memory", "both")
+
+# cProfile allows one active profiler per process on Python 3.12+, and
+# tracemalloc is process-wide, so at most one run is profiled at a time.
+_profile_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class ProfileSettings:
+    # Runs of every function are also profiled 1 in sample_rate times
+    # (0 disables sampling); per-function flags always profile.
+    sample_rate: int = 0
+    mode: str = "cpu"
+    top: int = 20
+
+
+def profile_call(func: Callable[[], object], mode: str, top: int = 20) -> tuple[object, bytes | None]:
+    # Calls func under cProfile and/or tracemalloc and returns its result with
+    # a compressed stats blob. Exceptions from func propagate; the blob is
+    # None if another run is being profiled.
+    if not _profile_lock.acquire(blocking=False):
+        return func(), None
+    try:
+        profiler = cProfile.Profile() if mode in ("cpu", "both") else None
+        trace_memory = mode in ("memory", "both")
+        was_tracing = tracemalloc.is_tracing()
+        if trace_memory:
+            if was_tracing:
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+        started_ns = time.perf_counter_ns()
+        stats: dict = {"mode": mode}
+        try:
+            if profiler is None:
+                result = func()
+            else:
+                result = profiler.runcall(func)
+        finally:
+            stats["duration_ns"] = time.perf_counter_ns() - started_ns
+            if trace_memory:
+                snapshot = tracemalloc.take_snapshot()
+                stats["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+                if not was_tracing:
+                    tracemalloc.stop()
+                stats["allocations"] = [
+                    [str(statistic.traceback[0]), statistic.size, statistic.count]
+                    for statistic in snapshot.statistics("lineno")[:top]
+                ]
+            if profiler is not None:
+                entries = pstats.Stats(profiler).stats  # type: ignore[attr-defined]
+                ranked = sorted(entries.items(), key=lambda item: item[1][3], reverse=True)[:top]
+                stats["functions"] = [
+                    [pstats.func_std_string(location), calls, round(own, 6), round(cumulative, 6)]
+                    for location, (_, calls, own, cumulative, _) in ranked
+                ]
+        return result, zlib.compress(json.dumps(stats, separators=(",", ":")).encode("utf-8"))
+    finally:
+        _profile_lock.release()
+
+
+def decode_profile(blob: bytes) -> dict:
+    return json.loads(zlib.decompress(bytes(blob)))
+
+
+def format_profile(stats: dict) -> str:
+    lines = [f"mode: {stats['mode']}, duration: {stats['duration_ns'] / 1e6:,.1f} ms"]
+    if "functions" in stats:
+        lines.append(f"  {'calls':>8} {'own s':>10} {'cum s':>10}  function")
+        for location, calls, own, cumulative in stats["functions"]:
+            lines.append(f"  {calls:>8} {own:>10.4f} {cumulative:>10.4f}  {location}")
+    if "peak_bytes" in stats:
+        lines.append(f"  peak traced memory: {stats['peak_bytes'] / 1024:,.1f} KiB")
+        lines.append(f"  {'KiB':>10} {'blocks':>8}  allocated at")
+        for location, size, count in stats["allocations"]:
+            lines.append(f"  {size / 1024:>10,.1f} {count:>8}  {location}")
+    return "\n".join(lines)
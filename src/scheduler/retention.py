@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+import sqlite3
+import threading
+import time
+
+from scheduler.db import SQLiteTuning, init_db, transaction
+
+HOUR_SECONDS = 60 * 60
+DAY_SECONDS = 24 * HOUR_SECONDS
+# Hourly buckets older than this are dropped; daily buckets are kept forever.
+HOURLY_ROLLUP_RETENTION_SECONDS = 31 * DAY_SECONDS
+
+_ROLLUP_SQL = """
+    INSERT INTO run_log_rollups
+        (granularity, bucket_start, scheduled_function_id, run_count, failure_count,
+         total_duration_seconds, max_duration_seconds)
+    SELECT ?, started_at - started_at % ?, scheduled_function_id, TOTAL(status != 'skipped'),
+           TOTAL(status IN ('failure', 'timeout')),
+           TOTAL(finished_at - started_at), MAX(finished_at - started_at)
+    FROM run_logs
+    WHERE started_at <= ? AND started_at < ?
+    GROUP BY 2, 3
+    ON CONFLICT(granularity, bucket_start, scheduled_function_id) DO UPDATE SET
+        run_count = run_count + excluded.run_count,
+        failure_count = failure_count + excluded.failure_count,
+        total_duration_seconds = total_duration_seconds + excluded.total_duration_seconds,
+        max_duration_seconds = MAX(max_duration_seconds, excluded.max_duration_seconds)
+"""
+
+
+@dataclass(frozen=True)
+class RetentionReport:
+    rolled_up: int
+    chunks: int
+    pages_freed: int
+
+
+def _chunk_bound(conn: sqlite3.Connection, cutoff: int, chunk_size: int) -> int | None:
+    # Highest started_at of the next chunk, walking idx_run_logs_started_status.
+    row = conn.execute(
+        "SELECT started_at FROM run_logs WHERE started_at < ? ORDER BY started_at LIMIT 1 OFFSET ?",
+        (cutoff, chunk_size - 1),
+    ).fetchone()
+    if row is not None:
+        return int(row[0])
+    row = conn.execute("SELECT MAX(started_at) FROM run_logs WHERE started_at < ?", (cutoff,)).fetchone()
+    return None if row is None or row[0] is None else int(row[0])
+
+
+def compact_run_logs(
+    conn: sqlite3.Connection,
+    retention_seconds: int,
+    now_epoch: int | None = None,
+    chunk_size: int = 5000,
+    vacuum_pages: int = 1000,
+) -> RetentionReport:
+    # Rolls raw run_logs older than the horizon into hourly and daily
+    # aggregates and deletes them. Each chunk is its own short transaction so
+    # the runner never waits long for the write lock.
+    if now_epoch is None:
+        now_epoch = int(time.time())
+    cutoff = now_epoch - retention_seconds
+    rolled_up = 0
+    chunks = 0
+    while (bound := _chunk_bound(conn, cutoff, chunk_size)) is not None:
+        with transaction(conn):
+            for granularity, width in (("hour", HOUR_SECONDS), ("day", DAY_SECONDS)):
+                conn.execute(_ROLLUP_SQL, (granularity, width, bound, cutoff))
+            cursor = conn.execute(
+                "DELETE FROM run_logs WHERE started_at <= ? AND started_at < ?",
+                (bound, cutoff),
+            )
+        rolled_up += cursor.rowcount
+        chunks += 1
+    hourly_cutoff = now_epoch - HOURLY_ROLLUP_RETENTION_SECONDS
+    with transaction(conn):
+        conn.execute(
+            "DELETE FROM run_log_rollups WHERE granularity = 'hour' AND bucket_start < ?",
+            (hourly_cutoff - hourly_cutoff % DAY_SECONDS,),
+        )
+        conn.execute("DELETE FROM run_profiles WHERE started_at < ?", (cutoff,))
+        # The latest full scan is kept for "Last scan" even if it is old.
+        conn.execute(
+            """
+            DELETE FROM scan_runs
+            WHERE finished_at < ? AND id IS NOT (SELECT MAX(id) FROM scan_runs WHERE kind = 'full')
+            """,
+            (cutoff,),
+        )
+    free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    conn.execute(f"PRAGMA incremental_vacuum({int(vacuum_pages)})").fetchall()
+    free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return RetentionReport(rolled_up=rolled_up, chunks=chunks, pages_freed=free_before - free_after)
+
+
+def run_counts_since(conn: sqlite3.Connection, since_epoch: int) -> tuple[int, int]:
+    # (runs, failures) since the given time, combining raw rows with rollups of
+    # rows already compacted away. Rollups count whole buckets, so long
+    # windows are accurate to the hour (or day, past the hourly retention).
+    raw = conn.execute(
+        "SELECT TOTAL(status != 'skipped'), TOTAL(status IN ('failure', 'timeout')) FROM run_logs WHERE started_at >= ?",
+        (since_epoch,),
+    ).fetchone()
+    hourly = conn.execute(
+        """
+        SELECT TOTAL(run_count), TOTAL(failure_count) FROM run_log_rollups
+        WHERE granularity = 'hour' AND bucket_start >= ?
+        """,
+        (since_epoch - since_epoch % HOUR_SECONDS,),
+    ).fetchone()
+    daily = conn.execute(
+        """
+        SELECT TOTAL(run_count), TOTAL(failure_count) FROM run_log_rollups AS daily
+        WHERE granularity = 'day' AND bucket_start >= ?
+          AND NOT EXISTS (
+              SELECT 1 FROM run_log_rollups AS hourly
+              WHERE hourly.granularity = 'hour'
+                AND hourly.bucket_start >= daily.bucket_start
+                AND hourly.bucket_start < daily.bucket_start + ?
+          )
+        """,
+        (since_epoch - since_epoch % DAY_SECONDS, DAY_SECONDS),
+    ).fetchone()
+    runs = int(raw[0] + hourly[0] + daily[0])
+    failures = int(raw[1] + hourly[1] + daily[1])
+    return runs, failures
+
+
+def run_counts_by_hour(
+    conn: sqlite3.Connection, since_epoch: int, before_id: int | None = None
+) -> dict[int, tuple[int, int]]:
+    # {hour start: (runs, failures)} since the given hour, from raw rows with
+    # id < before_id (all rows if None) and hourly rollups.
+    counts: dict[int, tuple[int, int]] = {}
+    since_hour = since_epoch - since_epoch % HOUR_SECONDS
+    raw = conn.execute(
+        """
+        SELECT started_at - started_at % :hour, TOTAL(status != 'skipped'), TOTAL(status IN ('failure', 'timeout'))
+        FROM run_logs
+        WHERE started_at >= :since AND (:before_id IS NULL OR id < :before_id)
+        GROUP BY 1
+        """,
+        {"hour": HOUR_SECONDS, "since": since_hour, "before_id": before_id},
+    ).fetchall()
+    rollups = conn.execute(
+        """
+        SELECT bucket_start, run_count, failure_count FROM run_log_rollups
+        WHERE granularity = 'hour' AND bucket_start >= ?
+        """,
+        (since_hour,),
+    )
+    for hour, runs, failures in [*raw, *rollups]:
+        previous_runs, previous_failures = counts.get(int(hour), (0, 0))
+        counts[int(hour)] = (previous_runs + int(runs), previous_failures + int(failures))
+    return counts
+
+
+def retention_loop(
+    db_path: Path,
+    retention_seconds: int,
+    interval_seconds: int,
+    stop: threading.Event,
+    tuning: SQLiteTuning | None = None,
+) -> None:
+    conn = init_db(db_path, tuning)
+    try:
+        while not stop.is_set():
+            try:
+                compact_run_logs(conn, retention_seconds)
+            except sqlite3.OperationalError as exc:
+                print(f"WARNING: run log retention failed: {exc}")
+            stop.wait(interval_seconds)
+    finally:
+        conn.close()
+
+
+def start_retention_thread(
+    db_path: Path,
+    retention_seconds: int,
+    interval_seconds: int,
+    tuning: SQLiteTuning | None = None,
+) -> tuple[threading.Thread, threading.Event]:
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=retention_loop,
+        args=(db_path, retention_seconds, interval_seconds, stop, tuning),
+        name="scheduler-retention",
+        daemon=True,
+    )
+    thread.start()
+    return thread, stop
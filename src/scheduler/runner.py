@@ -1,20 +1,46 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import asyncio
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, CancelledError, Executor, Future, wait
+from dataclasses import dataclass, replace
+from functools import partial
 import importlib.util
+import inspect
+import os
 from pathlib import Path
+import random
+import socket
+import sqlite3
 import time
+from types import ModuleType
+import uuid
 
-from scheduler.db import fetch_due_functions, record_run_log
+from scheduler import metrics
+from scheduler.cache import ModuleCache
+from scheduler.cron import compile_trigger
+from scheduler.db import ScheduledFunction, WriteBuffer
+from scheduler.due_queue import DueQueue
+from scheduler.executor import InlineExecutor, JobTimeout
+from scheduler.profiling import ProfileSettings, profile_call
+from scheduler.store import Store, as_store
 
 
 @dataclass(frozen=True)
 class RunResult:
     status: str
     error_message: str | None
+    started_at: int
+    finished_at: int
+    # Wall-clock start in ms, monotonic duration and CPU time of the job itself.
+    started_at_ms: int | None = None
+    duration_ns: int | None = None
+    cpu_ns: int | None = None
+    # Compressed cProfile/tracemalloc stats when the run was profiled.
+    profile: bytes | None = None
 
 
-def _load_callable(module_path: str, qualname: str):
+def _load_module(module_path: str) -> ModuleType:
     path = Path(module_path)
     module_name = f"run_{path.stem}_{abs(hash(module_path))}"
     spec = importlib.util.spec_from_file_location(module_name, module_path)
@@ -22,8 +48,15 @@ def _load_callable(module_path: str, qualname: str):
         raise ImportError(f"Unable to load module from {module_path}")
     module = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(module)
-    target_name = qualname.split(".")[-1]
-    return getattr(module, target_name)
+    return module
+
+
+module_cache = ModuleCache(_load_module)
+
+
+def set_module_cache_size(max_entries: int) -> None:
+    # Also run as the initializer of worker processes, which each keep a cache.
+    module_cache.resize(max_entries)
 
 
 def compute_next_run(now_epoch: int, previous_epoch: int | None, interval_seconds: int) -> int:
@@ -31,42 +64,461 @@ def compute_next_run(now_epoch: int, previous_epoch: int | None, interval_second
     return base + interval_seconds
 
 
-def run_due(conn) -> int:
-    now_epoch = int(time.time())
-    due = fetch_due_functions(conn, now_epoch=now_epoch)
-    run_count = 0
-    for scheduled in due:
-        started = int(time.time())
-        try:
-            func = _load_callable(scheduled.module_path, scheduled.qualname)
-            func()
-            result = RunResult(status="success", error_message=None)
-        except Exception as exc:
-            result = RunResult(status="failure", error_message=str(exc))
-        finished = int(time.time())
-        record_run_log(
-            conn,
-            scheduled_function_id=scheduled.id,
-            started_at=started,
-            finished_at=finished,
-            status=result.status,
-            error_message=result.error_message,
+# Between these, the due queue only takes the rows whose change_seq moved.
+# The full reload drops deleted functions and catches PostgreSQL rows whose
+# change_seq committed out of order.
+FULL_RELOAD_SECONDS = 300
+
+# Cron misfires are counted by stepping through fire times; stop counting here.
+_MAX_COUNTED_MISFIRES = 10_000
+
+
+@dataclass(frozen=True)
+class Firing:
+    run: bool
+    skipped: int
+    next_run_at: int
+
+
+def plan_firing(scheduled: ScheduledFunction, now_epoch: int) -> Firing:
+    # Firings missed while the runner was down or lagging are the fire times
+    # from next_run_at up to now: next_run_at + k * interval, or the cron
+    # trigger's fire times. The misfire policy decides how many still run.
+    due = scheduled.next_run_at
+    if scheduled.trigger:
+        trigger = compile_trigger(scheduled.trigger)
+        fires = [due]
+        while len(fires) < _MAX_COUNTED_MISFIRES:
+            following = trigger.next_fire(fires[-1])
+            if following > now_epoch:
+                break
+            fires.append(following)
+        missed, latest = len(fires), fires[-1]
+        fire_at = fires.__getitem__
+        next_run = trigger.next_fire(max(now_epoch, latest))
+    else:
+        interval = max(scheduled.interval_seconds, 1)
+        missed = max(now_epoch - due, 0) // interval + 1
+        latest = due + (missed - 1) * interval
+
+        def fire_at(index: int) -> int:
+            return due + index * interval
+
+        if scheduled.fixed_rate:
+            next_run = latest + interval
+        else:
+            next_run = compute_next_run(now_epoch, due, interval)
+    if scheduled.misfire == "all":
+        # Run the oldest missed firing now and leave the next one due, so
+        # catch-up runs follow each other; beyond the cap, the oldest are dropped.
+        skipped = max(missed - scheduled.max_catch_up, 0)
+        if missed - skipped > 1:
+            return Firing(run=True, skipped=skipped, next_run_at=fire_at(skipped + 1))
+        return Firing(run=True, skipped=skipped, next_run_at=next_run)
+    if scheduled.misfire == "skip":
+        grace = scheduled.misfire_grace_seconds
+        if grace is not None and now_epoch - latest > grace:
+            return Firing(run=False, skipped=missed, next_run_at=next_run)
+        return Firing(run=True, skipped=missed - 1, next_run_at=next_run)
+    return Firing(run=True, skipped=0, next_run_at=next_run)
+
+
+def _call_job(module_path: str, qualname: str) -> tuple[str, str | None]:
+    try:
+        func = module_cache.get(module_path, qualname)
+        outcome = func()
+        if inspect.iscoroutine(outcome):
+            asyncio.run(outcome)
+        return "success", None
+    except Exception as exc:
+        return "failure", str(exc)
+
+
+def execute_job(module_path: str, qualname: str, profile: str | None = None, profile_top: int = 20) -> RunResult:
+    started_ms = time.time_ns() // 1_000_000
+    started_ns = time.perf_counter_ns()
+    # Thread CPU time, so jobs sharing a thread pool don't count each other.
+    started_cpu_ns = time.thread_time_ns()
+    profile_blob = None
+    if profile is None:
+        status, error_message = _call_job(module_path, qualname)
+    else:
+        (status, error_message), profile_blob = profile_call(
+            partial(_call_job, module_path, qualname), profile, profile_top
         )
-        next_run = compute_next_run(now_epoch=now_epoch, previous_epoch=scheduled.next_run_at, interval_seconds=scheduled.interval_seconds)
-        conn.execute(
-            """
-            UPDATE scheduled_functions
-            SET last_run_at = ?, next_run_at = ?
-            WHERE id = ?
-            """,
-            (finished, next_run, scheduled.id),
+    return RunResult(
+        status=status,
+        error_message=error_message,
+        started_at=started_ms // 1000,
+        finished_at=int(time.time()),
+        started_at_ms=started_ms,
+        duration_ns=time.perf_counter_ns() - started_ns,
+        cpu_ns=time.thread_time_ns() - started_cpu_ns,
+        profile=profile_blob,
+    )
+
+
+async def execute_async_job(module_path: str, qualname: str) -> RunResult:
+    started_ms = time.time_ns() // 1_000_000
+    started_ns = time.perf_counter_ns()
+    try:
+        func = module_cache.get(module_path, qualname)
+        outcome = func()
+        if inspect.isawaitable(outcome):
+            await outcome
+        status, error_message = "success", None
+    except Exception as exc:
+        status, error_message = "failure", str(exc)
+    # No cpu_ns: the event loop thread also runs every other coroutine.
+    return RunResult(
+        status=status,
+        error_message=error_message,
+        started_at=started_ms // 1000,
+        finished_at=int(time.time()),
+        started_at_ms=started_ms,
+        duration_ns=time.perf_counter_ns() - started_ns,
+    )
+
+
+class Dispatcher:
+    # Jobs run on the executor; every store write happens on the thread that
+    # owns the dispatcher, so a SQLite connection keeps a single writer.
+    # Results are buffered and committed in batches. Due jobs come from an
+    # in-memory DueQueue that is reloaded only when another connection changed
+    # the DB or a reload was requested.
+    #
+    # Several runners may share one database: a due job only runs after this
+    # runner claimed it with a lease (claim_due_functions), in the same
+    # transaction that advances next_run_at, so each firing is claimed once.
+    # Leases are renewed while runs are in flight and released afterwards; a
+    # crashed runner's leases simply expire. At most claim_batch jobs are
+    # claimed per dispatch so a burst is shared between runners.
+    def __init__(
+        self,
+        store: Store | sqlite3.Connection,
+        executor: Executor,
+        buffer: WriteBuffer | None = None,
+        queue: DueQueue | None = None,
+        owner: str | None = None,
+        lease_seconds: int = 60,
+        claim_batch: int = 100,
+        profiling: ProfileSettings | None = None,
+    ) -> None:
+        self.store = as_store(store)
+        self.executor = executor
+        self.buffer = buffer or self.store.buffer()
+        self.queue = queue or DueQueue()
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self.claim_batch = claim_batch
+        self.profiling = profiling or ProfileSettings()
+        self._in_flight: dict[Future, ScheduledFunction] = {}
+        # The next_run_at each run was claimed at, for its scheduling lag.
+        self._due_at: dict[Future, int] = {}
+        self._deferred: dict[int, ScheduledFunction] = {}
+        self._replaced: set[Future] = set()
+        self._timeout_warned: set[int] = set()
+        self._data_version: int | None = None
+        self._change_seq: int | None = None
+        self._full_reload_at = 0.0
+        self._renew_at = 0.0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def request_reload(self) -> None:
+        # The next refresh reloads every function, not only the changed ones.
+        self._data_version = None
+        self._change_seq = None
+        self.queue.wake()
+
+    def _queued(self, scheduled: ScheduledFunction, now_epoch: int) -> ScheduledFunction:
+        # Not worth polling before another runner's lease runs out.
+        if scheduled.lease_owner not in (None, self.owner) and scheduled.lease_expires_at > now_epoch:
+            return replace(scheduled, next_run_at=max(scheduled.next_run_at, scheduled.lease_expires_at))
+        return scheduled
+
+    def refresh_queue(self) -> bool:
+        version = self.store.data_version()
+        if version == self._data_version:
+            return False
+        self._data_version = version
+        now_epoch = int(time.time())
+        full = self._change_seq is None or time.monotonic() >= self._full_reload_at
+        changed = self.store.list_scheduled_functions_changed(-1 if full else self._change_seq)
+        if full:
+            self.queue.load(self._queued(scheduled, now_epoch) for _, scheduled in changed)
+            self._full_reload_at = time.monotonic() + FULL_RELOAD_SECONDS
+        else:
+            for _, scheduled in changed:
+                if scheduled.enabled:
+                    self.queue.push(self._queued(scheduled, now_epoch))
+                else:
+                    self.queue.discard(scheduled.id)
+        if changed:
+            self._change_seq = changed[-1][0]
+        elif full:
+            self._change_seq = -1
+        return True
+
+    def dispatch_due(self, now_epoch: int | None = None) -> int:
+        if now_epoch is None:
+            now_epoch = int(time.time())
+        self.buffer.flush()
+        self.refresh_queue()
+        self._renew_leases()
+        popped = self.queue.pop_due(now_epoch, self.claim_batch)
+        if not popped:
+            return 0
+        running = Counter(
+            scheduled.id for future, scheduled in self._in_flight.items() if future not in self._replaced
         )
-        conn.commit()
-        run_count += 1
+        due = []
+        skipped = []
+        # Stays open until next_run_at is advanced, so no other runner can
+        # claim the same firing in between.
+        with self.store.transaction():
+            claimed = self.store.claim_due_functions(
+                self.owner,
+                now_epoch,
+                self.lease_seconds,
+                ids=[scheduled.id for scheduled in popped],
+                limit=len(popped),
+            )
+            if len(claimed) < len(popped):
+                # Another runner ran or holds the rest. Look again once its
+                # lease could have run out; the row it writes replaces this.
+                claimed_ids = {scheduled.id for scheduled in claimed}
+                for scheduled in popped:
+                    if scheduled.id not in claimed_ids:
+                        self.queue.push(replace(scheduled, next_run_at=now_epoch + self.lease_seconds))
+            due, skipped = self._plan(claimed, running, now_epoch)
+            expires_at = now_epoch + self.lease_seconds
+            self.store.set_next_runs(
+                (scheduled.next_run_at, self.owner, expires_at, scheduled.id)
+                if run or running[scheduled.id]
+                else (scheduled.next_run_at, None, None, scheduled.id)
+                for scheduled, run, _ in due
+            )
+        if not self._in_flight:
+            # The claim just extended every lease this runner needs.
+            self._renew_at = time.time() + self.lease_seconds / 3
+        for scheduled, reason in skipped:
+            # started_at is when the firing was due, so the row shows the lag.
+            self.buffer.record_run_log(
+                scheduled_function_id=scheduled.id,
+                started_at=scheduled.next_run_at,
+                finished_at=now_epoch,
+                status="skipped",
+                error_message=reason,
+            )
+            metrics.JOB_RUNS.inc(1, "skipped")
+        runs_coroutines = getattr(self.executor, "supports_coroutines", False)
+        # The asyncio executor can only cancel coroutines.
+        enforces_timeouts = getattr(self.executor, "supports_timeouts", False)
+        started = 0
+        for scheduled, run, due_at in due:
+            self.queue.push(scheduled)
+            if not run:
+                continue
+            started += 1
+            job = execute_async_job if scheduled.is_async and runs_coroutines else execute_job
+            args: tuple = (scheduled.module_path, scheduled.qualname)
+            if job is execute_job:
+                profile = self._profile_mode(scheduled)
+                if profile is not None:
+                    args += (profile, self.profiling.top)
+            if scheduled.timeout_seconds and (enforces_timeouts or job is execute_async_job):
+                future = self.executor.submit_with_timeout(scheduled.timeout_seconds, job, *args)
+            else:
+                if scheduled.timeout_seconds and scheduled.id not in self._timeout_warned:
+                    self._timeout_warned.add(scheduled.id)
+                    print(
+                        f"WARNING: {scheduled.qualname} has a {scheduled.timeout_seconds:g}s timeout that this "
+                        'executor cannot enforce; use executor = "isolated" to kill runs that exceed it'
+                    )
+                future = self.executor.submit(job, *args)
+            future.add_done_callback(lambda _: self.queue.wake())
+            self._in_flight[future] = scheduled
+            self._due_at[future] = due_at
+        return started
+
+    def _plan(self, claimed: list[ScheduledFunction], running: Counter, now_epoch: int) -> tuple[list, list]:
+        due = []
+        skipped = []
+        for scheduled in claimed:
+            firing = plan_firing(scheduled, now_epoch)
+            if firing.skipped:
+                skipped.append((scheduled, f"{firing.skipped} missed firing(s) skipped"))
+            run = firing.run
+            if run and running[scheduled.id] >= scheduled.max_instances:
+                if scheduled.overlap == "skip":
+                    skipped.append((scheduled, f"{running[scheduled.id]} run(s) still in flight"))
+                    run = False
+                elif scheduled.overlap != "replace" or not self._replace_oldest(scheduled.id):
+                    # Re-queued as soon as an in-flight run finishes.
+                    self._deferred[scheduled.id] = scheduled
+                    continue
+            elif run:
+                running[scheduled.id] += 1
+            next_run = firing.next_run_at
+            if scheduled.jitter_seconds:
+                next_run += random.randint(0, scheduled.jitter_seconds)
+            due.append((replace(scheduled, next_run_at=next_run), run, scheduled.next_run_at))
+        return due, skipped
+
+    def _profile_mode(self, scheduled: ScheduledFunction) -> str | None:
+        # Functions flagged with `scheduler profile --enable` are always
+        # profiled; others only when sampled.
+        if scheduled.profile:
+            return scheduled.profile
+        rate = self.profiling.sample_rate
+        if rate and random.randrange(rate) == 0:
+            return self.profiling.mode
+        return None
+
+    def _renew_leases(self) -> None:
+        if self._in_flight and time.time() >= self._renew_at:
+            self.store.renew_leases(self.owner, int(time.time()) + self.lease_seconds)
+            self._renew_at = time.time() + self.lease_seconds / 3
+
+    def _replace_oldest(self, scheduled_id: int) -> bool:
+        # _in_flight keeps dispatch order, so the first match is the oldest run.
+        for future, scheduled in self._in_flight.items():
+            if scheduled.id != scheduled_id or future in self._replaced:
+                continue
+            terminate = getattr(self.executor, "terminate", None)
+            if future.cancel() or (terminate is not None and terminate(future)):
+                self._replaced.add(future)
+                return True
+            return False
+        return False
+
+    def collect(self, timeout: float | None = 0) -> int:
+        if not self._in_flight:
+            return 0
+        done, _ = wait(self._in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            scheduled = self._in_flight.pop(future)
+            due_at = self._due_at.pop(future)
+            self._replaced.discard(future)
+            try:
+                result = future.result()
+            except CancelledError:
+                now = int(time.time())
+                result = RunResult(status="replaced", error_message="replaced by a newer run", started_at=now, finished_at=now)
+            except JobTimeout as exc:
+                result = RunResult(
+                    status="timeout",
+                    error_message=str(exc),
+                    started_at=exc.started_at,
+                    finished_at=exc.finished_at,
+                )
+            except Exception as exc:
+                now = int(time.time())
+                result = RunResult(status="failure", error_message=str(exc), started_at=now, finished_at=now)
+            lag_ms = None if result.started_at_ms is None else result.started_at_ms - due_at * 1000
+            self.buffer.record_run_log(
+                scheduled_function_id=scheduled.id,
+                started_at=result.started_at,
+                finished_at=result.finished_at,
+                status=result.status,
+                error_message=result.error_message,
+                started_at_ms=result.started_at_ms,
+                duration_ns=result.duration_ns,
+                cpu_ns=result.cpu_ns,
+                lag_ms=lag_ms,
+            )
+            metrics.JOB_RUNS.inc(1, result.status)
+            if result.status in ("failure", "timeout"):
+                metrics.JOB_FAILURES.inc()
+            if result.duration_ns is not None:
+                metrics.JOB_DURATION.observe(result.duration_ns / 1e9)
+            if lag_ms is not None:
+                metrics.JOB_LAG.observe(lag_ms / 1000)
+            if result.profile is not None:
+                self.buffer.record_run_profile(scheduled.id, result.started_at, result.profile)
+            self.buffer.mark_run(scheduled.id, result.finished_at)
+            if not any(other.id == scheduled.id for other in self._in_flight.values()):
+                self.buffer.release_lease(scheduled.id, self.owner)
+            deferred = self._deferred.pop(scheduled.id, None)
+            if deferred is not None:
+                self.queue.push(deferred)
+        self.buffer.flush_if_due()
+        return len(done)
+
+    def flush(self) -> int:
+        return self.buffer.flush()
+
+    def wait(self, max_seconds: float) -> None:
+        # Sleeps until the next deadline, a finished job, a reload request or
+        # max_seconds, whichever comes first.
+        timeout = max_seconds
+        deadline = self.queue.next_deadline()
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.time())
+        if not self._in_flight:
+            self.flush()
+        else:
+            timeout = min(timeout, self._renew_at - time.time())
+            if self.buffer.pending:
+                timeout = min(timeout, self.buffer.max_delay_seconds)
+        self.queue.wait(timeout)
+        self.collect()
+        self._renew_leases()
+        self.buffer.flush_if_due()
+
+    def drain(self) -> int:
+        collected = 0
+        while self._in_flight:
+            collected += self.collect(timeout=None)
+        self.flush()
+        return collected
+
+    def shutdown(self) -> None:
+        self.drain()
+        self.executor.shutdown(wait=True)
+        self.store.release_leases(self.owner)
+
+
+def run_due(store: Store | sqlite3.Connection, dispatcher: Dispatcher | None = None) -> int:
+    if dispatcher is None:
+        dispatcher = Dispatcher(store, InlineExecutor())
+        run_count = dispatcher.dispatch_due()
+        dispatcher.drain()
+        return run_count
+    dispatcher.collect()
+    run_count = dispatcher.dispatch_due()
+    dispatcher.collect()
     return run_count
 
 
-def runner_loop(conn, poll_seconds: int) -> None:
-    while True:
-        run_due(conn)
-        time.sleep(poll_seconds)
+def runner_loop(
+    store: Store | sqlite3.Connection,
+    poll_seconds: int,
+    executor: Executor | None = None,
+    queue: DueQueue | None = None,
+    lease_seconds: int = 60,
+    claim_batch: int = 100,
+    profiling: ProfileSettings | None = None,
+) -> None:
+    dispatcher = Dispatcher(
+        store,
+        executor or InlineExecutor(),
+        queue=queue,
+        lease_seconds=lease_seconds,
+        claim_batch=claim_batch,
+        profiling=profiling,
+    )
+    # Read when the metrics endpoint is scraped, not on every loop.
+    metrics.QUEUE_DEPTH.set_function(lambda: len(dispatcher.queue))
+    metrics.JOBS_IN_FLIGHT.set_function(lambda: dispatcher.in_flight)
+    metrics.MODULE_CACHE_HITS.set_function(lambda: module_cache.stats().hits)
+    metrics.MODULE_CACHE_MISSES.set_function(lambda: module_cache.stats().misses)
+    try:
+        while True:
+            run_due(store, dispatcher)
+            dispatcher.wait(poll_seconds)
+    finally:
+        dispatcher.shutdown()
@@ -1,11 +1,24 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
+import hashlib
 from pathlib import Path
 import importlib.util
 import inspect
+import os
+import sqlite3
 import sys
+import threading
+import time
+from typing import Callable, Iterable, Iterator
 
-from scheduler.db import record_scan_error, upsert_scheduled_function
+from scheduler import metrics
+from scheduler.db import DiscoveredFunction, ScannedFile, SQLiteTuning, WriteBuffer
+from scheduler.executor import create_executor
+from scheduler.store import Store, as_store, open_store
+from scheduler.static_discovery import Unresolvable, discover_functions
+
+DISCOVERY_MODES = ("import", "ast")
 
 _SKIP_DIR_NAMES = {
     ".git",
@@ -30,38 +43,293 @@ def _load_module_from_path(path: Path):
     return module
 
 
-def scan_paths(conn, scan_paths: list[Path]) -> int:
-    discovered = 0
-    for root in scan_paths:
-        for file_path in root.rglob("*.py"):
-            if any(part in _SKIP_DIR_NAMES for part in file_path.parts):
+def is_python_source(path: Path) -> bool:
+    return path.suffix == ".py" and not any(part in _SKIP_DIR_NAMES for part in path.parts)
+
+
+def _iter_python_files(root: Path) -> Iterator[Path]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [name for name in dirnames if name not in _SKIP_DIR_NAMES]
+        for filename in filenames:
+            file_path = Path(dirpath, filename)
+            if is_python_source(file_path):
+                yield file_path
+
+
+def _import_functions(file_path: Path) -> list[DiscoveredFunction]:
+    module = _load_module_from_path(file_path)
+    try:
+        functions = []
+        for _, func in inspect.getmembers(module, inspect.isfunction):
+            interval = getattr(func, "__scheduler_interval_seconds__", None)
+            if interval is None:
+                continue
+            functions.append(DiscoveredFunction.from_callable(f"{file_path.stem}.{func.__name__}", func))
+        return functions
+    finally:
+        sys.modules.pop(module.__name__, None)
+
+
+def _discover_functions(file_path: Path, content: bytes, discovery: str) -> list[DiscoveredFunction]:
+    if discovery == "ast":
+        if b"schedule" not in content:
+            return []
+        try:
+            return discover_functions(content, file_path.stem)
+        except Unresolvable:
+            pass
+    return _import_functions(file_path)
+
+
+def _is_under(path: str, roots: list[Path]) -> bool:
+    return any(Path(path).is_relative_to(root) for root in roots)
+
+
+@dataclass(frozen=True)
+class FileScan:
+    path: str
+    mtime_ns: int
+    size: int
+    content_hash: str
+    # None means the content hash matched the index and nothing was re-discovered.
+    functions: list[DiscoveredFunction] | None
+    error_type: str | None = None
+    error_message: str | None = None
+
+
+@dataclass(frozen=True)
+class ScanReport:
+    discovered: int
+    files_scanned: int
+    files_changed: int
+    errors: int
+    duration_seconds: float
+
+    @property
+    def files_per_second(self) -> float:
+        if self.duration_seconds <= 0:
+            return float(self.files_scanned)
+        return self.files_scanned / self.duration_seconds
+
+
+def _scan_file(
+    path: str,
+    mtime_ns: int,
+    size: int,
+    previous_hash: str | None,
+    discovery: str,
+) -> FileScan:
+    # Runs in scan worker processes: no database access, only plain results.
+    file_path = Path(path)
+    try:
+        content = file_path.read_bytes()
+    except OSError as exc:
+        return FileScan(path, mtime_ns, size, "", [], type(exc).__name__, str(exc))
+    content_hash = hashlib.sha256(content).hexdigest()
+    if content_hash == previous_hash:
+        return FileScan(path, mtime_ns, size, content_hash, None)
+    try:
+        functions = _discover_functions(file_path, content, discovery)
+    except (SystemExit, Exception) as exc:
+        return FileScan(path, mtime_ns, size, content_hash, [], type(exc).__name__, str(exc))
+    return FileScan(path, mtime_ns, size, content_hash, functions)
+
+
+def _store_file_scan(buffer: WriteBuffer, result: FileScan, previous: ScannedFile | None) -> list[DiscoveredFunction]:
+    error_type = result.error_type
+    if result.functions is None and previous is not None:
+        functions = previous.functions
+        error_type = previous.error_type
+    elif result.error_type is not None:
+        functions = []
+        buffer.record_scan_error(result.path, result.error_type, result.error_message or "")
+    else:
+        functions = result.functions or []
+        buffer.delete_stale_functions(result.path, (function.qualname for function in functions))
+    buffer.upsert_scanned_file(
+        path=result.path,
+        mtime_ns=result.mtime_ns,
+        size=result.size,
+        content_hash=result.content_hash,
+        functions=functions,
+        error_type=error_type,
+    )
+    return functions
+
+
+def _scan(
+    store: Store | sqlite3.Connection,
+    files: Iterable[Path],
+    stale: Callable[[dict[str, ScannedFile], set[str]], Iterable[str]],
+    discovery: str,
+    workers: int,
+    spread: bool = False,
+    kind: str = "full",
+) -> ScanReport:
+    if discovery not in DISCOVERY_MODES:
+        raise ValueError(f"unknown discovery mode: {discovery}")
+    started_at = int(time.time())
+    started = time.perf_counter()
+    store = as_store(store)
+    index = store.fetch_scanned_files()
+    seen: set[str] = set()
+    pending: list[tuple[str, int, int, str | None, str]] = []
+    discovered: dict[str, list[DiscoveredFunction]] = {}
+    errors = 0
+    with store.buffer() as buffer:
+        for file_path in files:
+            path_key = str(file_path)
+            if path_key in seen:
+                continue
+            seen.add(path_key)
+            try:
+                stat = file_path.stat()
+            except OSError as exc:
+                buffer.record_scan_error(path_key, type(exc).__name__, str(exc))
+                errors += 1
+                continue
+            previous = index.get(path_key)
+            if previous is not None and (previous.mtime_ns, previous.size) == (stat.st_mtime_ns, stat.st_size):
+                discovered[path_key] = previous.functions
                 continue
+            previous_hash = previous.content_hash if previous is not None else None
+            pending.append((path_key, stat.st_mtime_ns, stat.st_size, previous_hash, discovery))
+
+        if pending:
+            executor = create_executor("process" if workers > 1 and len(pending) > 1 else "inline", workers)
+            chunksize = max(1, len(pending) // (workers * 4))
             try:
-                module = _load_module_from_path(file_path)
-                for _, func in inspect.getmembers(module, inspect.isfunction):
-                    interval = getattr(func, "__scheduler_interval_seconds__", None)
-                    if interval is None:
-                        continue
-                    qualname = f"{file_path.stem}.{func.__name__}"
-                    upsert_scheduled_function(
-                        conn,
-                        module_path=str(file_path),
-                        qualname=qualname,
-                        interval_seconds=int(interval),
-                    )
-                    discovered += 1
-            except SystemExit as exc:
-                record_scan_error(
-                    conn,
-                    file_path=str(file_path),
-                    error_type=type(exc).__name__,
-                    error_message=str(exc),
-                )
-            except Exception as exc:
-                record_scan_error(
-                    conn,
-                    file_path=str(file_path),
-                    error_type=type(exc).__name__,
-                    error_message=str(exc),
-                )
-    return discovered
+                for result in executor.map(_scan_file, *zip(*pending), chunksize=chunksize):
+                    if result.error_type is not None:
+                        errors += 1
+                    discovered[result.path] = _store_file_scan(buffer, result, index.get(result.path))
+                    buffer.flush_if_due()
+            finally:
+                executor.shutdown(wait=True)
+
+        count = 0
+        for path_key, functions in discovered.items():
+            for function in functions:
+                try:
+                    buffer.upsert_scheduled_function(path_key, function, spread)
+                except ValueError as exc:
+                    # A trigger indexed before it was validated; skip just this function.
+                    buffer.record_scan_error(path_key, type(exc).__name__, str(exc))
+                    errors += 1
+                    continue
+                count += 1
+        for path_key in stale(index, seen):
+            buffer.delete_scanned_file(path_key)
+        report = ScanReport(
+            discovered=count,
+            files_scanned=len(seen),
+            files_changed=len(pending),
+            errors=errors,
+            duration_seconds=time.perf_counter() - started,
+        )
+        buffer.record_scan_run(
+            started_at=started_at,
+            duration_ms=int(report.duration_seconds * 1000),
+            files_scanned=report.files_scanned,
+            files_changed=report.files_changed,
+            discovered=report.discovered,
+            errors=report.errors,
+            kind=kind,
+        )
+    metrics.SCANS.inc()
+    metrics.SCAN_DURATION.observe(report.duration_seconds)
+    metrics.FILES_SCANNED.inc(report.files_scanned)
+    return report
+
+
+def scan(
+    store: Store | sqlite3.Connection,
+    scan_paths: list[Path],
+    discovery: str = "import",
+    workers: int = 1,
+    spread: bool = False,
+) -> ScanReport:
+    files = (file_path for root in scan_paths for file_path in _iter_python_files(root))
+    return _scan(
+        store,
+        files,
+        lambda index, seen: [path for path in index.keys() - seen if _is_under(path, scan_paths)],
+        discovery,
+        workers,
+        spread,
+    )
+
+
+def scan_files(
+    store: Store | sqlite3.Connection,
+    paths: Iterable[Path],
+    discovery: str = "import",
+    workers: int = 1,
+    spread: bool = False,
+) -> ScanReport:
+    # Re-processes only the given files; paths that no longer exist are
+    # dropped from the index together with their scheduled functions.
+    requested = {str(path) for path in paths}
+    existing = [Path(path) for path in sorted(requested) if is_python_source(Path(path)) and Path(path).is_file()]
+    return _scan(
+        store,
+        existing,
+        lambda index, seen: [path for path in requested - seen if path in index],
+        discovery,
+        workers,
+        spread,
+        kind="files",
+    )
+
+
+def scan_paths(
+    store: Store | sqlite3.Connection, scan_paths: list[Path], discovery: str = "import", workers: int = 1
+) -> int:
+    return scan(store, scan_paths, discovery=discovery, workers=workers).discovered
+
+
+def scan_loop(
+    database: Path | str,
+    scan_paths: list[Path],
+    interval_seconds: int,
+    stop: threading.Event,
+    discovery: str = "import",
+    workers: int = 1,
+    on_scan: Callable[[ScanReport], None] | None = None,
+    spread: bool = False,
+    tuning: SQLiteTuning | None = None,
+) -> None:
+    # Rescans on its own connection so a slow scan never delays due jobs.
+    store = open_store(database, tuning=tuning)
+    try:
+        while not stop.wait(interval_seconds):
+            try:
+                report = scan(store, scan_paths, discovery=discovery, workers=workers, spread=spread)
+            except store.transient_errors as exc:
+                print(f"WARNING: rescan failed: {exc}")
+                continue
+            if on_scan is not None:
+                on_scan(report)
+    finally:
+        store.close()
+
+
+def start_scan_thread(
+    database: Path | str,
+    scan_paths: list[Path],
+    interval_seconds: int,
+    discovery: str = "import",
+    workers: int = 1,
+    on_scan: Callable[[ScanReport], None] | None = None,
+    spread: bool = False,
+    tuning: SQLiteTuning | None = None,
+) -> tuple[threading.Thread, threading.Event]:
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=scan_loop,
+        args=(database, scan_paths, interval_seconds, stop, discovery, workers, on_scan, spread, tuning),
+        name="scheduler-scan",
+        daemon=True,
+    )
+    thread.start()
+    return thread, stop
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import ast
+from datetime import timedelta
+import operator
+
+from scheduler.db import DiscoveredFunction
+from scheduler.decorators import schedule
+
+_DECORATOR_MODULES = {"scheduler.decorators"}
+_TIMEDELTA_MODULES = {"datetime"}
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+
+class Unresolvable(Exception):
+    pass
+
+
+class _Names:
+    def __init__(self) -> None:
+        # local name -> dotted target, e.g. "td" -> "datetime.timedelta"
+        self.aliases: dict[str, str] = {}
+        self.constants: dict[str, object] = {}
+        self.star_import = False
+
+    def add_import(self, node: ast.Import | ast.ImportFrom) -> None:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname is not None:
+                    self.aliases[alias.asname] = alias.name
+                else:
+                    root = alias.name.split(".")[0]
+                    self.aliases[root] = root
+            return
+        if node.level or node.module is None:
+            for alias in node.names:
+                self.aliases[alias.asname or alias.name] = f".{alias.name}"
+            return
+        for alias in node.names:
+            if alias.name == "*":
+                self.star_import = True
+                continue
+            self.aliases[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+
+    def dotted(self, node: ast.expr) -> str | None:
+        parts = []
+        while isinstance(node, ast.Attribute):
+            parts.append(node.attr)
+            node = node.value
+        if not isinstance(node, ast.Name):
+            return None
+        head = self.aliases.get(node.id, node.id)
+        return ".".join([head, *reversed(parts)])
+
+    def is_schedule(self, node: ast.expr) -> bool:
+        dotted = self.dotted(node)
+        return dotted is not None and dotted.rsplit(".", 1)[0] in _DECORATOR_MODULES and dotted.endswith(".schedule")
+
+    def looks_like_schedule(self, node: ast.expr) -> bool:
+        dotted = self.dotted(node)
+        return dotted is not None and dotted.rsplit(".", 1)[-1] == "schedule"
+
+    def is_timedelta(self, node: ast.expr) -> bool:
+        dotted = self.dotted(node)
+        return dotted is not None and dotted in {f"{module}.timedelta" for module in _TIMEDELTA_MODULES}
+
+
+def _fold(node: ast.expr, names: _Names) -> object:
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float, str, bool, type(None)):
+        return node.value
+    if isinstance(node, ast.Name) and node.id in names.constants:
+        return names.constants[node.id]
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_fold(node.operand, names))
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        try:
+            return _BINARY_OPS[type(node.op)](_fold(node.left, names), _fold(node.right, names))
+        except (TypeError, ZeroDivisionError, OverflowError) as exc:
+            raise Unresolvable(str(exc)) from exc
+    if isinstance(node, ast.Call) and names.is_timedelta(node.func):
+        args = [_fold(arg, names) for arg in node.args]
+        kwargs = {}
+        for keyword in node.keywords:
+            if keyword.arg is None:
+                raise Unresolvable("timedelta(**kwargs) cannot be resolved statically")
+            kwargs[keyword.arg] = _fold(keyword.value, names)
+        try:
+            return timedelta(*args, **kwargs)
+        except (TypeError, OverflowError) as exc:
+            raise Unresolvable(str(exc)) from exc
+    raise Unresolvable(f"cannot fold {ast.dump(node)}")
+
+
+def _discovered(name: str, decorator: ast.Call, names: _Names, is_async: bool) -> DiscoveredFunction:
+    # The folded arguments are passed to the real decorator, so both discovery
+    # modes apply the same defaults and validation.
+    args = [_fold(arg, names) for arg in decorator.args]
+    kwargs = {}
+    for keyword in decorator.keywords:
+        if keyword.arg is None:
+            raise Unresolvable("schedule(**kwargs) cannot be resolved statically")
+        kwargs[keyword.arg] = _fold(keyword.value, names)
+
+    if is_async:
+        async def placeholder() -> None:
+            pass
+    else:
+        def placeholder() -> None:
+            pass
+
+    try:
+        return DiscoveredFunction.from_callable(name, schedule(*args, **kwargs)(placeholder))
+    except (TypeError, ValueError, AttributeError) as exc:
+        raise Unresolvable(f"invalid schedule() arguments on {name}: {exc}") from exc
+
+
+def discover_functions(source: str | bytes, module_stem: str) -> list[DiscoveredFunction]:
+    # Raises Unresolvable when the file has to be imported to be understood.
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError) as exc:
+        raise Unresolvable(str(exc)) from exc
+    names = _Names()
+    functions: dict[str, DiscoveredFunction] = {}
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.add_import(node)
+        elif isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            try:
+                names.constants[node.targets[0].id] = _fold(node.value, names)
+            except Unresolvable:
+                names.constants.pop(node.targets[0].id, None)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            functions.pop(node.name, None)
+            for decorator in node.decorator_list:
+                target = decorator.func if isinstance(decorator, ast.Call) else decorator
+                if isinstance(decorator, ast.Call) and names.is_schedule(target):
+                    functions[node.name] = _discovered(
+                        f"{module_stem}.{node.name}",
+                        decorator,
+                        names,
+                        is_async=isinstance(node, ast.AsyncFunctionDef),
+                    )
+                elif names.looks_like_schedule(target) or (names.star_import and isinstance(target, ast.Name)):
+                    raise Unresolvable(f"cannot resolve decorator on {node.name}")
+    # Decorated functions nested in if/try blocks or classes need a real import.
+    decorated = sum(
+        1
+        for node in ast.walk(tree)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+        for decorator in node.decorator_list
+        if names.looks_like_schedule(decorator.func if isinstance(decorator, ast.Call) else decorator)
+    )
+    if decorated > len(functions):
+        raise Unresolvable("schedule decorator outside of module top level")
+    return list(functions.values())
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+from contextlib import AbstractContextManager
+import math
+from pathlib import Path
+import sqlite3
+from typing import Iterable, Protocol
+
+from scheduler import db
+from scheduler.db import ScannedFile, ScheduledFunction, SQLiteTuning, WriteBuffer
+from scheduler.retention import run_counts_by_hour
+
+POSTGRES_SCHEMES = ("postgresql://", "postgres://")
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def percentile(ordered: list[int], fraction: float) -> int | None:
+    # Nearest rank, the same value PostgreSQL's percentile_disc picks.
+    if not ordered:
+        return None
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+class Store(Protocol):
+    # Everything the scanner, runner and TUI persist or read. Writes that may
+    # be batched go through buffer(); the other writes commit on their own
+    # unless they run inside transaction().
+    transient_errors: tuple[type[BaseException], ...]
+
+    def close(self) -> None: ...
+
+    def transaction(self) -> AbstractContextManager: ...
+
+    def buffer(self, max_rows: int = 500, max_delay_seconds: float = 1.0) -> WriteBuffer: ...
+
+    def data_version(self) -> int: ...
+
+    def list_scheduled_functions(self) -> list[ScheduledFunction]: ...
+
+    def list_scheduled_functions_changed(self, after_seq: int) -> list[tuple[int, ScheduledFunction]]: ...
+
+    def fetch_scanned_files(self) -> dict[str, ScannedFile]: ...
+
+    def claim_due_functions(
+        self,
+        owner: str,
+        now_epoch: int,
+        lease_seconds: int,
+        ids: Iterable[int] | None = None,
+        limit: int = 1000,
+    ) -> list[ScheduledFunction]: ...
+
+    def set_next_runs(self, rows: Iterable[tuple[int, str | None, int | None, int]]) -> None: ...
+
+    def renew_leases(self, owner: str, expires_at: int) -> int: ...
+
+    def release_leases(self, owner: str) -> int: ...
+
+    def fetch_last_scan(self) -> tuple[int, int, int] | None: ...
+
+    def fetch_last_discovered_at(self) -> int | None: ...
+
+    def count_scheduled_functions(self) -> int: ...
+
+    def fetch_recent_runs(self, limit: int = 10) -> list[tuple]: ...
+
+    def fetch_upcoming_firings(self, now: int, window_seconds: int = 60) -> list[int]: ...
+
+    def fetch_module_paths(self, qualname: str) -> list[str]: ...
+
+    def set_profile(self, module_path: str, qualname: str, mode: str | None) -> int: ...
+
+    def fetch_functions_changed(self, after_seq: int) -> list[tuple]: ...
+
+    def fetch_run_logs_after(self, after_id: int, limit: int = 10_000) -> list[tuple]: ...
+
+    def first_run_log_id_since(self, since_epoch: int) -> int: ...
+
+    def run_counts_by_hour(self, since_epoch: int, before_id: int | None = None) -> dict[int, tuple[int, int]]: ...
+
+    def fetch_run_profiles(self, module_path: str, qualname: str, limit: int = 5) -> list[tuple[str, int, bytes]]: ...
+
+
+class SQLiteStore:
+    transient_errors = (sqlite3.OperationalError,)
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def transaction(self) -> AbstractContextManager:
+        return db.transaction(self.conn)
+
+    def buffer(self, max_rows: int = 500, max_delay_seconds: float = 1.0) -> WriteBuffer:
+        return WriteBuffer(self.conn, max_rows, max_delay_seconds)
+
+    def data_version(self) -> int:
+        return db.data_version(self.conn)
+
+    def list_scheduled_functions(self) -> list[ScheduledFunction]:
+        return db.list_scheduled_functions(self.conn)
+
+    def list_scheduled_functions_changed(self, after_seq: int) -> list[tuple[int, ScheduledFunction]]:
+        return db.list_scheduled_functions_changed(self.conn, after_seq)
+
+    def fetch_scanned_files(self) -> dict[str, ScannedFile]:
+        return db.fetch_scanned_files(self.conn)
+
+    def claim_due_functions(
+        self,
+        owner: str,
+        now_epoch: int,
+        lease_seconds: int,
+        ids: Iterable[int] | None = None,
+        limit: int = 1000,
+    ) -> list[ScheduledFunction]:
+        return db.claim_due_functions(self.conn, owner, now_epoch, lease_seconds, ids, limit)
+
+    def set_next_runs(self, rows: Iterable[tuple[int, str | None, int | None, int]]) -> None:
+        db.set_next_runs(self.conn, rows)
+
+    def renew_leases(self, owner: str, expires_at: int) -> int:
+        return db.renew_leases(self.conn, owner, expires_at)
+
+    def release_leases(self, owner: str) -> int:
+        return db.release_leases(self.conn, owner)
+
+    def fetch_last_scan(self) -> tuple[int, int, int] | None:
+        # (finished_at, files_scanned, duration_ms) of the latest full scan.
+        row = self.conn.execute(
+            """
+            SELECT finished_at, files_scanned, duration_ms FROM scan_runs
+            WHERE kind = 'full' ORDER BY id DESC LIMIT 1
+            """
+        ).fetchone()
+        return None if row is None else (int(row[0]), int(row[1]), int(row[2]))
+
+    def fetch_last_discovered_at(self) -> int | None:
+        row = self.conn.execute("SELECT MAX(last_discovered_at) FROM scheduled_functions").fetchone()
+        return None if row is None or row[0] is None else int(row[0])
+
+    def count_scheduled_functions(self) -> int:
+        return int(self.conn.execute("SELECT COUNT(*) FROM scheduled_functions").fetchone()[0])
+
+    def fetch_recent_runs(self, limit: int = 10) -> list[tuple]:
+        cursor = self.conn.execute(
+            """
+            SELECT run_logs.started_at, run_logs.status, scheduled_functions.qualname
+            FROM run_logs
+            JOIN scheduled_functions ON run_logs.scheduled_function_id = scheduled_functions.id
+            ORDER BY run_logs.started_at DESC
+            LIMIT ?
+            """,
+            (limit,),
+        )
+        return cursor.fetchall()
+
+    def fetch_upcoming_firings(self, now: int, window_seconds: int = 60) -> list[int]:
+        # Firings per second over the next window; overdue jobs land in the first bucket.
+        counts = [0] * window_seconds
+        cursor = self.conn.execute(
+            """
+            SELECT MAX(next_run_at - ?, 0), COUNT(*)
+            FROM scheduled_functions
+            WHERE enabled = 1 AND next_run_at < ?
+            GROUP BY 1
+            """,
+            (now, now + window_seconds),
+        )
+        for offset, count in cursor:
+            counts[int(offset)] = int(count)
+        return counts
+
+    def fetch_module_paths(self, qualname: str) -> list[str]:
+        # A qualname is "<file stem>.<function>", so files with the same name
+        # in different folders share it.
+        cursor = self.conn.execute(
+            "SELECT module_path FROM scheduled_functions WHERE qualname = ? ORDER BY module_path", (qualname,)
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def set_profile(self, module_path: str, qualname: str, mode: str | None) -> int:
+        return db.set_profile(self.conn, module_path, qualname, mode)
+
+    def fetch_functions_changed(self, after_seq: int) -> list[tuple]:
+        # (id, qualname, next_run_at, last_run_at, change_seq) of functions
+        # added or changed after the given change_seq, oldest change first.
+        cursor = self.conn.execute(
+            """
+            SELECT id, qualname, next_run_at, last_run_at, change_seq
+            FROM scheduled_functions
+            WHERE change_seq > ?
+            ORDER BY change_seq
+            """,
+            (after_seq,),
+        )
+        return cursor.fetchall()
+
+    def fetch_run_logs_after(self, after_id: int, limit: int = 10_000) -> list[tuple]:
+        # (id, scheduled_function_id, started_at, status, duration_ns, lag_ms) in id order.
+        cursor = self.conn.execute(
+            """
+            SELECT id, scheduled_function_id, started_at, status, duration_ns, lag_ms
+            FROM run_logs
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+            """,
+            (after_id, limit),
+        )
+        return cursor.fetchall()
+
+    def first_run_log_id_since(self, since_epoch: int) -> int:
+        # The first run log id started since since_epoch, or the next id if none.
+        # Without INDEXED BY, SQLite walks the rowids from the oldest row.
+        row = self.conn.execute(
+            """
+            SELECT COALESCE(
+                (SELECT MIN(id) FROM run_logs INDEXED BY idx_run_logs_started_status WHERE started_at >= ?),
+                (SELECT MAX(id) + 1 FROM run_logs),
+                1
+            )
+            """,
+            (since_epoch,),
+        ).fetchone()
+        return int(row[0])
+
+    def run_counts_by_hour(self, since_epoch: int, before_id: int | None = None) -> dict[int, tuple[int, int]]:
+        return run_counts_by_hour(self.conn, since_epoch, before_id)
+
+    def fetch_run_profiles(self, module_path: str, qualname: str, limit: int = 5) -> list[tuple[str, int, bytes]]:
+        # (module_path, started_at, stats) of the latest profiled runs, newest first.
+        cursor = self.conn.execute(
+            """
+            SELECT scheduled_functions.module_path, run_profiles.started_at, run_profiles.stats
+            FROM run_profiles
+            JOIN scheduled_functions ON run_profiles.scheduled_function_id = scheduled_functions.id
+            WHERE scheduled_functions.module_path = ? AND scheduled_functions.qualname = ?
+            ORDER BY run_profiles.started_at DESC, run_profiles.id DESC
+            LIMIT ?
+            """,
+            (module_path, qualname, limit),
+        )
+        return cursor.fetchall()
+
+
+def as_store(target: Store | sqlite3.Connection) -> Store:
+    # Lets callers keep passing a bare SQLite connection.
+    if isinstance(target, sqlite3.Connection):
+        return SQLiteStore(target)
+    return target
+
+
+def open_store(database: Path | str, read_only: bool = False, tuning: SQLiteTuning | None = None) -> Store:
+    # A postgresql:// URL selects the PostgreSQL store; anything else is a
+    # SQLite file path. Read-only stores are for the TUI and reports.
+    if str(database).startswith(POSTGRES_SCHEMES):
+        from scheduler.postgres import PostgresStore
+
+        return PostgresStore(str(database), read_only=read_only)
+    if read_only:
+        return SQLiteStore(db.connect_readonly(Path(database), tuning))
+    return SQLiteStore(db.init_db(Path(database), tuning))
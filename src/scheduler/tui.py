@@ -1,13 +1,28 @@
 from __future__ import annotations
 
+from bisect import bisect_left, insort
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime, timezone
+import select
 import sqlite3
+import sys
 import time
 from typing import Iterable
 
-from rich.console import Console
+from rich.console import Console, Group
+from rich.live import Live
 from rich.table import Table
+from rich.text import Text
+
+from scheduler.retention import DAY_SECONDS
+from scheduler.store import PERCENTILES, Store, as_store, percentile
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows: no paging keys, refresh only.
+    termios = None  # type: ignore[assignment]
 
 
 @dataclass(frozen=True)
@@ -16,6 +31,10 @@ class Summary:
     total_functions: int
     runs_last_24h: int
     failures_last_24h: int
+    runs_last_7d: int = 0
+    failures_last_7d: int = 0
+    last_scan_files: int | None = None
+    last_scan_duration_ms: int | None = None
 
 
 def format_status_summary(
@@ -24,103 +43,287 @@ def format_status_summary(
     total_functions: int,
     runs_last_24h: int,
     failures_last_24h: int,
+    runs_last_7d: int = 0,
+    failures_last_7d: int = 0,
+    last_scan_files: int | None = None,
+    last_scan_duration_ms: int | None = None,
 ) -> str:
     last_scan_text = "n/a" if last_scan is None else _format_epoch(last_scan)
+    if last_scan is not None and last_scan_files is not None and last_scan_duration_ms is not None:
+        last_scan_text += f" ({last_scan_files} files in {last_scan_duration_ms / 1000:.2f}s)"
     return (
         f"Last scan: {last_scan_text} | Functions: {total_functions} | "
-        f"Runs (24h): {runs_last_24h} | Failures (24h): {failures_last_24h}"
+        f"Runs (24h): {runs_last_24h} | Failures (24h): {failures_last_24h} | "
+        f"Runs (7d): {runs_last_7d} | Failures (7d): {failures_last_7d}"
+    )
+
+
+_SPARK_BLOCKS = " ▁▂▃▄▅▆▇█"
+
+
+def format_firing_histogram(counts: list[int]) -> str:
+    # One character per second bucket, scaled to the busiest bucket.
+    peak = max(counts, default=0)
+    if peak == 0:
+        return f"Upcoming firings ({len(counts)}s): none"
+    bars = "".join(
+        _SPARK_BLOCKS[0 if count == 0 else max(1, round(count * (len(_SPARK_BLOCKS) - 1) / peak))]
+        for count in counts
     )
+    return f"Upcoming firings ({len(counts)}s): |{bars}| peak {peak}/s"
+
+
+def format_percentiles(values: Iterable[float | None], scale: float = 1.0) -> str:
+    # "p50 / p95 / p99" in milliseconds; values are divided by scale first.
+    return " / ".join("n/a" if value is None else f"{value / scale:,.1f}" for value in values) + " ms"
 
 
 def _format_epoch(value: int) -> str:
     return datetime.fromtimestamp(value, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
 
 
-def _fetch_summary(conn: sqlite3.Connection) -> Summary:
-    last_scan_row = conn.execute("SELECT MAX(last_discovered_at) FROM scheduled_functions").fetchone()
-    last_scan = int(last_scan_row[0]) if last_scan_row and last_scan_row[0] is not None else None
-    total_functions_row = conn.execute("SELECT COUNT(*) FROM scheduled_functions").fetchone()
-    total_functions = int(total_functions_row[0]) if total_functions_row else 0
-
-    since = int(time.time()) - 24 * 60 * 60
-    runs_row = conn.execute(
-        "SELECT COUNT(*) FROM run_logs WHERE started_at >= ?",
-        (since,),
-    ).fetchone()
-    failures_row = conn.execute(
-        "SELECT COUNT(*) FROM run_logs WHERE started_at >= ? AND status = 'failure'",
-        (since,),
-    ).fetchone()
-    runs_last_24h = int(runs_row[0]) if runs_row else 0
-    failures_last_24h = int(failures_row[0]) if failures_row else 0
-    return Summary(
-        last_scan=last_scan,
-        total_functions=total_functions,
-        runs_last_24h=runs_last_24h,
-        failures_last_24h=failures_last_24h,
-    )
+class TuiState:
+    # What the TUI shows, kept in memory and refreshed from change cursors:
+    # run logs with id > run_log_id and functions with change_seq >
+    # function_seq. A refresh costs as much as the changes since the last one.
+    def __init__(
+        self,
+        store: Store | sqlite3.Connection,
+        recent_limit: int = 10,
+        window_seconds: int = 3600,
+        resync_seconds: int = 600,
+    ) -> None:
+        self.store = as_store(store)
+        self.recent_limit = recent_limit
+        self.window_seconds = window_seconds
+        self.resync_seconds = resync_seconds
+        self.functions: dict[int, tuple[str, int | None, int | None]] = {}
+        self.order: list[tuple[str, int]] = []
+        self.function_seq = -1
+        self.run_log_id = 0
+        # {hour start: [runs, failures]} over the last 7 days.
+        self.hour_counts: dict[int, list[int]] = {}
+        self.recent: deque[tuple[int, str, str]] = deque(maxlen=recent_limit)
+        # Timed runs inside the window: in id order overall and per function.
+        self.window: deque[tuple[int, int]] = deque()
+        self.samples: dict[int, deque[tuple[int, int, int | None]]] = {}
+        self.last_scan: tuple[int, int, int] | None = None
+        self.last_discovered_at: int | None = None
+        self.firings: list[int] = []
+        self.synced_at = 0
+        self.page = 0
 
+    def sync(self, now: int | None = None) -> None:
+        # Full reload, also run every resync_seconds: it picks up deleted
+        # functions and rows committed out of id order by concurrent writers.
+        now = int(time.time()) if now is None else now
+        self._load_functions()
+        self.last_scan = self.store.fetch_last_scan()
+        self.last_discovered_at = self.store.fetch_last_discovered_at() if self.last_scan is None else None
 
-def _fetch_recent_runs(conn: sqlite3.Connection, limit: int = 10) -> list[tuple]:
-    cursor = conn.execute(
-        """
-        SELECT run_logs.started_at, run_logs.status, scheduled_functions.qualname
-        FROM run_logs
-        JOIN scheduled_functions ON run_logs.scheduled_function_id = scheduled_functions.id
-        ORDER BY run_logs.started_at DESC
-        LIMIT ?
-        """,
-        (limit,),
-    )
-    return cursor.fetchall()
+        first_id = self.store.first_run_log_id_since(now - self.window_seconds)
+        self.hour_counts = {
+            hour: [runs, failures]
+            for hour, (runs, failures) in self.store.run_counts_by_hour(now - 7 * DAY_SECONDS, first_id).items()
+        }
+        self.run_log_id = first_id - 1
+        self.recent.clear()
+        self.window.clear()
+        self.samples.clear()
+        self._fetch_run_logs(now)
+        if len(self.recent) < self.recent_limit:
+            self.recent.clear()
+            self.recent.extend(reversed(self.store.fetch_recent_runs(self.recent_limit)))
+        self.firings = self.store.fetch_upcoming_firings(now)
+        self.synced_at = now
 
+    def refresh(self, now: int | None = None) -> None:
+        now = int(time.time()) if now is None else now
+        if now - self.synced_at >= self.resync_seconds:
+            self.sync(now)
+            return
+        for row in self.store.fetch_functions_changed(self.function_seq):
+            self._apply_function(*row)
+        self._fetch_run_logs(now)
+        last_scan = self.store.fetch_last_scan()
+        if last_scan != self.last_scan:
+            self.last_scan = last_scan
+            # Scans are the only writer that deletes functions.
+            if self.store.count_scheduled_functions() != len(self.functions):
+                self._load_functions()
+        self._expire(now)
+        self.firings = self.store.fetch_upcoming_firings(now)
 
-def _fetch_functions(conn: sqlite3.Connection) -> list[tuple]:
-    cursor = conn.execute(
-        """
-        SELECT qualname, next_run_at, last_run_at
-        FROM scheduled_functions
-        ORDER BY qualname ASC
-        """
-    )
-    return cursor.fetchall()
+    def _load_functions(self) -> None:
+        rows = self.store.fetch_functions_changed(-1)
+        self.functions = {row[0]: (str(row[1]), row[2], row[3]) for row in rows}
+        self.order = sorted((qualname, function_id) for function_id, (qualname, _, _) in self.functions.items())
+        self.function_seq = max((row[4] for row in rows), default=-1)
+
+    def _apply_function(
+        self, function_id: int, qualname: str, next_run_at: int | None, last_run_at: int | None, change_seq: int
+    ) -> None:
+        previous = self.functions.get(function_id)
+        if previous is None or previous[0] != qualname:
+            if previous is not None:
+                del self.order[bisect_left(self.order, (previous[0], function_id))]
+            insort(self.order, (str(qualname), function_id))
+        self.functions[function_id] = (str(qualname), next_run_at, last_run_at)
+        self.function_seq = max(self.function_seq, change_seq)
 
+    def _fetch_run_logs(self, now: int, batch: int = 10_000) -> None:
+        cutoff = now - self.window_seconds
+        while True:
+            rows = self.store.fetch_run_logs_after(self.run_log_id, batch)
+            for run_log_id, function_id, started_at, status, duration_ns, lag_ms in rows:
+                counts = self.hour_counts.setdefault(started_at - started_at % 3600, [0, 0])
+                counts[0] += status != "skipped"
+                counts[1] += status in ("failure", "timeout")
+                function = self.functions.get(function_id)
+                self.recent.append((started_at, status, "n/a" if function is None else function[0]))
+                if duration_ns is not None and started_at >= cutoff:
+                    self.window.append((started_at, function_id))
+                    self.samples.setdefault(function_id, deque()).append((started_at, duration_ns, lag_ms))
+                self.run_log_id = run_log_id
+            if len(rows) < batch:
+                return
 
-def render_once(conn: sqlite3.Connection, console: Console) -> None:
-    summary = _fetch_summary(conn)
-    console.clear()
-    console.print(format_status_summary(
+    def _expire(self, now: int) -> None:
+        cutoff = now - self.window_seconds
+        while self.window and self.window[0][0] < cutoff:
+            _, function_id = self.window.popleft()
+            samples = self.samples[function_id]
+            samples.popleft()
+            if not samples:
+                del self.samples[function_id]
+        oldest_hour = now - 7 * DAY_SECONDS
+        oldest_hour -= oldest_hour % 3600
+        for hour in [hour for hour in self.hour_counts if hour < oldest_hour]:
+            del self.hour_counts[hour]
+
+    def _counts_since(self, since_epoch: int) -> tuple[int, int]:
+        since_hour = since_epoch - since_epoch % 3600
+        buckets = [counts for hour, counts in self.hour_counts.items() if hour >= since_hour]
+        return sum(counts[0] for counts in buckets), sum(counts[1] for counts in buckets)
+
+    def summary(self, now: int | None = None) -> Summary:
+        now = int(time.time()) if now is None else now
+        runs_last_24h, failures_last_24h = self._counts_since(now - DAY_SECONDS)
+        runs_last_7d, failures_last_7d = self._counts_since(now - 7 * DAY_SECONDS)
+        last_scan, last_scan_files, last_scan_duration_ms = self.last_scan or (self.last_discovered_at, None, None)
+        return Summary(
+            last_scan=last_scan,
+            total_functions=len(self.functions),
+            runs_last_24h=runs_last_24h,
+            failures_last_24h=failures_last_24h,
+            runs_last_7d=runs_last_7d,
+            failures_last_7d=failures_last_7d,
+            last_scan_files=last_scan_files,
+            last_scan_duration_ms=last_scan_duration_ms,
+        )
+
+    def page_count(self, page_size: int) -> int:
+        return max(1, -(-len(self.order) // page_size))
+
+    def visible_functions(self, page_size: int) -> list[tuple[int, str, int | None, int | None]]:
+        self.page = min(self.page, self.page_count(page_size) - 1)
+        start = self.page * page_size
+        return [(function_id, *self.functions[function_id]) for _, function_id in self.order[start:start + page_size]]
+
+    def timings(self, function_id: int, now: int | None = None) -> tuple[int, tuple, tuple]:
+        # (runs, duration_ns percentiles, lag_ms percentiles) inside the window.
+        cutoff = (int(time.time()) if now is None else now) - self.window_seconds
+        samples = [sample for sample in self.samples.get(function_id, ()) if sample[0] >= cutoff]
+        durations = sorted(sample[1] for sample in samples)
+        lags = sorted(sample[2] for sample in samples if sample[2] is not None)
+        return (
+            len(samples),
+            tuple(percentile(durations, fraction) for fraction in PERCENTILES),
+            tuple(percentile(lags, fraction) for fraction in PERCENTILES),
+        )
+
+
+def render(state: TuiState, page_size: int) -> Group:
+    now = int(time.time())
+    summary = state.summary(now)
+    status = Text(format_status_summary(
         last_scan=summary.last_scan,
         total_functions=summary.total_functions,
         runs_last_24h=summary.runs_last_24h,
         failures_last_24h=summary.failures_last_24h,
+        runs_last_7d=summary.runs_last_7d,
+        failures_last_7d=summary.failures_last_7d,
+        last_scan_files=summary.last_scan_files,
+        last_scan_duration_ms=summary.last_scan_duration_ms,
     ))
 
-    functions_table = Table(title="Scheduled Functions")
-    functions_table.add_column("Function")
-    functions_table.add_column("Next Run")
-    functions_table.add_column("Last Run")
-    for qualname, next_run, last_run in _fetch_functions(conn):
-        next_text = _format_epoch(next_run) if next_run else "n/a"
-        last_text = _format_epoch(last_run) if last_run else "n/a"
-        functions_table.add_row(str(qualname), next_text, last_text)
-    if summary.total_functions == 0:
-        functions_table.add_row("No scheduled functions discovered yet", "", "")
-    console.print(functions_table)
+    visible = state.visible_functions(page_size)
+    functions_table = Table(
+        title=f"Scheduled Functions (page {state.page + 1}/{state.page_count(page_size)}; n/p to page, q to quit)"
+    )
+    for column in ("Function", "Next Run", "Last Run", "Runs (1h)", "Duration p50/p95/p99", "Lag p50/p95/p99"):
+        functions_table.add_column(column)
+    for function_id, qualname, next_run, last_run in visible:
+        runs, durations, lags = state.timings(function_id, now)
+        functions_table.add_row(
+            qualname,
+            _format_epoch(next_run) if next_run else "n/a",
+            _format_epoch(last_run) if last_run else "n/a",
+            str(runs),
+            format_percentiles(durations, 1_000_000) if runs else "",
+            format_percentiles(lags) if runs else "",
+        )
+    if not visible:
+        functions_table.add_row("No scheduled functions discovered yet", "", "", "", "", "")
 
     runs_table = Table(title="Recent Runs")
     runs_table.add_column("When")
     runs_table.add_column("Status")
     runs_table.add_column("Function")
-    for started_at, status, qualname in _fetch_recent_runs(conn):
-        runs_table.add_row(_format_epoch(started_at), status, str(qualname))
-    if summary.runs_last_24h == 0:
+    for started_at, status_text, qualname in reversed(state.recent):
+        runs_table.add_row(_format_epoch(started_at), status_text, qualname)
+    if not state.recent:
         runs_table.add_row("n/a", "n/a", "No runs yet")
-    console.print(runs_table)
+    return Group(status, Text(format_firing_histogram(state.firings)), functions_table, runs_table)
+
+
+def _page_size(console: Console, recent_limit: int) -> int:
+    # Whatever the summary lines, the recent runs table and the table
+    # borders leave of the terminal.
+    return max(5, console.size.height - recent_limit - 12)
+
+
+def _read_key(timeout: float) -> str | None:
+    if termios is None or not sys.stdin.isatty():
+        time.sleep(timeout)
+        return None
+    ready, _, _ = select.select([sys.stdin], [], [], timeout)
+    return sys.stdin.read(1) if ready else None
 
 
-def run_tui(conn: sqlite3.Connection, refresh_seconds: int) -> None:
+def run_tui(store: Store | sqlite3.Connection, refresh_seconds: int) -> None:
     console = Console()
-    while True:
-        render_once(conn, console)
-        time.sleep(refresh_seconds)
+    state = TuiState(store)
+    state.sync()
+    interactive = termios is not None and sys.stdin.isatty()
+    saved = termios.tcgetattr(sys.stdin) if interactive else None
+    try:
+        if interactive:
+            tty.setcbreak(sys.stdin)
+        with Live(console=console, screen=True, auto_refresh=False) as live:
+            next_refresh = time.monotonic() + refresh_seconds
+            while True:
+                live.update(render(state, _page_size(console, state.recent_limit)), refresh=True)
+                key = _read_key(max(next_refresh - time.monotonic(), 0))
+                if key == "q":
+                    return
+                if key == "n":
+                    state.page += 1
+                elif key == "p":
+                    state.page = max(state.page - 1, 0)
+                if time.monotonic() >= next_refresh:
+                    state.refresh()
+                    next_refresh = time.monotonic() + refresh_seconds
+    finally:
+        if saved is not None:
+            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, saved)
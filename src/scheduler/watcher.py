@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+from errno import ENOSPC
+import os
+from pathlib import Path
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable
+
+from scheduler.db import SQLiteTuning
+from scheduler.scanner import (
+    _SKIP_DIR_NAMES,
+    ScanReport,
+    _iter_python_files,
+    is_python_source,
+    scan,
+    scan_files,
+)
+from scheduler.store import open_store
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = (
+    _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+    | _IN_ONLYDIR
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+# Watchers' poll() returns the .py files touched since the last call, an empty
+# set when nothing happened within the timeout, or None when events were lost
+# and the caller has to fall back to a full scan.
+class InotifyWatcher:
+    def __init__(self, roots: list[Path]) -> None:
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._fd = fd
+        self._dirs: dict[int, Path] = {}
+        # Directories created later that could not be watched; the periodic
+        # full rescan still covers them.
+        self.unwatched: set[Path] = set()
+        try:
+            for root in roots:
+                self._watch_tree(root, strict=True)
+        except OSError:
+            os.close(fd)
+            raise
+
+    def _add_watch(self, directory: str) -> int:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            hint = " (raise fs.inotify.max_user_watches)" if errno == ENOSPC else ""
+            raise OSError(errno, os.strerror(errno) + hint, directory)
+        return wd
+
+    def _watch_tree(self, root: Path, strict: bool = False) -> set[Path]:
+        # Returns the .py files already present, which may predate the watch.
+        found = set()
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [name for name in dirnames if name not in _SKIP_DIR_NAMES]
+            if any(part in _SKIP_DIR_NAMES for part in Path(dirpath).parts):
+                dirnames[:] = []
+                continue
+            try:
+                self._dirs[self._add_watch(dirpath)] = Path(dirpath)
+            except OSError as exc:
+                if strict:
+                    raise
+                self.unwatched.add(Path(dirpath))
+                print(f"WARNING: cannot watch {dirpath}: {exc.strerror}; only full rescans will see changes there")
+            found.update(path for name in filenames if is_python_source(path := Path(dirpath, name)))
+        return found
+
+    def poll(self, timeout: float) -> set[Path] | None:
+        ready, _, _ = select.select([self._fd], [], [], max(0.0, timeout))
+        if not ready:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed: set[Path] = set()
+        full_rescan = False
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                full_rescan = True
+                continue
+            if mask & _IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            path = directory / os.fsdecode(name) if name else directory
+            if mask & _IN_ISDIR:
+                if path.name in _SKIP_DIR_NAMES:
+                    continue
+                if mask & (_IN_CREATE | _IN_MOVED_TO):
+                    changed |= self._watch_tree(path)
+                elif mask & (_IN_DELETE | _IN_MOVED_FROM):
+                    full_rescan = True
+            elif mask & (_IN_DELETE_SELF | _IN_MOVE_SELF):
+                full_rescan = True
+            elif is_python_source(path) and not mask & _IN_CREATE:
+                # CREATE is always followed by CLOSE_WRITE once the file is written.
+                changed.add(path)
+        return None if full_rescan else changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    # Fallback for platforms without inotify: stats every file each interval
+    # but only reports files whose mtime or size changed.
+    def __init__(self, roots: list[Path], interval_seconds: float = 1.0) -> None:
+        self._roots = roots
+        self._interval = interval_seconds
+        self._next_poll = time.monotonic() + interval_seconds
+        self._fingerprints = self._snapshot()
+
+    def _snapshot(self) -> dict[Path, tuple[int, int]]:
+        snapshot = {}
+        for root in self._roots:
+            for path in _iter_python_files(root):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll(self, timeout: float) -> set[Path] | None:
+        wait = self._next_poll - time.monotonic()
+        if wait > timeout:
+            time.sleep(max(0.0, timeout))
+            return set()
+        time.sleep(max(0.0, wait))
+        self._next_poll = time.monotonic() + self._interval
+        previous, self._fingerprints = self._fingerprints, self._snapshot()
+        return {
+            path
+            for path in previous.keys() | self._fingerprints.keys()
+            if previous.get(path) != self._fingerprints.get(path)
+        }
+
+    def close(self) -> None:
+        pass
+
+
+def create_watcher(roots: list[Path]) -> InotifyWatcher | PollingWatcher:
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(roots)
+        except AttributeError:
+            pass
+        except OSError as exc:
+            print(f"WARNING: inotify watch failed for {exc.filename or 'scan paths'}: {exc.strerror}; polling instead")
+    return PollingWatcher(roots)
+
+
+def next_batch(
+    watcher: InotifyWatcher | PollingWatcher,
+    timeout: float,
+    debounce_seconds: float,
+    max_batch_seconds: float = 2.0,
+) -> set[Path] | None:
+    # Waits up to timeout for a change, then keeps collecting until the tree
+    # has been quiet for debounce_seconds so a burst of saves is one batch.
+    first = watcher.poll(timeout)
+    if first is not None and not first:
+        return first
+    changed = first
+    deadline = time.monotonic() + max_batch_seconds
+    while (remaining := deadline - time.monotonic()) > 0:
+        more = watcher.poll(min(debounce_seconds, remaining))
+        if more is not None and not more:
+            break
+        changed = None if changed is None or more is None else changed | more
+    return changed
+
+
+def watch_loop(
+    database: Path | str,
+    scan_paths: list[Path],
+    stop: threading.Event,
+    discovery: str = "import",
+    workers: int = 1,
+    debounce_seconds: float = 0.2,
+    on_scan: Callable[[ScanReport], None] | None = None,
+    watcher: InotifyWatcher | PollingWatcher | None = None,
+    spread: bool = False,
+    tuning: SQLiteTuning | None = None,
+) -> None:
+    store = open_store(database, tuning=tuning)
+    watcher = watcher or create_watcher(scan_paths)
+    try:
+        while not stop.is_set():
+            changed = next_batch(watcher, timeout=0.5, debounce_seconds=debounce_seconds)
+            if changed is not None and not changed:
+                continue
+            try:
+                if changed is None:
+                    report = scan(store, scan_paths, discovery=discovery, workers=workers, spread=spread)
+                else:
+                    report = scan_files(store, changed, discovery=discovery, workers=workers, spread=spread)
+            except store.transient_errors as exc:
+                print(f"WARNING: watch rescan failed: {exc}")
+                continue
+            if on_scan is not None:
+                on_scan(report)
+    finally:
+        watcher.close()
+        store.close()
+
+
+def start_watch_thread(
+    database: Path | str,
+    scan_paths: list[Path],
+    discovery: str = "import",
+    workers: int = 1,
+    debounce_seconds: float = 0.2,
+    on_scan: Callable[[ScanReport], None] | None = None,
+    spread: bool = False,
+    tuning: SQLiteTuning | None = None,
+) -> tuple[threading.Thread, threading.Event]:
+    stop = threading.Event()
+    # Build the watcher before returning so no edit made after this call is missed.
+    watcher = create_watcher(scan_paths)
+    thread = threading.Thread(
+        target=watch_loop,
+        args=(database, scan_paths, stop, discovery, workers, debounce_seconds, on_scan, watcher, spread, tuning),
+        name="scheduler-watch",
+        daemon=True,
+    )
+    thread.start()
+    return thread, stop
@@ -0,0 +1,47 @@
+import json
+
+from scheduler.bench import BenchSize, compare, run_benchmarks
+from scheduler.cli import main
+
+
+def test_benchmarks_report_every_measurement() -> None:
+    results = run_benchmarks(BenchSize(files=3, functions_per_file=2, jobs=20, run_logs=200, repeat=1))
+    assert set(results["results"]) == {
+        "scan_files_per_sec",
+        "rescan_files_per_sec",
+        "dispatch_us_per_job",
+        "fetch_due_ms",
+        "tui_recent_runs_ms",
+        "tui_upcoming_firings_ms",
+        "tui_sync_ms",
+        "tui_refresh_ms",
+        "cron_next_fire_per_sec",
+    }
+    assert all(result["value"] > 0 for result in results["results"].values())
+
+
+def test_compare_flags_regressions_in_either_direction() -> None:
+    baseline = {"results": {
+        "scan": {"value": 100.0, "unit": "files/s", "better": "higher"},
+        "query": {"value": 2.0, "unit": "ms", "better": "lower"},
+        "dispatch": {"value": 10.0, "unit": "us", "better": "lower"},
+    }}
+    current = {"results": {
+        "scan": {"value": 70.0, "unit": "files/s", "better": "higher"},
+        "query": {"value": 1.0, "unit": "ms", "better": "lower"},
+        "dispatch": {"value": 11.0, "unit": "us", "better": "lower"},
+        "new": {"value": 1.0, "unit": "ms", "better": "lower"},
+    }}
+    rows = {name: (round(change, 3), regressed) for name, _, _, change, regressed in compare(current, baseline, 0.2)}
+    assert rows == {"scan": (-0.3, True), "query": (1.0, False), "dispatch": (-0.091, False)}
+
+
+def test_bench_command_fails_on_regression(tmp_path, capsys) -> None:
+    args = ["bench", "--only", "cron", "--jobs", "10", "--repeat", "1", "--output", str(tmp_path / "run.json")]
+    assert main(args) == 0
+    baseline = json.loads((tmp_path / "run.json").read_text(encoding="utf-8"))
+    baseline["results"]["cron_next_fire_per_sec"]["value"] *= 100
+    (tmp_path / "baseline.json").write_text(json.dumps(baseline), encoding="utf-8")
+
+    assert main([*args, "--baseline", str(tmp_path / "baseline.json")]) == 1
+    assert "REGRESSION" in capsys.readouterr().err
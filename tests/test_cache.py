@@ -0,0 +1,103 @@
+import os
+from pathlib import Path
+import threading
+import time
+import types
+
+from scheduler.cache import ModuleCache
+
+
+def _write_module(path: Path, value: str) -> None:
+    path.write_text(f"def job():\n    return {value!r}\n", encoding="utf-8")
+
+
+def _exec_module(path: str) -> types.ModuleType:
+    module = types.ModuleType(Path(path).stem)
+    exec(Path(path).read_text(encoding="utf-8"), module.__dict__)
+    return module
+
+
+def test_module_cache_hits_until_file_changes(tmp_path: Path) -> None:
+    module_path = tmp_path / "jobs.py"
+    _write_module(module_path, "one")
+    loads = []
+
+    def loader(path: str) -> types.ModuleType:
+        loads.append(path)
+        return _exec_module(path)
+
+    cache = ModuleCache(loader)
+    assert cache.get(str(module_path), "jobs.job")() == "one"
+    assert cache.get(str(module_path), "jobs.job")() == "one"
+    assert len(loads) == 1
+
+    _write_module(module_path, "two!")
+    stat = module_path.stat()
+    os.utime(module_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert cache.get(str(module_path), "jobs.job")() == "two!"
+    assert len(loads) == 2
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.size) == (1, 2, 1)
+
+
+def test_jobs_in_one_module_share_one_load(tmp_path: Path) -> None:
+    module_path = tmp_path / "jobs.py"
+    module_path.write_text(
+        "calls = []\n\ndef first():\n    calls.append(1)\n    return calls\n\ndef second():\n    return calls\n",
+        encoding="utf-8",
+    )
+    loads = []
+    cache = ModuleCache(lambda path: loads.append(path) or _exec_module(path))
+
+    calls = cache.get(str(module_path), "jobs.first")()
+    assert cache.get(str(module_path), "jobs.second")() is calls == [1]
+    assert len(loads) == 1
+
+
+def test_module_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.py"
+        _write_module(path, name)
+        paths.append(str(path))
+    cache = ModuleCache(_exec_module, max_entries=2)
+
+    first = cache.get(paths[0], "a.job")
+    cache.get(paths[1], "b.job")
+    cache.get(paths[0], "a.job")
+    cache.get(paths[2], "c.job")
+
+    assert cache.get(paths[0], "a.job") is first
+    stats = cache.stats()
+    assert stats.evictions == 1
+    assert stats.size == 2
+    assert stats.misses == 3
+
+    cache.resize(0)
+    cache.get(paths[1], "b.job")
+    assert cache.stats().size == 3
+
+
+def test_threads_missing_on_one_module_load_it_once(tmp_path: Path) -> None:
+    module_path = tmp_path / "jobs.py"
+    _write_module(module_path, "one")
+    loads = []
+
+    def slow_loader(path: str) -> types.ModuleType:
+        loads.append(path)
+        time.sleep(0.2)
+        return _exec_module(path)
+
+    cache = ModuleCache(slow_loader)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get(str(module_path), "jobs.job"))) for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+    assert len({id(job) for job in results}) == 1
+    assert (cache.stats().hits, cache.stats().misses) == (3, 1)
@@ -5,7 +5,7 @@ def test_build_parser_defines_subcommands() -> None:
     parser = build_parser()
     subparsers = parser._subparsers  # type: ignore[attr-defined]
     assert subparsers is not None
-    assert set(subparsers._group_actions[0].choices.keys()) == {"run", "scan", "tui"}
+    assert set(subparsers._group_actions[0].choices.keys()) == {"run", "scan", "tui", "compact", "bench", "profile"}
 
 
 def test_module_main_exposes_main() -> None:
@@ -52,6 +52,8 @@ def test_scan_command_prints_discovered_count(tmp_path, capsys) -> None:
     main(["--config", str(config_path), "scan"])
     captured = capsys.readouterr()
     assert "discovered 1 scheduled function" in captured.out
+    assert "scanned 1 file(s) (1 changed)" in captured.out
+    assert "files/sec" in captured.out
 
 
 def test_global_config_flag_before_subcommand(tmp_path, capsys):
@@ -85,3 +87,108 @@ def test_global_config_flag_before_subcommand(tmp_path, capsys):
     main(["--config", str(config_path), "run", "--once"])
     captured = capsys.readouterr()
     assert "discovered 1 scheduled function" in captured.out
+
+
+def test_profile_command_toggles_and_prints_profiles(tmp_path, capsys) -> None:
+    from scheduler.cli import main
+
+    tasks_dir = tmp_path / "tasks"
+    tasks_dir.mkdir()
+    (tasks_dir / "sample.py").write_text(
+        "from datetime import timedelta\n"
+        "from scheduler.decorators import schedule\n\n"
+        "@schedule(timedelta(seconds=10))\n"
+        "def job():\n"
+        "    return sorted(range(1000))\n",
+        encoding="utf-8",
+    )
+    config_path = tmp_path / "scheduler.toml"
+    config_path.write_text(
+        f"scan_paths = [\"{tasks_dir}\"]\n"
+        "scan_interval_seconds = 60\n"
+        "runner_poll_seconds = 5\n"
+        f"db_path = \"{tmp_path / 'scheduler.db'}\"\n"
+        "tui_refresh_seconds = 2\n",
+        encoding="utf-8",
+    )
+    config = ["--config", str(config_path)]
+    main([*config, "scan"])
+    assert main([*config, "profile", "sample.missing", "--enable", "cpu"]) == 1
+    assert main([*config, "profile", "sample.job", "--enable", "both"]) == 0
+
+    from scheduler.db import init_db
+
+    conn = init_db(tmp_path / "scheduler.db")
+    conn.execute("UPDATE scheduled_functions SET next_run_at = 0")
+    conn.commit()
+    main([*config, "run", "--once"])
+    capsys.readouterr()
+
+    main([*config, "profile", "sample.job"])
+    out = capsys.readouterr().out
+    assert "sample.job (" in out
+    assert "{built-in method builtins.sorted}" in out
+    assert "peak traced memory" in out
+
+    assert main([*config, "profile", "sample.job", "--disable"]) == 0
+    assert conn.execute("SELECT profile FROM scheduled_functions").fetchone() == (None,)
+
+
+def test_profile_command_needs_a_file_for_shared_names(tmp_path, capsys) -> None:
+    from scheduler.cli import main
+    from scheduler.db import init_db
+
+    job = (
+        "from datetime import timedelta\n"
+        "from scheduler.decorators import schedule\n\n"
+        "@schedule(timedelta(seconds=10))\n"
+        "def cleanup():\n"
+        "    return None\n"
+    )
+    for folder in ("billing", "reports"):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "jobs.py").write_text(job, encoding="utf-8")
+    config_path = tmp_path / "scheduler.toml"
+    config_path.write_text(
+        f"scan_paths = [\"{tmp_path / 'billing'}\", \"{tmp_path / 'reports'}\"]\n"
+        "scan_interval_seconds = 60\n"
+        "runner_poll_seconds = 5\n"
+        f"db_path = \"{tmp_path / 'scheduler.db'}\"\n"
+        "tui_refresh_seconds = 2\n",
+        encoding="utf-8",
+    )
+    config = ["--config", str(config_path)]
+    main([*config, "scan"])
+    capsys.readouterr()
+
+    assert main([*config, "profile", "jobs.cleanup", "--enable", "cpu"]) == 1
+    err = capsys.readouterr().err
+    assert "'jobs.cleanup' matches 2 scheduled functions; pass --file" in err
+    assert str(tmp_path / "billing" / "jobs.py") in err
+
+    reports = str(tmp_path / "reports" / "jobs.py")
+    assert main([*config, "profile", "jobs.cleanup", "--file", reports, "--enable", "cpu"]) == 0
+    conn = init_db(tmp_path / "scheduler.db")
+    profiled = conn.execute("SELECT module_path FROM scheduled_functions WHERE profile IS NOT NULL").fetchall()
+    assert profiled == [(reports,)]
+
+
+def test_tui_command_reports_an_old_schema(tmp_path, capsys) -> None:
+    from scheduler.cli import main
+    from scheduler.db import init_db
+
+    db_path = tmp_path / "scheduler.db"
+    conn = init_db(db_path)
+    conn.execute("PRAGMA user_version = 1")
+    conn.close()
+    config_path = tmp_path / "scheduler.toml"
+    config_path.write_text(
+        f"scan_paths = [\"{tmp_path}\"]\nscan_interval_seconds = 60\nrunner_poll_seconds = 5\n"
+        f"tui_refresh_seconds = 2\ndb_path = \"{db_path}\"\n",
+        encoding="utf-8",
+    )
+
+    assert main(["--config", str(config_path), "tui"]) == 1
+    captured = capsys.readouterr()
+    assert captured.err.startswith("ERROR: database schema version 1 does not match")
+    assert "run `scheduler scan` to migrate it" in captured.err
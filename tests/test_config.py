@@ -39,3 +39,76 @@ def test_load_config_requires_all_keys(tmp_path: Path) -> None:
 
     with pytest.raises(ValueError, match="missing required config keys"):
         load_config(config_path)
+
+
+def test_load_config_executor_defaults_and_validation(tmp_path: Path) -> None:
+    base = (
+        "scan_paths = []\n"
+        "scan_interval_seconds = 60\n"
+        "runner_poll_seconds = 5\n"
+        "db_path = \"scheduler.db\"\n"
+        "tui_refresh_seconds = 2\n"
+    )
+    config_path = tmp_path / "scheduler.toml"
+    config_path.write_text(base, encoding="utf-8")
+    config = load_config(config_path)
+    assert config.executor == "thread"
+    assert config.max_workers == 4
+    assert config.spread is False
+    assert config.lease_seconds == 60
+    assert config.metrics_port == 0
+    assert config.module_cache_size == 1024
+    assert config.run_log_retention_days == 0  # raw run logs are only deleted on request
+    assert config.sqlite_tuning.synchronous == "NORMAL"
+
+    config_path.write_text(base + "executor = \"process\"\nmax_workers = 8\n", encoding="utf-8")
+    config = load_config(config_path)
+    assert config.executor == "process"
+    assert config.max_workers == 8
+
+    config_path.write_text(base + "worker_max_runs = 0\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="worker_max_runs must be at least 1"):
+        load_config(config_path)
+
+    config_path.write_text(base + "database_url = \"mysql://localhost/scheduler\"\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="postgresql://"):
+        load_config(config_path)
+
+    config_path.write_text(base + "sqlite_synchronous = \"fast\"\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="invalid sqlite_synchronous"):
+        load_config(config_path)
+
+    config_path.write_text(base + "metrics_port = 70000\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="metrics_port must be between"):
+        load_config(config_path)
+
+    config_path.write_text(base.replace("scan_interval_seconds = 60", "scan_interval_seconds = 0"), encoding="utf-8")
+    with pytest.raises(ValueError, match="scan_interval_seconds must be at least 1"):
+        load_config(config_path)
+
+    config_path.write_text(base + "retention_interval_seconds = 0\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="retention_interval_seconds must be at least 1"):
+        load_config(config_path)
+
+    config_path.write_text(base + "module_cache_size = -1\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="module_cache_size must not be negative"):
+        load_config(config_path)
+
+    config_path.write_text(base + 'watch = "false"\n', encoding="utf-8")
+    with pytest.raises(ValueError, match="watch must be true or false, not 'false'"):
+        load_config(config_path)
+
+    config_path.write_text(base + "spread = 1\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="spread must be true or false"):
+        load_config(config_path)
+
+    config_path.write_text(base + "watch = true\n", encoding="utf-8")
+    assert load_config(config_path).watch is True
+
+    config_path.write_text(base + "claim_batch = 0\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="claim_batch must be at least 1"):
+        load_config(config_path)
+
+    config_path.write_text(base + "executor = \"fibers\"\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="invalid executor"):
+        load_config(config_path)
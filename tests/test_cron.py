@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from scheduler.cron import CronTrigger, compile_trigger
+
+
+def _epoch(*args: int) -> int:
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+
+@pytest.mark.parametrize(
+    ("expression", "after", "expected"),
+    [
+        ("0 2 * * 1-5", _epoch(2024, 5, 3, 2, 0), _epoch(2024, 5, 6, 2, 0)),  # Friday -> Monday
+        ("0,15,30,45 * * * *", _epoch(2024, 5, 3, 23, 50), _epoch(2024, 5, 4, 0, 0)),
+        ("*/20 9-17 * * *", _epoch(2024, 5, 3, 17, 41), _epoch(2024, 5, 4, 9, 0)),
+        ("0 0 29 2 *", _epoch(2024, 3, 1), _epoch(2028, 2, 29)),
+        ("0 12 13 * fri", _epoch(2024, 9, 6, 12), _epoch(2024, 9, 13, 12)),  # day of month OR weekday
+        ("0 12 13 * fri", _epoch(2024, 9, 13, 12), _epoch(2024, 9, 20, 12)),
+        ("@monthly", _epoch(2024, 12, 31, 23, 59, 59), _epoch(2025, 1, 1)),
+        ("0 6 * jan,jul sun", _epoch(2024, 2, 1), _epoch(2024, 7, 7, 6)),
+    ],
+)
+def test_next_fire_matches_calendar(expression: str, after: int, expected: int) -> None:
+    assert CronTrigger(expression).next_fire(after) == expected
+
+
+def test_next_fire_handles_dst_transitions() -> None:
+    trigger = compile_trigger("CRON_TZ=America/New_York 30 2 * * *")
+    assert trigger.spec == "CRON_TZ=America/New_York 30 2 * * *"
+    # 02:30 does not exist on 2024-03-10; the run shifts to 03:30 EDT.
+    assert trigger.next_fire(_epoch(2024, 3, 9, 12)) == _epoch(2024, 3, 10, 7, 30)
+
+    # 01:30 happens twice on 2024-11-03 but fires once.
+    trigger = CronTrigger("30 1 * * *", "America/New_York")
+    first = trigger.next_fire(_epoch(2024, 11, 2, 12))
+    assert first == _epoch(2024, 11, 3, 5, 30)
+    assert trigger.next_fire(first) == _epoch(2024, 11, 4, 6, 30)
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* * * * mon-funday", "*/0 * * * *", "5-1 * * * *"])
+def test_invalid_expressions_are_rejected(expression: str) -> None:
+    with pytest.raises(ValueError):
+        CronTrigger(expression)
+    with pytest.raises(ValueError, match="unknown timezone"):
+        CronTrigger("* * * * *", "Mars/Olympus_Mons")
+
+
+def test_expressions_that_never_fire_are_rejected() -> None:
+    with pytest.raises(ValueError, match="never fires"):
+        CronTrigger("0 0 31 2 *")
+    # Leap days are fine.
+    assert CronTrigger("0 0 29 2 *").next_fire(_epoch(2025, 1, 1)) == _epoch(2028, 2, 29)
@@ -1,11 +1,31 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 from pathlib import Path
+import sqlite3
 import time
 
+import pytest
+
 from scheduler.db import (
+    SCHEMA_VERSION,
+    DiscoveredFunction,
+    SQLiteTuning,
+    WriteBuffer,
+    claim_due_functions,
+    connect_readonly,
+    explain_query_plan,
+    first_run_at,
+    migrate,
+    schema_version,
     init_db,
+    list_scheduled_functions,
     upsert_scheduled_function,
+    upsert_scheduled_functions,
     record_run_log,
     fetch_due_functions,
+    release_leases,
+    stagger_offset,
+    transaction,
 )
 
 
@@ -34,3 +54,189 @@ def test_db_upsert_and_due_query(tmp_path: Path) -> None:
         status="success",
         error_message=None,
     )
+
+
+def _count(path: Path, table: str) -> int:
+    reader = sqlite3.connect(path)
+    try:
+        return reader.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        reader.close()
+
+
+def test_transaction_groups_per_row_writes_into_one_commit(tmp_path: Path) -> None:
+    db_path = tmp_path / "scheduler.db"
+    conn = init_db(db_path)
+
+    with transaction(conn):
+        for index in range(3):
+            record_run_log(conn, scheduled_function_id=1, started_at=index, finished_at=index, status="success", error_message=None)
+        assert _count(db_path, "run_logs") == 0
+    assert _count(db_path, "run_logs") == 3
+
+    with pytest.raises(RuntimeError):
+        with transaction(conn):
+            record_run_log(conn, scheduled_function_id=1, started_at=9, finished_at=9, status="success", error_message=None)
+            raise RuntimeError("abort")
+    assert _count(db_path, "run_logs") == 3
+
+
+def test_write_buffer_flushes_by_size_and_on_exit(tmp_path: Path) -> None:
+    db_path = tmp_path / "scheduler.db"
+    conn = init_db(db_path)
+
+    with WriteBuffer(conn, max_rows=3) as buffer:
+        for index in range(4):
+            buffer.record_run_log(index, started_at=0, finished_at=1, status="success", error_message=None)
+        assert buffer.pending == 1
+        assert _count(db_path, "run_logs") == 3
+    assert _count(db_path, "run_logs") == 4
+
+    upsert_scheduled_functions(conn, [("/tmp/a.py", "a.job", 10), ("/tmp/b.py", "b.job", 20)])
+    assert [row.qualname for row in list_scheduled_functions(conn)] == ["a.job", "b.job"]
+
+
+def test_migrations_are_versioned_and_idempotent(tmp_path: Path) -> None:
+    db_path = tmp_path / "scheduler.db"
+    conn = init_db(db_path)
+    assert schema_version(conn) == SCHEMA_VERSION
+    conn.close()
+
+    conn = init_db(db_path)
+    assert migrate(conn) == SCHEMA_VERSION
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_scheduled_functions_due", "idx_run_logs_started_status"} <= indexes
+
+
+def _open_and_close(db_path: str) -> int:
+    conn = init_db(Path(db_path))
+    try:
+        return schema_version(conn)
+    finally:
+        conn.close()
+
+
+def test_processes_opening_a_new_database_together_migrate_it_once(tmp_path: Path) -> None:
+    context = multiprocessing.get_context("spawn")
+    paths = [str(tmp_path / f"scheduler{index}.db") for index in range(5)]
+    with ProcessPoolExecutor(max_workers=6, mp_context=context) as pool:
+        versions = list(pool.map(_open_and_close, [path for path in paths for _ in range(6)]))
+    assert versions == [SCHEMA_VERSION] * len(versions)
+
+
+def test_hot_queries_use_indexes(tmp_path: Path) -> None:
+    from scheduler.tui import TuiState
+
+    conn = init_db(tmp_path / "scheduler.db")
+    statements: list[str] = []
+    conn.set_trace_callback(statements.append)
+    fetch_due_functions(conn, now_epoch=int(time.time()))
+    TuiState(conn).sync()
+    conn.set_trace_callback(None)
+
+    due_plan = next(explain_query_plan(conn, sql) for sql in statements if "next_run_at <=" in sql)
+    assert any("USING INDEX idx_scheduled_functions_due" in step for step in due_plan)
+
+    run_plans = [explain_query_plan(conn, sql) for sql in statements if "FROM run_logs" in sql]
+    assert len(run_plans) >= 3
+    for plan in run_plans:
+        assert any(step.startswith(("SEARCH run_logs USING", "SCAN run_logs USING INDEX")) for step in plan), plan
+        assert not any("TEMP B-TREE FOR ORDER BY" in step for step in plan)
+
+
+
+def test_change_seq_moves_only_for_schedule_changes(tmp_path: Path) -> None:
+    from scheduler.store import SQLiteStore
+
+    conn = init_db(tmp_path / "scheduler.db")
+    store = SQLiteStore(conn)
+    first = upsert_scheduled_function(conn, "/tmp/jobs.py", "jobs.first", 60)
+    second = upsert_scheduled_function(conn, "/tmp/jobs.py", "jobs.second", 60)
+    cursor = max(row[4] for row in store.fetch_functions_changed(-1))
+
+    # Leases and rediscovery leave change_seq alone; due times move it.
+    claim_due_functions(conn, "runner-a", int(time.time()) + 3600, 60)
+    upsert_scheduled_function(conn, "/tmp/jobs.py", "jobs.first", 60)
+    assert store.fetch_functions_changed(cursor) == []
+    conn.execute("UPDATE scheduled_functions SET next_run_at = 5 WHERE id = ?", (second,))
+    conn.execute("UPDATE scheduled_functions SET last_run_at = 7 WHERE id = ?", (first,))
+    assert [row[:4] for row in store.fetch_functions_changed(cursor)] == [
+        (second, "jobs.second", 5, None),
+        (first, "jobs.first", conn.execute("SELECT next_run_at FROM scheduled_functions WHERE id = ?", (first,)).fetchone()[0], 7),
+    ]
+    cursor = max(row[4] for row in store.fetch_functions_changed(-1))
+    conn.execute("UPDATE scheduled_functions SET timeout_seconds = 5 WHERE id = ?", (first,))
+    changed = store.list_scheduled_functions_changed(cursor)
+    assert [(seq > cursor, scheduled.timeout_seconds) for seq, scheduled in changed] == [(True, 5)]
+
+    changed_plan = explain_query_plan(conn, "SELECT id FROM scheduled_functions WHERE change_seq > 0 ORDER BY change_seq")
+    assert any("idx_scheduled_functions_change_seq" in step for step in changed_plan)
+
+
+def test_spread_first_runs_are_stable_and_even() -> None:
+    assert stagger_offset("/tmp/jobs.py", "jobs.a", 60) == stagger_offset("/tmp/jobs.py", "jobs.a", 60)
+    now = 6_000_030
+    starts = [
+        first_run_at("/tmp/jobs.py", DiscoveredFunction(f"jobs.task{index}", 60), now, spread=True)
+        for index in range(600)
+    ]
+    assert all(now < start <= now + 60 for start in starts)
+    assert all((start - now + 30) % 60 == stagger_offset("/tmp/jobs.py", f"jobs.task{index}", 60)
+               for index, start in enumerate(starts))
+    per_10s = [sum(1 for start in starts if (start - now - 1) // 10 == bucket) for bucket in range(6)]
+    assert min(per_10s) > 60
+
+    jittered = first_run_at("/tmp/jobs.py", DiscoveredFunction("jobs.a", 60, jitter_seconds=5), now)
+    assert now + 60 <= jittered <= now + 65
+
+
+def test_claims_are_exclusive_until_the_lease_expires(tmp_path: Path) -> None:
+    conn = init_db(tmp_path / "scheduler.db")
+    for name in ("a", "b", "c"):
+        upsert_scheduled_function(conn, "/tmp/example.py", f"example.{name}", 60)
+    conn.execute("UPDATE scheduled_functions SET next_run_at = 100")
+    conn.commit()
+    other = init_db(tmp_path / "scheduler.db")
+
+    assert len(claim_due_functions(conn, "node-a", 200, 30, limit=2)) == 2
+    assert [row.qualname for row in claim_due_functions(other, "node-b", 200, 30)] == ["example.c"]
+    assert claim_due_functions(other, "node-c", 229, 30) == []
+    assert len(claim_due_functions(other, "node-c", 230, 30)) == 3  # the earlier leases expired
+
+    release_leases(other, "node-c")
+    assert {row.lease_owner for row in list_scheduled_functions(conn)} == {None}
+
+
+def test_rediscovery_replaces_a_changed_cron_trigger(tmp_path: Path) -> None:
+    conn = init_db(tmp_path / "scheduler.db")
+    upsert_scheduled_function(conn, "/tmp/example.py", "example.task", 0, trigger="0 2 * * *")
+    upsert_scheduled_function(conn, "/tmp/example.py", "example.task", 0, trigger="0 3 * * *")
+
+    (scheduled,) = list_scheduled_functions(conn)
+    assert scheduled.trigger == "0 3 * * *"
+    assert time.gmtime(scheduled.next_run_at).tm_hour == 3
+
+
+def test_readonly_connections_never_write(tmp_path: Path) -> None:
+    from scheduler.tui import TuiState
+
+    db_path = tmp_path / "scheduler.db"
+    tuning = SQLiteTuning(synchronous="NORMAL", busy_timeout_ms=1234, mmap_size_bytes=1 << 20)
+    writer = init_db(db_path, tuning)
+    assert [writer.execute(f"PRAGMA {name}").fetchone()[0] for name in ("synchronous", "busy_timeout")] == [1, 1234]
+    upsert_scheduled_function(writer, "/tmp/example.py", "example.task", 60)
+
+    reader = connect_readonly(db_path, tuning)
+    assert reader.execute("PRAGMA query_only").fetchone()[0] == 1
+    with pytest.raises(sqlite3.OperationalError):
+        reader.execute("DELETE FROM scheduled_functions")
+    writer.execute("BEGIN IMMEDIATE")
+    writer.execute("UPDATE scheduled_functions SET next_run_at = 0")
+    state = TuiState(reader)
+    state.sync()  # not blocked by the open write
+    assert state.summary().total_functions == 1
+    writer.rollback()
+
+    writer.execute("PRAGMA user_version = 1")
+    with pytest.raises(RuntimeError, match="does not match"):
+        connect_readonly(db_path)
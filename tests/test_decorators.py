@@ -1,5 +1,7 @@
 from datetime import timedelta
 
+import pytest
+
 from scheduler.decorators import schedule
 
 
@@ -9,3 +11,54 @@ def test_schedule_sets_interval_seconds() -> None:
         return None
 
     assert getattr(sample_task, "__scheduler_interval_seconds__") == 3720
+    assert getattr(sample_task, "__scheduler_timeout_seconds__") is None
+
+
+def test_schedule_sets_timeout_seconds() -> None:
+    @schedule(timedelta(minutes=5), timeout=timedelta(seconds=2.5))
+    def sample_task() -> None:
+        return None
+
+    assert getattr(sample_task, "__scheduler_timeout_seconds__") == 3
+
+
+def test_schedule_validates_overlap_policy() -> None:
+    @schedule(timedelta(minutes=1), max_instances=3, overlap="skip")
+    def sample_task() -> None:
+        return None
+
+    assert getattr(sample_task, "__scheduler_max_instances__") == 3
+    assert getattr(sample_task, "__scheduler_overlap__") == "skip"
+    with pytest.raises(ValueError, match="invalid overlap"):
+        schedule(timedelta(minutes=1), overlap="pile-up")
+    with pytest.raises(ValueError, match="max_instances"):
+        schedule(timedelta(minutes=1), max_instances=0)
+
+
+def test_schedule_sets_misfire_policy() -> None:
+    @schedule(timedelta(days=1), misfire="skip", misfire_grace=timedelta(minutes=10), fixed_rate=True)
+    def sample_task() -> None:
+        return None
+
+    assert getattr(sample_task, "__scheduler_misfire__") == "skip"
+    assert getattr(sample_task, "__scheduler_misfire_grace_seconds__") == 600
+    assert getattr(sample_task, "__scheduler_fixed_rate__") is True
+    with pytest.raises(ValueError, match="invalid misfire"):
+        schedule(timedelta(minutes=1), misfire="later")
+    with pytest.raises(ValueError, match="jitter cannot be combined with fixed_rate"):
+        schedule(timedelta(minutes=1), fixed_rate=True, jitter=timedelta(seconds=5))
+
+
+def test_schedule_accepts_cron_triggers() -> None:
+    @schedule(cron="0 2 * * mon-fri", timezone="Europe/Paris")
+    def nightly() -> None:
+        return None
+
+    assert getattr(nightly, "__scheduler_interval_seconds__") == 0
+    assert getattr(nightly, "__scheduler_trigger__") == "CRON_TZ=Europe/Paris 0 2 * * mon-fri"
+    with pytest.raises(ValueError, match="exactly one of interval or cron"):
+        schedule(timedelta(minutes=1), cron="* * * * *")
+    with pytest.raises(ValueError, match="cron expression needs 5 fields"):
+        schedule(cron="every day")
+    with pytest.raises(ValueError, match="never fires"):
+        schedule(cron="0 0 31 2 *")
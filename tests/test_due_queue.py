@@ -0,0 +1,44 @@
+from dataclasses import replace
+import threading
+import time
+
+from scheduler.db import ScheduledFunction
+from scheduler.due_queue import DueQueue
+
+
+def _job(job_id: int, next_run_at: int, enabled: int = 1) -> ScheduledFunction:
+    return ScheduledFunction(
+        id=job_id,
+        module_path="/tmp/jobs.py",
+        qualname=f"jobs.job_{job_id}",
+        interval_seconds=60,
+        last_discovered_at=0,
+        enabled=enabled,
+        last_run_at=None,
+        next_run_at=next_run_at,
+    )
+
+
+def test_due_queue_pops_in_deadline_order_and_skips_stale_entries() -> None:
+    queue = DueQueue()
+    queue.load([_job(1, 30), _job(2, 10), _job(3, 20), _job(4, 5, enabled=0)])
+    queue.push(replace(_job(3, 20), next_run_at=100))
+
+    assert queue.next_deadline() == 10
+    assert [job.id for job in queue.pop_due(30)] == [2, 1]
+    assert queue.next_deadline() == 100
+    assert len(queue) == 1
+
+    queue.discard(3)
+    assert queue.next_deadline() is None
+    assert queue.pop_due(1000) == []
+
+
+def test_due_queue_wait_returns_early_when_woken() -> None:
+    queue = DueQueue()
+    threading.Timer(0.05, queue.wake).start()
+
+    started = time.monotonic()
+    assert queue.wait(5) is True
+    assert time.monotonic() - started < 1
+    assert queue.wait(0) is False
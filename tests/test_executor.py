@@ -0,0 +1,118 @@
+from functools import partial
+
+import pytest
+
+from scheduler.executor import AsyncioExecutor, InlineExecutor, IsolatedExecutor, JobTimeout, create_executor
+
+
+def test_inline_executor_runs_immediately() -> None:
+    future = InlineExecutor().submit(lambda value: value * 2, 21)
+    assert future.done()
+    assert future.result() == 42
+
+
+def test_inline_executor_captures_exceptions() -> None:
+    def boom() -> None:
+        raise RuntimeError("boom")
+
+    future = InlineExecutor().submit(boom)
+    with pytest.raises(RuntimeError, match="boom"):
+        future.result()
+
+
+def test_create_executor_rejects_unknown_kind() -> None:
+    with pytest.raises(ValueError, match="unknown executor kind"):
+        create_executor("fibers", 2)
+
+
+def test_asyncio_executor_limits_coroutine_concurrency() -> None:
+    import asyncio
+    import threading
+
+    executor = AsyncioExecutor(max_workers=2, concurrency=2)
+    active = 0
+    peak = 0
+
+    async def job(value: int) -> int:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        return value
+
+    try:
+        futures = [executor.submit(job, value) for value in range(6)]
+        assert [future.result(timeout=5) for future in futures] == list(range(6))
+        assert peak == 2
+        assert executor.submit(threading.current_thread).result(timeout=5).name.startswith("scheduler-job")
+    finally:
+        executor.shutdown()
+
+
+def test_isolated_executor_kills_stuck_jobs_and_recycles_workers() -> None:
+    import os
+    import time
+
+    executor = IsolatedExecutor(max_workers=1, max_runs=2)
+    try:
+        stuck = executor.submit_with_timeout(0.2, time.sleep, 30)
+        with pytest.raises(JobTimeout, match="timed out after 0.2s"):
+            stuck.result(timeout=10)
+        pids = [executor.submit(os.getpid).result(timeout=10) for _ in range(4)]
+        assert os.getpid() not in pids
+        assert pids[0] == pids[1] != pids[2] == pids[3]
+    finally:
+        executor.shutdown()
+
+
+def test_isolated_executor_runs_the_initializer_in_each_worker() -> None:
+    import os
+
+    executor = IsolatedExecutor(max_workers=1, initializer=partial(os.chdir, os.path.dirname(__file__)))
+    try:
+        assert executor.submit(os.getcwd).result(timeout=10) == os.path.dirname(__file__)
+    finally:
+        executor.shutdown()
+
+
+def test_process_executor_does_not_fork_the_scheduler() -> None:
+    import multiprocessing
+    import os
+
+    executor = create_executor("process", 1)
+    try:
+        parent = executor.submit(os.getppid).result(timeout=10)
+    finally:
+        executor.shutdown()
+    # Forkserver children are forked from the server process, not from us.
+    assert parent != os.getpid() or "forkserver" not in multiprocessing.get_all_start_methods()
+
+
+def test_isolated_executor_drops_a_terminated_worker_whose_job_already_finished(monkeypatch) -> None:
+    from concurrent.futures import CancelledError
+    import os
+    import time
+
+    executor = IsolatedExecutor(max_workers=1)
+    first_pid = executor.submit(os.getpid).result(timeout=10)
+    future = executor.submit(time.sleep, 0.3)
+    while future not in executor._running:
+        time.sleep(0.01)
+    worker = executor._running[future]
+    kill = worker.process.kill
+    kills = []
+
+    def late_kill() -> None:
+        # terminate()'s kill only lands after the job has replied.
+        kills.append(True)
+        if len(kills) > 1:
+            kill()
+
+    monkeypatch.setattr(worker.process, "kill", late_kill)
+    assert executor.terminate(future)
+    with pytest.raises(CancelledError):
+        future.result(timeout=10)
+    kill()
+    assert executor.submit(os.getpid).result(timeout=10) != first_pid
+    executor.shutdown()
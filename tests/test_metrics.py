@@ -0,0 +1,55 @@
+from pathlib import Path
+from urllib.request import urlopen
+
+from scheduler import metrics
+from scheduler.db import init_db, upsert_scheduled_function
+from scheduler.metrics import Counter, Histogram, Registry, start_metrics_server
+from scheduler.runner import run_due
+
+
+def test_registry_renders_prometheus_text() -> None:
+    registry = Registry()
+    runs = registry.register(Counter("jobs_total", "Jobs.", "status"))
+    durations = registry.register(Histogram("job_seconds", "Durations.", buckets=(0.1, 1.0)))
+    runs.inc(1, "success")
+    runs.inc(2, 'fail"ed')
+    for value in (0.05, 0.5, 0.5, 3.0):
+        durations.observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP jobs_total Jobs.",
+        "# TYPE jobs_total counter",
+        'jobs_total{status="fail\\"ed"} 2',
+        'jobs_total{status="success"} 1',
+        "# HELP job_seconds Durations.",
+        "# TYPE job_seconds histogram",
+        'job_seconds_bucket{le="0.1"} 1',
+        'job_seconds_bucket{le="1"} 3',
+        'job_seconds_bucket{le="+Inf"} 4',
+        "job_seconds_sum 4.05",
+        "job_seconds_count 4",
+    ]
+
+
+def test_runs_are_counted_and_served_over_http(tmp_path: Path) -> None:
+    (tmp_path / "jobs.py").write_text("def broken():\n    raise RuntimeError('boom')\n", encoding="utf-8")
+    conn = init_db(tmp_path / "scheduler.db")
+    upsert_scheduled_function(conn, str(tmp_path / "jobs.py"), "jobs.broken", 60)
+    conn.execute("UPDATE scheduled_functions SET next_run_at = 0")
+    failures = metrics.JOB_FAILURES.value()
+    observed = metrics.JOB_DURATION.count
+
+    assert run_due(conn) == 1
+    assert metrics.JOB_FAILURES.value() == failures + 1
+    assert metrics.JOB_DURATION.count == observed + 1
+
+    server, _ = start_metrics_server(0)
+    try:
+        with urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            body = response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert f"scheduler_job_failures_total {failures + 1}" in body
+    assert "# TYPE scheduler_job_lag_seconds histogram" in body
@@ -0,0 +1,145 @@
+import os
+from pathlib import Path
+import time
+
+import pytest
+
+pytest.importorskip("psycopg")
+pytest.importorskip("psycopg_pool")
+
+from scheduler.postgres import PostgresStore
+from scheduler.runner import run_due
+from scheduler.scanner import scan
+from scheduler.tui import TuiState
+
+# e.g. postgresql://postgres@localhost/scheduler_test; the tables in it are truncated.
+POSTGRES_URL = os.environ.get("SCHEDULER_TEST_POSTGRES_URL")
+
+pytestmark = pytest.mark.skipif(not POSTGRES_URL, reason="SCHEDULER_TEST_POSTGRES_URL is not set")
+
+
+@pytest.fixture
+def store():
+    store = PostgresStore(POSTGRES_URL)
+    with store.transaction() as conn:
+        conn.execute(
+            "TRUNCATE scheduled_functions, run_logs, run_profiles, scan_errors, scanned_files, scan_runs"
+            " RESTART IDENTITY"
+        )
+    yield store
+    store.close()
+
+
+def _write_jobs(tasks_dir: Path, count: int) -> None:
+    tasks_dir.mkdir()
+    (tasks_dir / "jobs.py").write_text(
+        "from datetime import timedelta\n"
+        "from scheduler.decorators import schedule\n"
+        + "".join(f"\n@schedule(timedelta(seconds=30))\ndef job{index}():\n    return None\n" for index in range(count)),
+        encoding="utf-8",
+    )
+
+
+def test_scan_and_run_round_trip(store: PostgresStore, tmp_path: Path) -> None:
+    _write_jobs(tmp_path / "tasks", 2)
+    assert scan(store, [tmp_path / "tasks"]).discovered == 2
+    with store.transaction() as conn:
+        conn.execute("UPDATE scheduled_functions SET next_run_at = 0")
+    [module_path] = store.fetch_module_paths("jobs.job0")
+    assert store.set_profile(module_path, "jobs.job0", "cpu") == 1
+
+    assert run_due(store) == 2
+    assert len(store.fetch_run_profiles(module_path, "jobs.job0")) == 1
+    assert all(scheduled.next_run_at > time.time() for scheduled in store.list_scheduled_functions())
+    assert store.fetch_last_scan()[1] == 1
+    state = TuiState(store)
+    state.sync()
+    assert (state.summary().runs_last_24h, state.summary().failures_last_24h) == (2, 0)
+    timings = [state.timings(function_id) for function_id, *_ in state.visible_functions(10)]
+    assert [row[0] for row in timings] == [1, 1]
+    assert all(row[1][0] > 0 and row[2][0] is not None for row in timings)
+
+
+def test_claims_skip_rows_locked_by_another_runner(store: PostgresStore, tmp_path: Path) -> None:
+    _write_jobs(tmp_path / "tasks", 3)
+    scan(store, [tmp_path / "tasks"])
+    with store.transaction() as conn:
+        conn.execute("UPDATE scheduled_functions SET next_run_at = 0")
+    other = PostgresStore(POSTGRES_URL)
+    try:
+        now = int(time.time())
+        with store.transaction():
+            assert len(store.claim_due_functions("node-a", now, 30, limit=2)) == 2
+            # Returns at once with the unlocked row instead of waiting.
+            assert len(other.claim_due_functions("node-b", now, 30)) == 1
+        assert other.claim_due_functions("node-c", now, 30) == []
+        assert len(other.claim_due_functions("node-c", now + 30, 30)) == 3
+    finally:
+        other.close()
+
+
+def test_data_version_only_counts_other_connections(store: PostgresStore, tmp_path: Path) -> None:
+    _write_jobs(tmp_path / "tasks", 1)
+    version = store.data_version()
+    scan(store, [tmp_path / "tasks"])
+    time.sleep(0.2)
+    assert store.data_version() == version
+
+    other = PostgresStore(POSTGRES_URL)
+    try:
+        other.release_leases("nobody")
+        deadline = time.time() + 5
+        while store.data_version() == version and time.time() < deadline:
+            time.sleep(0.05)
+        assert store.data_version() > version
+    finally:
+        other.close()
+
+
+def test_read_only_store_refuses_writes(store: PostgresStore, tmp_path: Path) -> None:
+    import psycopg
+
+    _write_jobs(tmp_path / "tasks", 1)
+    scan(store, [tmp_path / "tasks"])
+    reader = PostgresStore(POSTGRES_URL, read_only=True)
+    try:
+        assert reader.count_scheduled_functions() == 1
+        with pytest.raises(psycopg.errors.ReadOnlySqlTransaction):
+            reader.release_leases("nobody")
+    finally:
+        reader.close()
+
+
+def _synced_summary(store: PostgresStore):
+    state = TuiState(store)
+    state.sync()
+    return state.summary()
+
+
+def test_tui_state_follows_postgres_change_cursors(store: PostgresStore, tmp_path: Path) -> None:
+    _write_jobs(tmp_path / "tasks", 3)
+    scan(store, [tmp_path / "tasks"])
+    state = TuiState(store)
+    state.sync()
+    assert len(state.order) == 3 and state.summary().runs_last_24h == 0
+
+    with store.transaction():
+        store.set_next_runs((0, None, None, scheduled.id) for scheduled in store.list_scheduled_functions()[:1])
+    assert run_due(store) == 1
+    state.refresh(state.synced_at)
+    assert state.summary() == _synced_summary(store)
+    assert [row[3] is not None for row in state.visible_functions(10)].count(True) == 1
+
+
+def test_changed_functions_include_setting_changes(store: PostgresStore, tmp_path: Path) -> None:
+    _write_jobs(tmp_path / "tasks", 2)
+    scan(store, [tmp_path / "tasks"])
+    changed = store.list_scheduled_functions_changed(-1)
+    assert sorted(scheduled.qualname for _, scheduled in changed) == ["jobs.job0", "jobs.job1"]
+    cursor = max(seq for seq, _ in changed)
+
+    with store.transaction() as conn:
+        conn.execute("UPDATE scheduled_functions SET lease_owner = 'runner-a'")
+        conn.execute("UPDATE scheduled_functions SET timeout_seconds = 5 WHERE qualname = 'jobs.job1'")
+    changed = store.list_scheduled_functions_changed(cursor)
+    assert [(scheduled.qualname, scheduled.timeout_seconds) for _, scheduled in changed] == [("jobs.job1", 5)]
@@ -0,0 +1,45 @@
+from pathlib import Path
+import tracemalloc
+
+from scheduler.db import init_db, upsert_scheduled_function
+from scheduler.executor import InlineExecutor
+from scheduler.profiling import ProfileSettings, decode_profile, format_profile, profile_call
+from scheduler.runner import Dispatcher
+
+
+def _build_table() -> list[bytes]:
+    return [bytes(1024) for _ in range(200)]
+
+
+def test_profile_call_captures_hot_functions_and_allocations() -> None:
+    table, blob = profile_call(_build_table, "both", top=5)
+
+    assert len(table) == 200
+    stats = decode_profile(blob)
+    assert any("_build_table" in row[0] for row in stats["functions"])
+    assert len(stats["functions"]) <= 5
+    assert stats["peak_bytes"] >= 200 * 1024
+    assert stats["allocations"][0][1] >= 200 * 1024
+    assert not tracemalloc.is_tracing()
+    assert "peak traced memory" in format_profile(stats)
+
+
+def test_sampled_runs_store_profiles(tmp_path: Path) -> None:
+    (tmp_path / "jobs.py").write_text("def fast():\n    return None\n\ndef other():\n    return None\n", encoding="utf-8")
+    conn = init_db(tmp_path / "scheduler.db")
+    for name in ("fast", "other"):
+        upsert_scheduled_function(conn, str(tmp_path / "jobs.py"), f"jobs.{name}", 60)
+    conn.execute("UPDATE scheduled_functions SET next_run_at = 0")
+
+    dispatcher = Dispatcher(conn, InlineExecutor())
+    dispatcher.dispatch_due()
+    dispatcher.drain()
+    assert conn.execute("SELECT COUNT(*) FROM run_profiles").fetchone()[0] == 0
+
+    conn.execute("UPDATE scheduled_functions SET next_run_at = 0")
+    dispatcher = Dispatcher(conn, InlineExecutor(), profiling=ProfileSettings(sample_rate=1, mode="memory"))
+    dispatcher.dispatch_due()
+    dispatcher.drain()
+    blobs = [row[0] for row in conn.execute("SELECT stats FROM run_profiles")]
+    assert len(blobs) == 2
+    assert all(decode_profile(blob)["mode"] == "memory" for blob in blobs)
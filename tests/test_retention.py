@@ -0,0 +1,74 @@
+from pathlib import Path
+
+from scheduler.db import init_db, record_run_logs
+from scheduler.retention import DAY_SECONDS, HOUR_SECONDS, compact_run_logs, run_counts_since
+
+NOW = 1_700_000_000 - 1_700_000_000 % DAY_SECONDS + 12 * HOUR_SECONDS
+
+
+def test_compact_run_logs_rolls_up_and_deletes_old_rows(tmp_path: Path) -> None:
+    conn = init_db(tmp_path / "scheduler.db")
+    old = NOW - 3 * DAY_SECONDS
+    record_run_logs(
+        conn,
+        [
+            (1, old, old + 2, "success", None),
+            (1, old + 10, old + 15, "failure", "boom"),
+            (1, old + HOUR_SECONDS, old + HOUR_SECONDS + 1, "success", None),
+            (2, old, old + 1, "success", None),
+            (1, NOW - 60, NOW - 59, "success", None),
+        ],
+    )
+    before = run_counts_since(conn, NOW - 7 * DAY_SECONDS)
+
+    report = compact_run_logs(conn, retention_seconds=DAY_SECONDS, now_epoch=NOW, chunk_size=2)
+
+    assert report.rolled_up == 4
+    assert report.chunks >= 2
+    assert conn.execute("SELECT COUNT(*) FROM run_logs").fetchone()[0] == 1
+    hourly = conn.execute(
+        "SELECT bucket_start, scheduled_function_id, run_count, failure_count, total_duration_seconds, "
+        "max_duration_seconds FROM run_log_rollups WHERE granularity = 'hour' ORDER BY 1, 2"
+    ).fetchall()
+    bucket = old - old % HOUR_SECONDS
+    assert hourly == [
+        (bucket, 1, 2, 1, 7, 5),
+        (bucket, 2, 1, 0, 1, 1),
+        (bucket + HOUR_SECONDS, 1, 1, 0, 1, 1),
+    ]
+    daily = conn.execute(
+        "SELECT SUM(run_count) FROM run_log_rollups WHERE granularity = 'day'"
+    ).fetchone()[0]
+    assert daily == 4
+    assert run_counts_since(conn, NOW - 7 * DAY_SECONDS) == before == (5, 1)
+    assert run_counts_since(conn, NOW - DAY_SECONDS) == (1, 0)
+
+
+def test_daily_rollups_cover_windows_past_hourly_retention(tmp_path: Path) -> None:
+    conn = init_db(tmp_path / "scheduler.db")
+    ancient = NOW - 60 * DAY_SECONDS
+    record_run_logs(conn, [(1, ancient, ancient + 1, "failure", "boom")])
+
+    compact_run_logs(conn, retention_seconds=DAY_SECONDS, now_epoch=NOW)
+
+    assert conn.execute("SELECT COUNT(*) FROM run_log_rollups WHERE granularity = 'hour'").fetchone()[0] == 0
+    assert run_counts_since(conn, NOW - 90 * DAY_SECONDS) == (1, 1)
+
+
+def test_compaction_prunes_old_scan_runs_but_keeps_the_last_full_scan(tmp_path: Path) -> None:
+    conn = init_db(tmp_path / "scheduler.db")
+    old = NOW - 3 * DAY_SECONDS
+    for finished_at, kind in ((old, "full"), (old + 1, "full"), (old + 2, "files"), (NOW, "files")):
+        conn.execute(
+            "INSERT INTO scan_runs (started_at, finished_at, duration_ms, files_scanned, files_changed, discovered,"
+            " errors, kind) VALUES (?, ?, 0, 0, 0, 0, 0, ?)",
+            (finished_at, finished_at, kind),
+        )
+    conn.commit()
+
+    compact_run_logs(conn, retention_seconds=DAY_SECONDS, now_epoch=NOW)
+
+    assert conn.execute("SELECT finished_at, kind FROM scan_runs ORDER BY id").fetchall() == [
+        (old + 1, "full"),
+        (NOW, "files"),
+    ]
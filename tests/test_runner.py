@@ -1,8 +1,20 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import replace
+import multiprocessing
 from pathlib import Path
 import time
 
-from scheduler.db import init_db, upsert_scheduled_function, fetch_due_functions
-from scheduler.runner import compute_next_run
+import pytest
+
+from scheduler.db import (
+    ScheduledFunction,
+    fetch_due_functions,
+    init_db,
+    list_scheduled_functions,
+    upsert_scheduled_function,
+)
+from scheduler.executor import AsyncioExecutor, InlineExecutor, IsolatedExecutor
+from scheduler.runner import Dispatcher, Firing, compute_next_run, plan_firing, run_due
 
 
 def test_compute_next_run_advances_from_now_when_overdue() -> None:
@@ -10,6 +22,36 @@ def test_compute_next_run_advances_from_now_when_overdue() -> None:
     assert next_run == 130
 
 
+@pytest.mark.parametrize(
+    ("options", "expected"),
+    [
+        ({}, Firing(run=True, skipped=0, next_run_at=1310)),
+        ({"fixed_rate": 1}, Firing(run=True, skipped=0, next_run_at=1300)),
+        ({"misfire": "all"}, Firing(run=True, skipped=0, next_run_at=1100)),
+        ({"misfire": "all", "max_catch_up": 2}, Firing(run=True, skipped=1, next_run_at=1200)),
+        ({"misfire": "skip"}, Firing(run=True, skipped=2, next_run_at=1310)),
+        ({"misfire": "skip", "misfire_grace_seconds": 5}, Firing(run=False, skipped=3, next_run_at=1310)),
+        ({"misfire": "skip", "misfire_grace_seconds": 10, "fixed_rate": 1}, Firing(run=True, skipped=2, next_run_at=1300)),
+    ],
+)
+def test_plan_firing_applies_misfire_policy(options: dict, expected: Firing) -> None:
+    # Due at 1000 every 100s and now 1210: firings at 1000, 1100 and 1200 were missed.
+    scheduled = ScheduledFunction(1, "/tmp/jobs.py", "jobs.fast", 100, 0, 1, None, 1000, **options)
+    assert plan_firing(scheduled, now_epoch=1210) == expected
+
+
+def test_plan_firing_steps_through_cron_fire_times() -> None:
+    # Due at 00:00 every five minutes and now 00:12:30.
+    due = 1_717_200_000
+    scheduled = ScheduledFunction(1, "/tmp/jobs.py", "jobs.fast", 0, 0, 1, None, due, trigger="*/5 * * * *")
+    now = due + 750
+    assert plan_firing(scheduled, now) == Firing(run=True, skipped=0, next_run_at=due + 900)
+    assert plan_firing(replace(scheduled, misfire="all"), now) == Firing(run=True, skipped=0, next_run_at=due + 300)
+    assert plan_firing(replace(scheduled, misfire="skip", misfire_grace_seconds=60), now) == Firing(
+        run=False, skipped=3, next_run_at=due + 900
+    )
+
+
 def test_runner_marks_due_function(tmp_path: Path) -> None:
     db_path = tmp_path / "scheduler.db"
     conn = init_db(db_path)
@@ -23,3 +65,278 @@ def test_runner_marks_due_function(tmp_path: Path) -> None:
     future_epoch = int(time.time()) + 120
     due = fetch_due_functions(conn, now_epoch=future_epoch)
     assert [row.id for row in due] == [scheduled_id]
+
+
+def _write_jobs(tasks_dir: Path) -> Path:
+    tasks_dir.mkdir()
+    module_path = tasks_dir / "jobs.py"
+    module_path.write_text(
+        "import time\n\n"
+        "def slow():\n"
+        "    time.sleep(0.5)\n\n"
+        "def stuck():\n"
+        "    time.sleep(30)\n\n"
+        "def fast():\n"
+        "    return None\n\n"
+        "def broken():\n"
+        "    raise RuntimeError('boom')\n",
+        encoding="utf-8",
+    )
+    return module_path
+
+
+def test_run_due_records_success_and_failure(tmp_path: Path) -> None:
+    module_path = _write_jobs(tmp_path / "tasks")
+    conn = init_db(tmp_path / "scheduler.db")
+    for name in ("fast", "broken"):
+        upsert_scheduled_function(conn, module_path=str(module_path), qualname=f"jobs.{name}", interval_seconds=60)
+    conn.execute("UPDATE scheduled_functions SET next_run_at = 0")
+
+    assert run_due(conn) == 2
+
+    rows = conn.execute(
+        "SELECT qualname, status, error_message FROM run_logs "
+        "JOIN scheduled_functions ON run_logs.scheduled_function_id = scheduled_functions.id "
+        "ORDER BY qualname"
+    ).fetchall()
+    assert rows == [("jobs.broken", "failure", "boom"), ("jobs.fast", "success", None)]
+    assert all(row.next_run_at > time.time() for row in list_scheduled_functions(conn))
+
+
+def test_runs_record_timings_and_lag(tmp_path: Path) -> None:
+    module_path = _write_jobs(tmp_path / "tasks")
+    conn = init_db(tmp_path / "scheduler.db")
+    upsert_scheduled_function(conn, module_path=str(module_path), qualname="jobs.slow", interval_seconds=60)
+    due_at = int(time.time()) - 2
+    conn.execute("UPDATE scheduled_functions SET next_run_at = ?", (due_at,))
+
+    assert run_due(conn) == 1
+
+    started_at, started_at_ms, duration_ns, cpu_ns, lag_ms = conn.execute(
+        "SELECT started_at, started_at_ms, duration_ns, cpu_ns, lag_ms FROM run_logs"
+    ).fetchone()
+    assert started_at == started_at_ms // 1000
+    assert duration_ns >= 500_000_000
+    assert 0 <= cpu_ns < duration_ns  # sleeping costs no CPU
+    assert lag_ms == started_at_ms - due_at * 1000 >= 2000
+
+
+def test_dispatcher_does_not_wait_for_slow_jobs(tmp_path: Path) -> None:
+    module_path = _write_jobs(tmp_path / "tasks")
+    conn = init_db(tmp_path / "scheduler.db")
+    slow_id = upsert_scheduled_function(conn, module_path=str(module_path), qualname="jobs.slow", interval_seconds=60)
+    fast_id = upsert_scheduled_function(conn, module_path=str(module_path), qualname="jobs.fast", interval_seconds=60)
+    conn.execute("UPDATE scheduled_functions SET next_run_at = 0")
+
+    dispatcher = Dispatcher(conn, ThreadPoolExecutor(max_workers=2))
+    assert dispatcher.dispatch_due() == 2
+    dispatcher.collect(timeout=0.3)
+    dispatcher.flush()
+    logged = [row[0] for row in conn.execute("SELECT scheduled_function_id FROM run_logs")]
+    assert logged == [fast_id]
+
+    conn.execute("UPDATE scheduled_functions SET next_run_at = 0")
+    dispatcher.request_reload()
+    assert dispatcher.dispatch_due() == 1  # slow is still in flight
+    dispatcher.shutdown()
+    logged = sorted(row[0] for row in conn.execute("SELECT scheduled_function_id FROM run_logs"))
+    assert logged == sorted([fast_id, fast_id, slow_id])
+
+
+def test_dispatcher_reloads_queue_after_external_change(tmp_path: Path) -> None:
+    module_path = _write_jobs(tmp_path / "tasks")
+    db_path = tmp_path / "scheduler.db"
+    conn = init_db(db_path)
+    dispatcher = Dispatcher(conn, InlineExecutor())
+    assert dispatcher.dispatch_due() == 0
+
+    other = init_db(db_path)
+    upsert_scheduled_function(other, module_path=str(module_path), qualname="jobs.fast", interval_seconds=60)
+    other.execute("UPDATE scheduled_functions SET next_run_at = ?", (int(time.time()) + 1,))
+    other.commit()
+
+    assert dispatcher.dispatch_due() == 0
+    started = time.monotonic()
+    dispatcher.wait(10)
+    assert time.monotonic() - started < 2.5
+    assert dispatcher.dispatch_due() == 1
+
+
+def test_dispatcher_reloads_only_changed_functions(tmp_path: Path) -> None:
+    module_path = _write_jobs(tmp_path / "tasks")
+    db_path = tmp_path / "scheduler.db"
+    conn = init_db(db_path)
+    for name in ("fast", "slow", "stuck"):
+        upsert_scheduled_function(conn, str(module_path), f"jobs.{name}", 60)
+    dispatcher = Dispatcher(conn, InlineExecutor())
+    assert dispatcher.refresh_queue()
+    assert len(dispatcher.queue) == 3
+
+    fetched = []
+    conn.set_trace_callback(fetched.append)
+    other = init_db(db_path)
+    other.execute("UPDATE scheduled_functions SET next_run_at = 0 WHERE qualname = 'jobs.fast'")
+    other.execute("UPDATE scheduled_functions SET enabled = 0 WHERE qualname = 'jobs.stuck'")
+    other.commit()
+    assert dispatcher.refresh_queue()
+    conn.set_trace_callback(None)
+    assert not any("ORDER BY qualname" in statement for statement in fetched)
+    assert len(dispatcher.queue) == 2
+    assert [scheduled.qualname for scheduled in dispatcher.queue.pop_due(int(time.time()))] == ["jobs.fast"]
+
+
+def test_coroutine_jobs_are_awaited(tmp_path: Path) -> None:
+    tasks_dir = tmp_path / "tasks"
+    tasks_dir.mkdir()
+    module_path = tasks_dir / "async_jobs.py"
+    module_path.write_text(
+        "import asyncio\n\n"
+        "async def ok():\n"
+        "    await asyncio.sleep(0)\n\n"
+        "async def broken():\n"
+        "    await asyncio.sleep(0)\n"
+        "    raise RuntimeError('async boom')\n",
+        encoding="utf-8",
+    )
+    conn = init_db(tmp_path / "scheduler.db")
+    for name in ("ok", "broken"):
+        upsert_scheduled_function(conn, str(module_path), f"async_jobs.{name}", 60, is_async=True)
+    statuses = "SELECT status, error_message FROM run_logs ORDER BY scheduled_function_id"
+
+    conn.execute("UPDATE scheduled_functions SET next_run_at = 0")
+    assert run_due(conn) == 2
+    assert conn.execute(statuses).fetchall() == [("success", None), ("failure", "async boom")]
+
+    conn.execute("DELETE FROM run_logs")
+    conn.execute("UPDATE scheduled_functions SET next_run_at = 0")
+    dispatcher = Dispatcher(conn, AsyncioExecutor(max_workers=1, concurrency=4))
+    assert dispatcher.dispatch_due() == 2
+    dispatcher.shutdown()
+    assert conn.execute(statuses).fetchall() == [("success", None), ("failure", "async boom")]
+
+
+def test_isolated_dispatcher_records_timeouts(tmp_path: Path) -> None:
+    module_path = _write_jobs(tmp_path / "tasks")
+    conn = init_db(tmp_path / "scheduler.db")
+    upsert_scheduled_function(conn, str(module_path), "jobs.stuck", 60, timeout_seconds=1)
+    upsert_scheduled_function(conn, str(module_path), "jobs.fast", 60, timeout_seconds=1)
+    conn.execute("UPDATE scheduled_functions SET next_run_at = 0")
+
+    dispatcher = Dispatcher(conn, IsolatedExecutor(max_workers=2))
+    assert dispatcher.dispatch_due() == 2
+    dispatcher.shutdown()
+    rows = conn.execute(
+        "SELECT qualname, status, error_message, finished_at - started_at FROM run_logs "
+        "JOIN scheduled_functions ON run_logs.scheduled_function_id = scheduled_functions.id "
+        "ORDER BY qualname"
+    ).fetchall()
+    assert rows[0][:2] == ("jobs.fast", "success")
+    assert rows[1][:3] == ("jobs.stuck", "timeout", "timed out after 1s")
+    assert rows[1][3] <= 2
+
+
+def test_unenforced_timeouts_are_reported_once_per_job(tmp_path: Path, capsys) -> None:
+    module_path = _write_jobs(tmp_path / "tasks")
+    conn = init_db(tmp_path / "scheduler.db")
+    upsert_scheduled_function(conn, str(module_path), "jobs.fast", 60, timeout_seconds=5)
+    upsert_scheduled_function(conn, str(module_path), "jobs.slow", 60)
+
+    dispatcher = Dispatcher(conn, InlineExecutor())
+    for _ in range(2):
+        conn.execute("UPDATE scheduled_functions SET next_run_at = 0")
+        dispatcher.request_reload()
+        assert dispatcher.dispatch_due() == 2
+        dispatcher.collect(timeout=5)
+        dispatcher.flush()
+    dispatcher.shutdown()
+    warnings = [line for line in capsys.readouterr().out.splitlines() if line.startswith("WARNING")]
+    assert warnings == [
+        'WARNING: jobs.fast has a 5s timeout that this executor cannot enforce; '
+        'use executor = "isolated" to kill runs that exceed it'
+    ]
+
+
+def test_overlap_policies_bound_in_flight_runs(tmp_path: Path) -> None:
+    module_path = _write_jobs(tmp_path / "tasks")
+    conn = init_db(tmp_path / "scheduler.db")
+    skip_id = upsert_scheduled_function(conn, str(module_path), "jobs.slow", 60, overlap="skip")
+    pair_id = upsert_scheduled_function(conn, str(module_path), "jobs.stuck", 60, max_instances=2, overlap="replace")
+
+    executor = IsolatedExecutor(max_workers=4)
+    dispatcher = Dispatcher(conn, executor)
+    conn.execute("UPDATE scheduled_functions SET next_run_at = 0")
+    assert dispatcher.dispatch_due() == 2
+    conn.execute("UPDATE scheduled_functions SET next_run_at = 0")
+    dispatcher.request_reload()
+    assert dispatcher.dispatch_due() == 1  # slow is skipped, a second stuck run fits
+    assert dispatcher.in_flight == 3
+    conn.execute("UPDATE scheduled_functions SET next_run_at = 0 WHERE id = ?", (pair_id,))
+    dispatcher.request_reload()
+    assert dispatcher.dispatch_due() == 1  # replaces the oldest stuck run
+    while dispatcher.in_flight > 2:
+        dispatcher.collect(timeout=5)
+    dispatcher.flush()
+
+    statuses = "SELECT status, error_message FROM run_logs WHERE scheduled_function_id = ?"
+    assert conn.execute(statuses, (skip_id,)).fetchall()[0] == ("skipped", "1 run(s) still in flight")
+    assert ("replaced", "replaced by a newer run") in conn.execute(statuses, (pair_id,)).fetchall()
+    executor.shutdown(wait=False)
+
+
+def test_catch_up_runs_each_missed_firing(tmp_path: Path) -> None:
+    module_path = _write_jobs(tmp_path / "tasks")
+    conn = init_db(tmp_path / "scheduler.db")
+    upsert_scheduled_function(conn, str(module_path), "jobs.fast", 60, misfire="all", fixed_rate=True)
+    due = int(time.time()) - 150
+    conn.execute("UPDATE scheduled_functions SET next_run_at = ?", (due,))
+
+    assert [run_due(conn) for _ in range(4)] == [1, 1, 1, 0]
+    assert conn.execute("SELECT COUNT(*) FROM run_logs").fetchone()[0] == 3
+    assert list_scheduled_functions(conn)[0].next_run_at == due + 180
+
+    upsert_scheduled_function(conn, str(module_path), "jobs.fast", 60, misfire="all", fixed_rate=True)
+    assert list_scheduled_functions(conn)[0].next_run_at == due + 180
+
+
+def _run_node(db_path: str, seconds: float) -> int:
+    conn = init_db(Path(db_path))
+    dispatcher = Dispatcher(conn, InlineExecutor(), lease_seconds=5, claim_batch=2)
+    started = 0
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        started += dispatcher.dispatch_due()
+        dispatcher.wait(0.05)
+    dispatcher.shutdown()
+    conn.close()
+    return started
+
+
+def test_runners_sharing_a_database_run_each_firing_once(tmp_path: Path) -> None:
+    tasks_dir = tmp_path / "tasks"
+    tasks_dir.mkdir()
+    module_path = tasks_dir / "naps.py"
+    module_path.write_text(
+        "import time\n" + "".join(f"\ndef nap{index}():\n    time.sleep(0.1)\n" for index in range(20)),
+        encoding="utf-8",
+    )
+    # Not created yet: the runners and the "scan" below migrate it together.
+    db_path = tmp_path / "scheduler.db"
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=3, mp_context=context) as pool:
+        nodes = [pool.submit(_run_node, str(db_path), 4.0) for _ in range(3)]
+        conn = init_db(db_path)
+        for index in range(20):
+            upsert_scheduled_function(conn, str(module_path), f"naps.nap{index}", 1, misfire="all", fixed_rate=True)
+        due = int(time.time()) - 2
+        conn.execute("UPDATE scheduled_functions SET next_run_at = ?", (due,))
+        conn.commit()
+        before = 20 * due
+        started = [node.result() for node in nodes]
+
+    after = conn.execute("SELECT SUM(next_run_at) FROM scheduled_functions").fetchone()[0]
+    runs = conn.execute("SELECT COUNT(*) FROM run_logs WHERE status != 'skipped'").fetchone()[0]
+    assert runs == sum(started) == after - before  # every firing advanced once and ran once
+    assert all(count > 0 for count in started)
+    assert sum(started) > 3.0 / 0.1  # more than one runner could do alone
+    assert conn.execute("SELECT COUNT(*) FROM scheduled_functions WHERE lease_owner IS NOT NULL").fetchone()[0] == 0
@@ -1,7 +1,9 @@
 from pathlib import Path
+import threading
 
-from scheduler.db import init_db, list_scheduled_functions
-from scheduler.scanner import scan_paths
+from scheduler.db import DiscoveredFunction, fetch_scanned_files, init_db, list_scheduled_functions
+from scheduler.scanner import scan, scan_files, scan_paths, start_scan_thread
+from scheduler.store import SQLiteStore
 
 
 def test_scan_paths_discovers_decorated_function(tmp_path: Path) -> None:
@@ -53,3 +55,213 @@ def test_scan_paths_discovers_multiple_functions(tmp_path: Path) -> None:
     scheduled = list_scheduled_functions(conn)
     assert len(scheduled) == 2
     assert discovered == 2
+
+
+def _write_counting_module(path: Path, marker: Path, names: list[str]) -> None:
+    lines = [
+        "from datetime import timedelta",
+        "from pathlib import Path",
+        "from scheduler.decorators import schedule",
+        f"with open({str(marker)!r}, 'a') as handle:",
+        "    handle.write('x')",
+    ]
+    for name in names:
+        lines += ["", "@schedule(timedelta(seconds=30))", f"def {name}():", "    return None"]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_rescan_skips_unchanged_files(tmp_path: Path) -> None:
+    tasks_dir = tmp_path / "tasks"
+    tasks_dir.mkdir()
+    marker = tmp_path / "imports.txt"
+    _write_counting_module(tasks_dir / "counted.py", marker, ["job"])
+    conn = init_db(tmp_path / "scheduler.db")
+
+    assert scan_paths(conn, [tasks_dir]) == 1
+    assert scan_paths(conn, [tasks_dir]) == 1
+
+    assert marker.read_text(encoding="utf-8") == "x"
+    assert fetch_scanned_files(conn)[str(tasks_dir / "counted.py")].functions == [DiscoveredFunction("counted.job", 30)]
+
+
+def test_rescan_prunes_removed_functions_and_deleted_files(tmp_path: Path) -> None:
+    tasks_dir = tmp_path / "tasks"
+    tasks_dir.mkdir()
+    marker = tmp_path / "imports.txt"
+    kept = tasks_dir / "kept.py"
+    doomed = tasks_dir / "doomed.py"
+    _write_counting_module(kept, marker, ["first", "second"])
+    _write_counting_module(doomed, marker, ["job"])
+    conn = init_db(tmp_path / "scheduler.db")
+    assert scan_paths(conn, [tasks_dir]) == 3
+
+    _write_counting_module(kept, marker, ["first"])
+    doomed.unlink()
+    assert scan_paths(conn, [tasks_dir]) == 1
+
+    assert [row.qualname for row in list_scheduled_functions(conn)] == ["kept.first"]
+    assert set(fetch_scanned_files(conn)) == {str(kept)}
+
+
+def test_ast_discovery_does_not_import_files(tmp_path: Path) -> None:
+    tasks_dir = tmp_path / "tasks"
+    tasks_dir.mkdir()
+    marker = tmp_path / "imports.txt"
+    _write_counting_module(tasks_dir / "static.py", marker, ["job"])
+    (tasks_dir / "dynamic.py").write_text(
+        "from datetime import timedelta\n"
+        "from scheduler.decorators import schedule\n\n"
+        "SECONDS = int('45')\n\n"
+        "@schedule(timedelta(seconds=SECONDS))\n"
+        "def job():\n"
+        "    return None\n",
+        encoding="utf-8",
+    )
+    (tasks_dir / "unrelated.py").write_text("raise SystemExit('never imported')\n", encoding="utf-8")
+    conn = init_db(tmp_path / "scheduler.db")
+
+    assert scan_paths(conn, [tasks_dir], discovery="ast") == 2
+
+    assert not marker.exists()
+    intervals = {row.qualname: row.interval_seconds for row in list_scheduled_functions(conn)}
+    assert intervals == {"static.job": 30, "dynamic.job": 45}
+    assert conn.execute("SELECT COUNT(*) FROM scan_errors").fetchone()[0] == 0
+
+
+def test_scan_with_worker_processes_reports_progress(tmp_path: Path) -> None:
+    tasks_dir = tmp_path / "tasks"
+    tasks_dir.mkdir()
+    for index in range(6):
+        (tasks_dir / f"job_{index}.py").write_text(
+            "from datetime import timedelta\n"
+            "from scheduler.decorators import schedule\n\n"
+            f"@schedule(timedelta(seconds={index + 1}))\n"
+            "def job():\n"
+            "    return None\n",
+            encoding="utf-8",
+        )
+    (tasks_dir / "broken.py").write_text("raise RuntimeError('bad module')\n", encoding="utf-8")
+    conn = init_db(tmp_path / "scheduler.db")
+
+    report = scan(conn, [tasks_dir], workers=2)
+
+    assert (report.discovered, report.files_scanned, report.files_changed, report.errors) == (6, 7, 7, 1)
+    assert report.files_per_second > 0
+    assert len(list_scheduled_functions(conn)) == 6
+    errors = conn.execute("SELECT file_path, error_type FROM scan_errors").fetchall()
+    assert errors == [(str(tasks_dir / "broken.py"), "RuntimeError")]
+
+    report = scan(conn, [tasks_dir], workers=2)
+    assert (report.discovered, report.files_changed) == (6, 0)
+
+
+def test_rescan_keeps_next_run_at_unless_interval_changes(tmp_path: Path) -> None:
+    tasks_dir = tmp_path / "tasks"
+    tasks_dir.mkdir()
+    marker = tmp_path / "imports.txt"
+    module_path = tasks_dir / "steady.py"
+    _write_counting_module(module_path, marker, ["job"])
+    conn = init_db(tmp_path / "scheduler.db")
+    scan_paths(conn, [tasks_dir])
+    conn.execute("UPDATE scheduled_functions SET next_run_at = 123")
+    conn.commit()
+
+    module_path.write_text(module_path.read_text(encoding="utf-8") + "\n# touched\n", encoding="utf-8")
+    scan_paths(conn, [tasks_dir])
+    assert list_scheduled_functions(conn)[0].next_run_at == 123
+
+    module_path.write_text(
+        module_path.read_text(encoding="utf-8").replace("seconds=30", "seconds=90"), encoding="utf-8"
+    )
+    scan_paths(conn, [tasks_dir])
+    scheduled = list_scheduled_functions(conn)[0]
+    assert scheduled.interval_seconds == 90
+    assert scheduled.next_run_at > 123
+
+
+def test_scan_thread_rescans_on_interval(tmp_path: Path) -> None:
+    tasks_dir = tmp_path / "tasks"
+    tasks_dir.mkdir()
+    db_path = tmp_path / "scheduler.db"
+    init_db(db_path).close()
+    reports = []
+    done = threading.Event()
+
+    def on_scan(report) -> None:
+        reports.append(report)
+        if report.discovered:
+            done.set()
+
+    thread, stop = start_scan_thread(db_path, [tasks_dir], 0.05, on_scan=on_scan)
+    _write_counting_module(tasks_dir / "late.py", tmp_path / "imports.txt", ["job"])
+    assert done.wait(5)
+    stop.set()
+    thread.join(5)
+
+    conn = init_db(db_path)
+    assert [row.qualname for row in list_scheduled_functions(conn)] == ["late.job"]
+    assert conn.execute("SELECT COUNT(*) FROM scan_runs").fetchone()[0] >= 1
+
+
+def test_scan_files_processes_only_given_paths(tmp_path: Path) -> None:
+    tasks_dir = tmp_path / "tasks"
+    tasks_dir.mkdir()
+    marker = tmp_path / "imports.txt"
+    first = tasks_dir / "first.py"
+    second = tasks_dir / "second.py"
+    _write_counting_module(first, marker, ["job"])
+    conn = init_db(tmp_path / "scheduler.db")
+    scan_paths(conn, [tasks_dir])
+    _write_counting_module(second, marker, ["job"])
+
+    report = scan_files(conn, [second])
+    assert (report.files_scanned, report.discovered) == (1, 1)
+    assert marker.read_text(encoding="utf-8") == "xx"
+    # Watch batches are recorded, but "Last scan" still shows the full scan.
+    assert conn.execute("SELECT kind FROM scan_runs ORDER BY id").fetchall() == [("full",), ("files",)]
+    full_scan_seconds = conn.execute("SELECT finished_at FROM scan_runs WHERE kind = 'full'").fetchone()[0]
+    assert SQLiteStore(conn).fetch_last_scan()[0] == full_scan_seconds
+
+    first.unlink()
+    scan_files(conn, [first])
+    assert [row.qualname for row in list_scheduled_functions(conn)] == ["second.job"]
+
+
+def test_scan_marks_coroutine_functions(tmp_path: Path) -> None:
+    tasks_dir = tmp_path / "tasks"
+    tasks_dir.mkdir()
+    (tasks_dir / "poller.py").write_text(
+        "from datetime import timedelta\n"
+        "from scheduler.decorators import schedule\n\n"
+        "@schedule(timedelta(seconds=5))\n"
+        "async def poll():\n"
+        "    return None\n",
+        encoding="utf-8",
+    )
+    for discovery in ("import", "ast"):
+        conn = init_db(tmp_path / f"{discovery}.db")
+        scan_paths(conn, [tasks_dir], discovery=discovery)
+        assert [row.is_async for row in list_scheduled_functions(conn)] == [1]
+
+
+def test_impossible_cron_date_is_a_scan_error(tmp_path: Path) -> None:
+    tasks_dir = tmp_path / "tasks"
+    tasks_dir.mkdir()
+    (tasks_dir / "never.py").write_text(
+        "from scheduler.decorators import schedule\n\n"
+        "@schedule(cron=\"0 0 31 2 *\")\n"
+        "def job():\n"
+        "    return None\n",
+        encoding="utf-8",
+    )
+    (tasks_dir / "fine.py").write_text(
+        "from scheduler.decorators import schedule\n\n@schedule(cron=\"0 0 * * *\")\ndef job():\n    return None\n",
+        encoding="utf-8",
+    )
+    conn = init_db(tmp_path / "scheduler.db")
+
+    report = scan(conn, [tasks_dir], discovery="ast")
+    assert (report.discovered, report.errors) == (1, 1)
+    assert conn.execute("SELECT file_path, error_message FROM scan_errors").fetchall() == [
+        (str(tasks_dir / "never.py"), "cron expression never fires: '0 0 31 2 *'")
+    ]
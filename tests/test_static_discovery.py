@@ -0,0 +1,56 @@
+import pytest
+
+from scheduler.db import DiscoveredFunction
+from scheduler.static_discovery import Unresolvable, discover_functions
+
+
+def test_discover_functions_resolves_aliases_and_folds_constants() -> None:
+    source = (
+        "import datetime as dt\n"
+        "from datetime import timedelta as td\n"
+        "from scheduler import decorators\n"
+        "from scheduler.decorators import schedule as every\n\n"
+        "MINUTES = 5\n"
+        "HOURLY = td(hours=1)\n\n"
+        "@every(td(minutes=MINUTES * 2, seconds=-30))\n"
+        "def folded():\n"
+        "    pass\n\n"
+        "@decorators.schedule(dt.timedelta(1, 60 // 2))\n"
+        "async def positional():\n"
+        "    pass\n\n"
+        "@every(interval=HOURLY * 2, timeout=td(seconds=1.5), max_instances=2, overlap='skip')\n"
+        "def from_constant():\n"
+        "    pass\n\n"
+        "@every(cron='0 ' + '2 * * *', timezone='UTC')\n"
+        "def nightly():\n"
+        "    pass\n\n"
+        "def plain():\n"
+        "    pass\n"
+    )
+
+    assert discover_functions(source, "jobs") == [
+        DiscoveredFunction("jobs.folded", 570),
+        DiscoveredFunction("jobs.positional", 86430, is_async=True),
+        DiscoveredFunction("jobs.from_constant", 7200, timeout_seconds=2, max_instances=2, overlap="skip"),
+        DiscoveredFunction("jobs.nightly", 0, trigger="CRON_TZ=UTC 0 2 * * *"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "from datetime import timedelta\nfrom scheduler.decorators import schedule\n"
+        "@schedule(timedelta(seconds=compute()))\ndef job():\n    pass\n",
+        "from mylib import schedule\n@schedule(5)\ndef job():\n    pass\n",
+        "from scheduler.decorators import *\nfrom datetime import timedelta\n"
+        "@schedule(timedelta(seconds=5))\ndef job():\n    pass\n",
+        "from scheduler.decorators import schedule\nfrom datetime import timedelta\n"
+        "if True:\n    @schedule(timedelta(seconds=5))\n    def job():\n        pass\n",
+        "from scheduler.decorators import schedule\nfrom datetime import timedelta\n"
+        "@schedule(timedelta(seconds=5), overlap='pile-up')\ndef job():\n    pass\n",
+        "def broken(:\n",
+    ],
+)
+def test_discover_functions_requires_import_when_unresolvable(source: str) -> None:
+    with pytest.raises(Unresolvable):
+        discover_functions(source, "jobs")
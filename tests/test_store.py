@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import pytest
+
+from scheduler.runner import run_due
+from scheduler.scanner import scan
+from scheduler.store import SQLiteStore, open_store
+from scheduler.tui import TuiState
+
+
+def _write_job(tasks_dir: Path) -> None:
+    tasks_dir.mkdir()
+    (tasks_dir / "sample.py").write_text(
+        "from datetime import timedelta\n"
+        "from scheduler.decorators import schedule\n\n"
+        "@schedule(timedelta(seconds=30))\n"
+        "def job():\n"
+        "    return 'ok'\n",
+        encoding="utf-8",
+    )
+
+
+def test_sqlite_store_serves_scanner_runner_and_tui(tmp_path: Path) -> None:
+    _write_job(tmp_path / "tasks")
+    store = open_store(tmp_path / "scheduler.db")
+    assert isinstance(store, SQLiteStore)
+
+    assert scan(store, [tmp_path / "tasks"]).discovered == 1
+    with store.transaction():
+        store.set_next_runs((0, None, None, scheduled.id) for scheduled in store.list_scheduled_functions())
+    assert run_due(store) == 1
+
+    state = TuiState(store)
+    state.sync()
+    summary = state.summary()
+    assert (summary.total_functions, summary.runs_last_24h, summary.last_scan_files) == (1, 1, 1)
+    assert state.visible_functions(10)[0][3] is not None
+    store.close()
+
+
+def test_run_timing_percentiles_skip_untimed_rows(tmp_path: Path) -> None:
+    import time
+
+    from scheduler.db import init_db, record_run_log, upsert_scheduled_function
+
+    now = int(time.time())
+    conn = init_db(tmp_path / "scheduler.db")
+    scheduled_id = upsert_scheduled_function(conn, "/tmp/jobs.py", "jobs.fast", 60)
+    # A row written before run_logs had timing columns.
+    record_run_log(conn, scheduled_function_id=scheduled_id, started_at=now, finished_at=now, status="success", error_message=None)
+    buffer = SQLiteStore(conn).buffer()
+    for index in range(1, 101):
+        buffer.record_run_log(
+            scheduled_id, now, now, "success", None, started_at_ms=now * 1000, duration_ns=index * 1_000_000, lag_ms=index
+        )
+    buffer.flush()
+
+    state = TuiState(conn)
+    state.sync(now)
+    assert state.timings(scheduled_id, now) == (100, (50_000_000, 95_000_000, 99_000_000), (50, 95, 99))
+    assert conn.execute("SELECT duration_ns, lag_ms FROM run_logs ORDER BY id LIMIT 1").fetchone() == (None, None)
+
+
+def test_postgres_urls_need_the_optional_dependency() -> None:
+    from scheduler import postgres
+
+    if postgres.psycopg is not None:
+        pytest.skip("psycopg is installed")
+    with pytest.raises(RuntimeError, match="postgres extra"):
+        open_store("postgresql://localhost/scheduler")
@@ -1,3 +1,5 @@
+import time
+
 from scheduler.tui import format_status_summary
 
 
@@ -12,3 +14,125 @@ def test_format_status_summary_empty() -> None:
     assert "Functions: 0" in summary
     assert "Runs (24h): 0" in summary
     assert "Failures (24h): 0" in summary
+
+
+def test_summary_reports_last_recorded_scan(tmp_path) -> None:
+    from scheduler.db import init_db
+    from scheduler.scanner import scan
+    from scheduler.tui import TuiState
+
+    tasks_dir = tmp_path / "tasks"
+    tasks_dir.mkdir()
+    (tasks_dir / "empty.py").write_text("VALUE = 1\n", encoding="utf-8")
+    conn = init_db(tmp_path / "scheduler.db")
+    state = TuiState(conn)
+    state.sync()
+    assert state.summary().last_scan is None
+
+    scan(conn, [tasks_dir])
+
+    state.refresh()
+    summary = state.summary()
+    assert summary.last_scan is not None
+    assert summary.last_scan_files == 1
+    text = format_status_summary(
+        last_scan=summary.last_scan,
+        total_functions=summary.total_functions,
+        runs_last_24h=0,
+        failures_last_24h=0,
+        last_scan_files=summary.last_scan_files,
+        last_scan_duration_ms=summary.last_scan_duration_ms,
+    )
+    assert "(1 files in " in text
+
+
+def test_upcoming_firings_histogram(tmp_path) -> None:
+    from scheduler.db import init_db, upsert_scheduled_function
+    from scheduler.store import SQLiteStore
+    from scheduler.tui import format_firing_histogram
+
+    conn = init_db(tmp_path / "scheduler.db")
+    for index, offset in enumerate([-5, 0, 2, 2, 2, 90]):
+        scheduled_id = upsert_scheduled_function(conn, "/tmp/jobs.py", f"jobs.task{index}", 60)
+        conn.execute("UPDATE scheduled_functions SET next_run_at = ? WHERE id = ?", (1000 + offset, scheduled_id))
+
+    counts = SQLiteStore(conn).fetch_upcoming_firings(now=1000, window_seconds=4)
+    assert counts == [2, 0, 3, 0]
+    assert format_firing_histogram(counts) == "Upcoming firings (4s): |▅ █ | peak 3/s"
+    assert format_firing_histogram([0, 0]) == "Upcoming firings (2s): none"
+
+
+def test_format_percentiles() -> None:
+    from scheduler.tui import format_percentiles
+
+    assert format_percentiles((1_500_000, 20_000_000, 1_234_000_000), 1_000_000) == "1.5 / 20.0 / 1,234.0 ms"
+    assert format_percentiles((None, None, None)) == "n/a / n/a / n/a ms"
+
+
+def _synced_summary(store, now: int):
+    from scheduler.tui import TuiState
+
+    state = TuiState(store)
+    state.sync(now)
+    return state.summary(now)
+
+
+def test_tui_state_refreshes_from_change_cursors(tmp_path) -> None:
+    from scheduler.db import explain_query_plan, init_db, record_run_logs, upsert_scheduled_function
+    from scheduler.store import SQLiteStore
+    from scheduler.tui import TuiState
+
+    conn = init_db(tmp_path / "scheduler.db")
+    store = SQLiteStore(conn)
+    beta = upsert_scheduled_function(conn, "/tmp/jobs.py", "jobs.beta", 60)
+    now = int(time.time())
+    # Old rows are only counted; rows inside the hour also feed the timings.
+    record_run_logs(conn, [(beta, now - 2 * 86400, now, "failure", "boom"), (beta, now - 7200, now, "skipped", None)])
+    buffer = store.buffer()
+    for index in range(1, 5):
+        buffer.record_run_log(beta, now - 60, now, "success", None, duration_ns=index * 1_000_000, lag_ms=index)
+    buffer.flush()
+
+    state = TuiState(store)
+    state.sync(now)
+    assert (state.summary(now).runs_last_24h, state.summary(now).runs_last_7d) == (4, 5)
+    assert state.summary(now).failures_last_7d == 1
+    assert state.timings(beta, now) == (4, (2_000_000, 4_000_000, 4_000_000), (2, 4, 4))
+
+    alpha = upsert_scheduled_function(conn, "/tmp/jobs.py", "jobs.alpha", 60)
+    conn.execute("UPDATE scheduled_functions SET last_run_at = ? WHERE id = ?", (now, beta))
+    buffer.record_run_log(alpha, now, now, "timeout", None, duration_ns=9_000_000, lag_ms=0)
+    buffer.flush()
+    queries: list[str] = []
+    conn.set_trace_callback(queries.append)
+    state.refresh(now)
+    conn.set_trace_callback(None)
+
+    assert [qualname for qualname, _ in state.order] == ["jobs.alpha", "jobs.beta"]
+    assert state.functions[beta][2] == now
+    assert state.recent[-1] == (now, "timeout", "jobs.alpha")
+    assert state.summary(now) == _synced_summary(store, now)
+    # Each refresh query is an index search, however large the tables are.
+    for sql in queries:
+        plan = explain_query_plan(conn, sql)
+        assert not any(step.startswith(("SCAN run_logs", "SCAN scheduled_functions")) for step in plan), plan
+
+
+def test_tui_pages_through_functions(tmp_path) -> None:
+    from rich.console import Console
+
+    from scheduler.db import init_db, upsert_scheduled_functions
+    from scheduler.tui import TuiState, render
+
+    conn = init_db(tmp_path / "scheduler.db")
+    upsert_scheduled_functions(conn, [("/tmp/jobs.py", f"jobs.task{index:02d}", 60) for index in range(12)])
+    state = TuiState(conn)
+    state.sync()
+
+    assert state.page_count(5) == 3
+    state.page = 10
+    assert [row[1] for row in state.visible_functions(5)] == ["jobs.task10", "jobs.task11"]
+    console = Console(record=True, width=200)
+    console.print(render(state, 5))
+    text = console.export_text()
+    assert "page 3/3" in text and "jobs.task11" in text and "jobs.task09" not in text
@@ -0,0 +1,100 @@
+from pathlib import Path
+import sys
+import threading
+
+import pytest
+
+from scheduler.db import init_db, list_scheduled_functions
+from scheduler.watcher import InotifyWatcher, PollingWatcher, create_watcher, next_batch, start_watch_thread
+
+JOB_SOURCE = (
+    "from datetime import timedelta\n"
+    "from scheduler.decorators import schedule\n\n"
+    "@schedule(timedelta(seconds=30))\n"
+    "def job():\n"
+    "    return None\n"
+)
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_inotify_watcher_reports_touched_sources_and_skips_ignored_dirs(tmp_path: Path) -> None:
+    (tmp_path / ".venv").mkdir()
+    watcher = InotifyWatcher([tmp_path])
+    try:
+        (tmp_path / "jobs.py").write_text(JOB_SOURCE, encoding="utf-8")
+        (tmp_path / "notes.txt").write_text("ignored", encoding="utf-8")
+        (tmp_path / ".venv" / "lib.py").write_text("", encoding="utf-8")
+        nested = tmp_path / "pkg"
+        nested.mkdir()
+        (nested / "more.py").write_text(JOB_SOURCE, encoding="utf-8")
+
+        changed = next_batch(watcher, timeout=2, debounce_seconds=0.1)
+        assert changed is not None
+        assert {tmp_path / "jobs.py", nested / "more.py"} <= changed
+        assert all(path.suffix == ".py" and ".venv" not in path.parts for path in changed)
+
+        (tmp_path / "jobs.py").unlink()
+        assert next_batch(watcher, timeout=2, debounce_seconds=0.1) == {tmp_path / "jobs.py"}
+    finally:
+        watcher.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_failed_inotify_watches_are_reported(tmp_path: Path, monkeypatch, capsys) -> None:
+    import errno
+
+    def out_of_watches(self, directory: str) -> int:
+        raise OSError(errno.ENOSPC, "No space left on device", directory)
+
+    # At startup the whole tree must be watched, or the watcher polls instead.
+    with monkeypatch.context() as patch:
+        patch.setattr(InotifyWatcher, "_add_watch", out_of_watches)
+        assert isinstance(create_watcher([tmp_path]), PollingWatcher)
+    assert "WARNING: inotify watch failed" in capsys.readouterr().out
+
+    watcher = InotifyWatcher([tmp_path])
+    try:
+        monkeypatch.setattr(InotifyWatcher, "_add_watch", out_of_watches)
+        nested = tmp_path / "pkg"
+        nested.mkdir()
+        assert next_batch(watcher, timeout=2, debounce_seconds=0.1) == set()
+        assert watcher.unwatched == {nested}
+        assert f"WARNING: cannot watch {nested}" in capsys.readouterr().out
+    finally:
+        watcher.close()
+
+
+def test_polling_watcher_reports_changed_files(tmp_path: Path) -> None:
+    existing = tmp_path / "existing.py"
+    existing.write_text("A = 1\n", encoding="utf-8")
+    watcher = PollingWatcher([tmp_path], interval_seconds=0.05)
+
+    assert watcher.poll(0) == set()
+    created = tmp_path / "created.py"
+    created.write_text(JOB_SOURCE, encoding="utf-8")
+    existing.write_text("A = 22\n", encoding="utf-8")
+
+    assert watcher.poll(1) == {created, existing}
+
+
+def test_watch_thread_discovers_new_jobs_quickly(tmp_path: Path) -> None:
+    tasks_dir = tmp_path / "tasks"
+    tasks_dir.mkdir()
+    db_path = tmp_path / "scheduler.db"
+    init_db(db_path).close()
+    done = threading.Event()
+    thread, stop = start_watch_thread(
+        db_path,
+        [tasks_dir],
+        debounce_seconds=0.05,
+        on_scan=lambda report: report.discovered and done.set(),
+    )
+    try:
+        (tasks_dir / "fresh.py").write_text(JOB_SOURCE, encoding="utf-8")
+        assert done.wait(3)
+    finally:
+        stop.set()
+        thread.join(5)
+
+    conn = init_db(db_path)
+    assert [row.qualname for row in list_scheduled_functions(conn)] == ["fresh.job"]